@@ -1,5 +1,36 @@
-from .destination_agent import DestinationAgent
-from .activity_agent import ActivityAgent
-from .budget_agent import BudgetAgent
-from .itinerary_agent import ItineraryAgent
-from .coordinator import TravelCoordinator
\ No newline at end of file
+"""
+Agents package.
+
+Agents are loaded on first attribute access (PEP 562), so importing a light
+submodule such as src.agents.prefetcher does not pull in the Anthropic SDK
+and LangGraph.
+"""
+import importlib
+from typing import TYPE_CHECKING
+
+_EXPORTS = {
+    "DestinationAgent": ".destination_agent",
+    "ActivityAgent": ".activity_agent",
+    "BudgetAgent": ".budget_agent",
+    "ItineraryAgent": ".itinerary_agent",
+    "TravelCoordinator": ".coordinator",
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
+
+if TYPE_CHECKING:
+    from .destination_agent import DestinationAgent
+    from .activity_agent import ActivityAgent
+    from .budget_agent import BudgetAgent
+    from .itinerary_agent import ItineraryAgent
+    from .coordinator import TravelCoordinator
@@ -1,14 +1,22 @@
-from anthropic import Anthropic
+from src.utils.cassette import anthropic_client
 from src.tools import SearchTool
 from src.utils.config import ANTHROPIC_API_KEY
+from src.utils.model_router import ModelRouter
+from src.utils.activity_catalog import ACTIVITY_TOOL, parse_activities, format_activities
+from src.utils.snippets import format_search_context
 from datetime import datetime
 
+# Activity search passages to keep: enough for a range of venues per interest
+SEARCH_CONTEXT_TOKENS = 250
+
 class ActivityAgent:
-    def __init__(self, api_key=None, cost_tracker=None):
-        self.client = Anthropic(api_key=api_key or ANTHROPIC_API_KEY)
+    def __init__(self, api_key=None, cost_tracker=None, router=None):
+        self.client = anthropic_client(api_key or ANTHROPIC_API_KEY)
         self.search_tool = SearchTool()
         self.cost_tracker = cost_tracker
-    def find_activities(self, destination: str, interests: list, start_date: str, end_date: str, coordinates: dict):
+        self.router = router or ModelRouter.from_config()
+    def find_activities(self, destination: str, interests: list, start_date: str, end_date: str, coordinates: dict,
+                        deadline=None):
         """
         Find weather-appropriate activities for destination based on location and season
         """
@@ -18,7 +26,10 @@ class ActivityAgent:
         # Search for activities
         interests_str = " ".join(interests)
         search_query = f"{destination} {interests_str} activities things to do {start_date}"
-        search_results = self.search_tool.search(search_query, max_results=5)
+        search_results = self.search_tool.search(search_query, max_results=5,
+                                                 timeout=deadline.tool_timeout(10) if deadline else 10)
+        if deadline and "error" in search_results:
+            deadline.degrade("activity search", search_results["error"])
         
         prompt = f"""You are an activity planning agent for a travel planner.
 
@@ -30,7 +41,7 @@ Location & Season Context:
 {season_context}
 
 Search Results:
-{self._format_search_results(search_results)}
+{self._format_search_results(search_results, interests)}
 
 TASK: Create a diverse list of 10-12 specific activities that:
 1. Match the traveler's interests
@@ -39,10 +50,11 @@ TASK: Create a diverse list of 10-12 specific activities that:
 4. Account for the destination's climate (e.g., Tokyo in June = rainy season, so include indoor options)
 5. Are culturally appropriate and respectful
 
-For each activity, provide:
+For each activity, record:
 - Activity name and brief description (1-2 sentences)
-- Estimated duration (e.g., "2-3 hours", "Half day", "Full day")
-- Estimated cost ($, $$, or $$$)
+- A specific venue or neighborhood that can be found on a map
+- Estimated duration in hours
+- Estimated cost tier ($, $$, or $$$)
 - Best time of day (Morning/Midday/Evening/Night)
 - Weather dependency (Indoor/Outdoor/Either)
 
@@ -54,21 +66,26 @@ IMPORTANT GUIDELINES:
 - Focus on typical seasonal conditions, not disasters
 - Be culturally sensitive and avoid stereotypes
 
-Format as a clear numbered list."""
+Record the activities with the record_activities tool."""
 
-        message = self.client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=1000,
+        message = self.router.create_message(
+            self.client, "activities",
+            deadline=deadline,
+            max_tokens=1500,
+            tools=[ACTIVITY_TOOL],
+            tool_choice={"type": "tool", "name": ACTIVITY_TOOL["name"]},
             messages=[{"role": "user", "content": prompt}]
         )
 
         # Log token usage (optional - for debugging)
-        print(f"  ⚡ Tokens used - Input: {message.usage.input_tokens}, Output: {message.usage.output_tokens}")
+        print(f"  ⚡ Tokens used ({message.model}) - Input: {message.usage.input_tokens}, Output: {message.usage.output_tokens}")
         # Track usage
         if self.cost_tracker:
-            self.cost_tracker.add_usage(message.usage.input_tokens, message.usage.output_tokens)
+            self.cost_tracker.add_usage(message.usage.input_tokens, message.usage.output_tokens, stage="activities", model=message.model)
+        activities = parse_activities(message)
         return {
-            "activities": message.content[0].text,
+            "activities": format_activities(activities),
+            "activity_records": activities,
             "season_context": season_context,
             "sources": [r["url"] for r in search_results.get("results", [])]
         }
@@ -129,12 +146,7 @@ Typical conditions for this location and season:
         except Exception as e:
             return "Season information unavailable - plan diverse indoor and outdoor activities"
     
-    def _format_search_results(self, results):
-        """Format search results for Claude"""
-        if "error" in results:
-            return "No search results available"
-        
-        formatted = []
-        for r in results.get("results", []):
-            formatted.append(f"- {r['title']}: {r['content'][:150]}...")
-        return "\n".join(formatted)
\ No newline at end of file
+    def _format_search_results(self, results, interests: list):
+        """Most relevant search passages for Claude, answer first"""
+        query = f"{' '.join(interests)} activities things to do tour visit experience museum market park walk indoor outdoor"
+        return format_search_context(results, query, SEARCH_CONTEXT_TOKENS)
\ No newline at end of file
@@ -1,14 +1,29 @@
-from anthropic import Anthropic
+from src.utils.cassette import anthropic_client
 from src.tools import SearchTool
 from src.utils.config import ANTHROPIC_API_KEY
+from src.utils.model_router import ModelRouter
+from src.utils.activity_catalog import serialize_activities
+from src.utils.snippets import format_search_context
+from src.utils.comparison import COST_COMPARISON_TOOL, parse_cost_comparison
+
+# Cost passages to keep: a few price points are all the breakdown needs
+SEARCH_CONTEXT_TOKENS = 150
+# Per-city search context when comparing destinations
+COMPARE_CONTEXT_TOKENS = 100
 
 class BudgetAgent:
-    def __init__(self, api_key=None, cost_tracker=None):
-        self.client = Anthropic(api_key=api_key or ANTHROPIC_API_KEY)
+    def __init__(self, api_key=None, cost_tracker=None, router=None):
+        self.client = anthropic_client(api_key or ANTHROPIC_API_KEY)
         self.search_tool = SearchTool()
         self.cost_tracker = cost_tracker
+        self.router = router or ModelRouter.from_config()
+    
+    @staticmethod
+    def search_query(destination: str):
+        return f"{destination} travel costs budget accommodation food 2025"
     
-    def estimate_costs(self, destination: str, start_date: str, end_date: str, budget: float, activities: str):
+    def estimate_costs(self, destination: str, start_date: str, end_date: str, budget: float, activities: list,
+                       deadline=None):
         """
         Estimate costs and provide budget breakdown
         """
@@ -19,8 +34,10 @@ class BudgetAgent:
         num_days = (end - start).days + 1
         
         # Search for cost information
-        search_query = f"{destination} travel costs budget accommodation food 2025"
-        search_results = self.search_tool.search(search_query, max_results=3)
+        search_results = self.search_tool.search(self.search_query(destination), max_results=3,
+                                                 timeout=deadline.tool_timeout(10) if deadline else 10)
+        if deadline and "error" in search_results:
+            deadline.degrade("cost search", search_results["error"])
         
         prompt = f"""You are a budget planning agent for a travel planner.
 
@@ -32,8 +49,8 @@ Daily Budget: ${budget/num_days:.2f}
 Search Results on Costs:
 {self._format_search_results(search_results)}
 
-Proposed Activities:
-{activities[:500]}...
+Proposed Activities (name | duration | cost tier):
+{serialize_activities(activities, fields=("name", "duration_hours", "cost_tier"))}
 
 TASK: Create a realistic budget breakdown with:
 
@@ -54,17 +71,18 @@ TASK: Create a realistic budget breakdown with:
 
 Keep response under 250 words. Be realistic and honest about costs."""
 
-        message = self.client.messages.create(
-            model="claude-sonnet-4-20250514",
+        message = self.router.create_message(
+            self.client, "budget",
+            deadline=deadline,
             max_tokens=500,
             messages=[{"role": "user", "content": prompt}]
         )
 
         # Log token usage (optional - for debugging)
-        print(f"  ⚡ Tokens used - Input: {message.usage.input_tokens}, Output: {message.usage.output_tokens}")
+        print(f"  ⚡ Tokens used ({message.model}) - Input: {message.usage.input_tokens}, Output: {message.usage.output_tokens}")
         # Track usage
         if self.cost_tracker:
-            self.cost_tracker.add_usage(message.usage.input_tokens, message.usage.output_tokens)
+            self.cost_tracker.add_usage(message.usage.input_tokens, message.usage.output_tokens, stage="budget", model=message.model)
         return {
             "budget_analysis": message.content[0].text,
             "num_days": num_days,
@@ -72,12 +90,64 @@ Keep response under 250 words. Be realistic and honest about costs."""
             "sources": [r["url"] for r in search_results.get("results", [])]
         }
     
+    def compare_costs(self, destinations: list, start_date: str, end_date: str, budget: float,
+                      interests: list, search_results: dict, deadline=None):
+        """
+        Estimate trip cost and season fit for several destinations in one call
+        The traveler's dates, budget and interests are written once, followed
+        by each city's cost passages.
+        Args:
+            search_results: Cost search results by destination
+        Returns:
+            Dict of estimates by destination (see src.utils.comparison)
+        """
+        from datetime import datetime
+        start = datetime.strptime(start_date, "%Y-%m-%d")
+        end = datetime.strptime(end_date, "%Y-%m-%d")
+        num_days = (end - start).days + 1
+
+        city_sections = "\n\n".join(
+            f"## {destination}\n"
+            f"{format_search_context(search_results.get(destination), self._cost_query(), COMPARE_CONTEXT_TOKENS, empty_message='No cost information available')}"
+            for destination in destinations
+        )
+        prompt = f"""You are a budget planning agent comparing destinations for one traveler.
+
+Travel Dates: {start_date} to {end_date} ({num_days} days)
+Total Budget: ${budget:.2f}
+Daily Budget: ${budget/num_days:.2f}
+Traveler Interests: {', '.join(interests)}
+
+Candidate destinations, with search results on costs:
+
+{city_sections}
+
+TASK: For EACH candidate, estimate the realistic cost of this trip for one
+traveler (mid-range lodging, food, local transport, and activities matching
+the interests), judge the budget, and rate how good these dates are to visit.
+Be realistic and honest about costs.
+
+Record every candidate with the record_cost_comparison tool."""
+
+        message = self.router.create_message(
+            self.client, "budget",
+            deadline=deadline,
+            max_tokens=150 * len(destinations) + 100,
+            tools=[COST_COMPARISON_TOOL],
+            tool_choice={"type": "tool", "name": COST_COMPARISON_TOOL["name"]},
+            messages=[{"role": "user", "content": prompt}]
+        )
+
+        print(f"  ⚡ Tokens used ({message.model}) - Input: {message.usage.input_tokens}, Output: {message.usage.output_tokens}")
+        if self.cost_tracker:
+            self.cost_tracker.add_usage(message.usage.input_tokens, message.usage.output_tokens, stage="compare", model=message.model)
+        return parse_cost_comparison(message, destinations)
+    
+    @staticmethod
+    def _cost_query():
+        return ("cost costs price prices per night day hotel hostel accommodation meal food restaurant "
+                "transport metro taxi ticket admission budget cheap expensive average $ € £ ¥ usd")
+    
     def _format_search_results(self, results):
-        """Format search results for Claude"""
-        if "error" in results:
-            return "No cost information available"
-        
-        formatted = []
-        for r in results.get("results", []):
-            formatted.append(f"- {r['title']}: {r['content'][:150]}...")
-        return "\n".join(formatted)
\ No newline at end of file
+        """Most relevant cost passages for Claude, answer first"""
+        return format_search_context(results, self._cost_query(), SEARCH_CONTEXT_TOKENS, empty_message="No cost information available")
\ No newline at end of file
@@ -0,0 +1,174 @@
+"""
+Popular-destination cache warmer.
+
+Mines recent trips for the most planned destinations and refreshes their
+geocoding, search and image cache entries and stored destination research
+before they expire, so the first plan of the day for a popular city starts warm.
+
+Run once from the command line:
+
+    python -m src.agents.cache_warmer --top 30 --max-api-calls 200
+
+or every N seconds inside the app with WARMER_INTERVAL=N.
+"""
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from src.agents.destination_agent import DestinationAgent
+from src.agents.budget_agent import BudgetAgent
+from src.database import DatabaseManager
+from src.database.usage_ledger import UsageLedger
+from src.tools import SearchTool, ImageTool, GeocodingTool
+from src.utils import CostTracker
+from src.utils.config import (
+    DB_PATH,
+    WARMER_TOP_DESTINATIONS,
+    WARMER_LOOKBACK_DAYS,
+    WARMER_MAX_API_CALLS,
+    WARMER_MAX_LLM_CALLS,
+    WARMER_CONCURRENCY,
+    WARMER_REFRESH_WINDOW,
+)
+
+def _is_error(value) -> bool:
+    return not isinstance(value, dict) or "error" in value
+
+class CacheWarmer:
+    def __init__(self, db=None, top_n=WARMER_TOP_DESTINATIONS, lookback_days=WARMER_LOOKBACK_DAYS,
+                 max_api_calls=WARMER_MAX_API_CALLS, max_llm_calls=WARMER_MAX_LLM_CALLS,
+                 concurrency=WARMER_CONCURRENCY, refresh_window=WARMER_REFRESH_WINDOW):
+        self.db = db or DatabaseManager(DB_PATH)
+        self.top_n = top_n
+        self.lookback_days = lookback_days
+        self.max_api_calls = max_api_calls
+        self.max_llm_calls = max_llm_calls
+        self.concurrency = concurrency
+        self.refresh_window = refresh_window
+
+        self.geo_tool = GeocodingTool()
+        self.search_tool = SearchTool()
+        self.image_tool = ImageTool()
+        # Warmer LLM usage is recorded in the ledger under its own key
+        self.cost_tracker = CostTracker(ledger=UsageLedger(DB_PATH), key_id="warmer")
+        self.dest_agent = DestinationAgent(cost_tracker=self.cost_tracker)
+
+    def _tasks(self, destination: str):
+        """(name, cache, key, fetch, uses_llm) for every entry a plan for this city reads"""
+        destination_query = DestinationAgent.search_query(destination)
+        budget_query = BudgetAgent.search_query(destination)
+        return [
+            ("geocode", self.geo_tool.cache, self.geo_tool.cache_key(destination),
+             lambda: self.geo_tool.get_coordinates(destination, refresh=True), False),
+            ("image", self.image_tool.cache, self.image_tool.cache_key(destination),
+             lambda: self.image_tool.get_destination_image(destination, refresh=True), False),
+            ("search", self.search_tool.cache, self.search_tool.cache_key(destination_query, 3),
+             lambda: self.search_tool.search(destination_query, max_results=3, refresh=True), False),
+            ("search", self.search_tool.cache, self.search_tool.cache_key(budget_query, 3),
+             lambda: self.search_tool.search(budget_query, max_results=3, refresh=True), False),
+            # Research goes last: it reads the entries above
+            ("research", self.dest_agent.knowledge, destination,
+             lambda: self.dest_agent.build_knowledge(destination), True),
+        ]
+
+    def run_once(self):
+        """
+        Warm the caches for the top destinations within the API budget
+        Returns:
+            Coverage report
+        """
+        started = time.time()
+        entries = self.db.get_top_destinations(days=self.lookback_days, limit=self.top_n)
+        report = {
+            "destinations": len(entries),
+            "entries": 0,
+            "already_warm": 0,
+            "refreshed": 0,
+            "failed": 0,
+            "skipped_over_budget": 0,
+            "api_calls": 0,
+            "llm_calls": 0,
+        }
+
+        tool_jobs, llm_jobs = [], []
+        for entry in entries:
+            for name, cache, key, fetch, uses_llm in self._tasks(entry["destination"]):
+                report["entries"] += 1
+                if not cache.needs_refresh(key, self.refresh_window):
+                    # Failed geocodes are cached for a while too; they are not warm
+                    report["failed" if _is_error(cache.get(key)) else "already_warm"] += 1
+                    continue
+                # Destinations are ranked by volume, so the budget goes to the busiest first
+                if uses_llm:
+                    if report["llm_calls"] >= self.max_llm_calls:
+                        report["skipped_over_budget"] += 1
+                        continue
+                    report["llm_calls"] += 1
+                    llm_jobs.append((name, cache, key, fetch))
+                else:
+                    if report["api_calls"] >= self.max_api_calls:
+                        report["skipped_over_budget"] += 1
+                        continue
+                    report["api_calls"] += 1
+                    tool_jobs.append((name, cache, key, fetch))
+
+        def run(job):
+            name, cache, key, fetch = job
+            try:
+                result = fetch()
+            except Exception as e:
+                print(f"[DEBUG] Warming {name} {key} failed: {e}")
+                return False
+            # Some failures are cached (e.g. geocoding misses), so check the result itself
+            return not _is_error(result) and not cache.needs_refresh(key, 0)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for jobs in (tool_jobs, llm_jobs):
+                for ok in executor.map(run, jobs):
+                    report["refreshed" if ok else "failed"] += 1
+
+        warm = report["already_warm"] + report["refreshed"]
+        report["coverage"] = round(warm / report["entries"], 3) if report["entries"] else 1.0
+        report["llm_cost_usd"] = round(self.cost_tracker.get_estimated_cost(), 4)
+        report["duration_s"] = round(time.time() - started, 1)
+        print(f"🔥 Cache warmer: {warm}/{report['entries']} entries warm across {report['destinations']} destinations")
+        return report
+
+def start_background_warmer(interval: float, warmer: CacheWarmer = None):
+    """
+    Run the warmer every interval seconds on a daemon thread
+    Returns:
+        threading.Event that stops the loop when set
+    """
+    stop = threading.Event()
+
+    def loop():
+        current = warmer or CacheWarmer()
+        while not stop.is_set():
+            try:
+                current.run_once()
+            except Exception as e:
+                print(f"❌ Cache warmer run failed: {e}")
+            stop.wait(interval)
+
+    threading.Thread(target=loop, name="cache-warmer", daemon=True).start()
+    return stop
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Prefetch caches for popular destinations")
+    parser.add_argument("--top", type=int, default=WARMER_TOP_DESTINATIONS, help="Number of destinations to warm")
+    parser.add_argument("--days", type=int, default=WARMER_LOOKBACK_DAYS, help="Look back this many days of trips")
+    parser.add_argument("--max-api-calls", type=int, default=WARMER_MAX_API_CALLS, help="Geocoding/search/image call budget")
+    parser.add_argument("--max-llm-calls", type=int, default=WARMER_MAX_LLM_CALLS, help="Destination research call budget")
+    parser.add_argument("--concurrency", type=int, default=WARMER_CONCURRENCY, help="Parallel requests")
+    parser.add_argument("--interval", type=float, default=0, help="Repeat every N seconds (0 = run once)")
+    args = parser.parse_args()
+
+    cli_warmer = CacheWarmer(top_n=args.top, lookback_days=args.days, max_api_calls=args.max_api_calls,
+                             max_llm_calls=args.max_llm_calls, concurrency=args.concurrency)
+    while True:
+        print(json.dumps(cli_warmer.run_once(), indent=2))
+        if not args.interval:
+            break
+        time.sleep(args.interval)
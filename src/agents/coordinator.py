@@ -1,10 +1,29 @@
 from typing import TypedDict, Annotated
+import copy
+import json
 import operator
+import threading
+import time
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 from langgraph.graph import StateGraph, END
 from src.agents import DestinationAgent, ActivityAgent
 from src.agents.budget_agent import BudgetAgent
-from src.agents.itinerary_agent import ItineraryAgent
+from src.agents.itinerary_agent import ItineraryAgent, split_days, join_days
+from src.utils.itinerary_model import compute_totals, day_total, render_day, render_itinerary
+from src.tools import GeocodingTool
 from src.utils import CostTracker
+from src.utils.scheduler import build_schedule
+from src.utils.model_router import ModelRouter
+from src.utils.single_flight import get_single_flight
+from src.utils.deadline import Deadline
+from src.utils.comparison import MIN_CANDIDATES, MAX_CANDIDATES, normalize_candidates, budget_fit, season_fit, rank_candidates
+from src.utils.profiling import start_profiler
+from src.utils.metrics import PLANS, PLANS_IN_PROGRESS, PLAN_DURATION, STAGE_DURATION
+from src.utils.config import PLAN_DEADLINE_S, DB_PATH
+from src.utils.admission import get_admission_controller, AdmissionRejected
+from src.database import DatabaseManager
+from src.database.usage_ledger import key_id_for
 
 class TravelPlanState(TypedDict):
     """State passed between agents"""
@@ -18,20 +37,45 @@ class TravelPlanState(TypedDict):
     destination_info: dict
     activities_info: dict
     budget_info: dict
+    schedule: list
     itinerary_info: dict
     
     # Final output
     final_plan: dict
     error: str
 
+# State key holding each stage's output
+STAGE_OUTPUTS = {
+    "research_destination": "destination_info",
+    "find_activities": "activities_info",
+    "analyze_budget": "budget_info",
+}
+
+# Identical plans requested at the same time run once; every caller gets the result
+_plan_flight = get_single_flight("plan")
+# Progress callbacks of all callers waiting on an in-flight plan, by plan key
+_plan_listeners = {}
+_plan_listeners_lock = threading.Lock()
+
 class TravelCoordinator:
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, router=None, deadline_s=PLAN_DEADLINE_S):
         self.api_key = api_key
-        self.cost_tracker = CostTracker()
-        self.dest_agent = DestinationAgent(api_key, self.cost_tracker)
-        self.activity_agent = ActivityAgent(api_key, self.cost_tracker)
-        self.budget_agent = BudgetAgent(api_key, self.cost_tracker)
-        self.itinerary_agent = ItineraryAgent(api_key, self.cost_tracker)
+        self.deadline_s = deadline_s
+        self.deadline = None
+        self.profiler = None
+        self.router = router or ModelRouter.from_config()
+        self.admission = get_admission_controller()
+        self.key_id = key_id_for(api_key)
+        self.cost_tracker = CostTracker(ledger=self.admission.ledger, key_id=self.key_id)
+        self.dest_agent = DestinationAgent(api_key, self.cost_tracker, self.router,
+                                           admission=self.admission, key_id=self.key_id)
+        self.activity_agent = ActivityAgent(api_key, self.cost_tracker, self.router)
+        self.budget_agent = BudgetAgent(api_key, self.cost_tracker, self.router)
+        self.itinerary_agent = ItineraryAgent(api_key, self.cost_tracker, self.router)
+        self.geo_tool = GeocodingTool()
+        # Per-stage timings and sources of the last plan, persisted as agent findings
+        self.stage_findings = {}
+        self._plan_key = None
         
         
         # Build the graph
@@ -42,24 +86,75 @@ class TravelCoordinator:
         workflow = StateGraph(TravelPlanState)
         
         # Add nodes
-        workflow.add_node("research_destination", self._research_destination)
-        workflow.add_node("find_activities", self._find_activities)
-        workflow.add_node("analyze_budget", self._analyze_budget)
-        workflow.add_node("build_itinerary", self._build_itinerary)
+        workflow.add_node("research_destination", self._stage("research_destination", self._research_destination))
+        workflow.add_node("find_activities", self._stage("find_activities", self._find_activities))
+        workflow.add_node("analyze_budget", self._stage("analyze_budget", self._analyze_budget))
+        workflow.add_node("plan_schedule", self._stage("plan_schedule", self._plan_schedule))
+        workflow.add_node("build_itinerary", self._stage("build_itinerary", self._build_itinerary))
         
         # Define edges
         workflow.set_entry_point("research_destination")
         workflow.add_edge("research_destination", "find_activities")
         workflow.add_edge("find_activities", "analyze_budget")
-        workflow.add_edge("analyze_budget", "build_itinerary")
+        workflow.add_edge("analyze_budget", "plan_schedule")
+        workflow.add_edge("plan_schedule", "build_itinerary")
         workflow.add_edge("build_itinerary", END)
         
         return workflow.compile()
     
+    def _admit(self):
+        """Admission for one plan, reserving only the tokens it hasn't recorded yet"""
+        baseline = self.cost_tracker.get_total_tokens()
+        return self.admission.admit(self.key_id, spent=lambda: self.cost_tracker.get_total_tokens() - baseline)
+    
+    def _stage(self, name, node):
+        """Wrap a node to record its duration and sources"""
+        def run(state: TravelPlanState) -> TravelPlanState:
+            self._notify(name, "started")
+            if self.deadline:
+                self.deadline.start_stage(name)
+            started = time.time()
+            if self.profiler:
+                with self.profiler.thread():
+                    state = node(state)
+            else:
+                state = node(state)
+            duration = time.time() - started
+            STAGE_DURATION.observe(duration, stage=name)
+            finding = {"duration_s": round(duration, 3)}
+            output = STAGE_OUTPUTS.get(name)
+            if output and state.get(output, {}).get("sources"):
+                finding["sources"] = state[output]["sources"]
+            self.stage_findings[name] = finding
+            self._notify(name, "completed")
+            return state
+        return run
+    
+    def _notify(self, stage, status):
+        """Report progress to every caller waiting on this plan"""
+        with _plan_listeners_lock:
+            callbacks = list(_plan_listeners.get(self._plan_key, []))
+        for callback in callbacks:
+            try:
+                callback(stage, status)
+            except Exception as e:
+                print(f"[DEBUG] Progress callback failed: {e!r}")
+    
+    def plan_key(self, destination, start_date, end_date, budget, interests):
+        """Requests with the same key produce the same plan and can share one run"""
+        return json.dumps([
+            self.key_id,
+            " ".join(destination.lower().split()),
+            start_date,
+            end_date,
+            float(budget),
+            sorted(i.strip().lower() for i in interests),
+        ])
+    
     def _research_destination(self, state: TravelPlanState) -> TravelPlanState:
         """Node: Research destination"""
         print("🔍 Researching destination...")
-        result = self.dest_agent.research(state["destination"], state["interests"])
+        result = self.dest_agent.research(state["destination"], state["interests"], deadline=self.deadline)
         state["destination_info"] = result
         return state
     
@@ -71,7 +166,8 @@ class TravelCoordinator:
             state["interests"],
             state["start_date"],
             state["end_date"],
-            state["destination_info"].get("coordinates", {})
+            state["destination_info"].get("coordinates", {}),
+            deadline=self.deadline
         )
         state["activities_info"] = result
         return state
@@ -84,11 +180,36 @@ class TravelCoordinator:
             state["start_date"],
             state["end_date"],
             state["budget"],
-            state["activities_info"].get("activities", "")
+            state["activities_info"].get("activity_records", []),
+            deadline=self.deadline
         )
         state["budget_info"] = result
         return state
     
+    def _plan_schedule(self, state: TravelPlanState) -> TravelPlanState:
+        """Node: Geocode activities and schedule them into days locally"""
+        print("🗺️ Scheduling activities...")
+        start = datetime.strptime(state["start_date"], "%Y-%m-%d")
+        end = datetime.strptime(state["end_date"], "%Y-%m-%d")
+        dates = [(start + timedelta(days=i)).strftime("%Y-%m-%d") for i in range((end - start).days + 1)]
+
+        activities = state["activities_info"].get("activity_records", [])
+        center = state["destination_info"].get("coordinates", {})
+        bias = center if "lat" in center else None
+        queries = [f"{a['location'] or a['name']}, {state['destination']}" for a in activities]
+        timeout = self.deadline.stage_remaining() if self.deadline else None
+        geocoded = self.geo_tool.get_coordinates_batch(queries, bias=bias, timeout=timeout)
+        skipped = sum(1 for q in set(queries) if geocoded[q].get("error", "").startswith("Skipped"))
+        if skipped:
+            self.deadline.degrade("activity locations", f"{skipped} not geocoded in time, scheduled without a map position")
+        coordinates = [
+            (geocoded[q]["lat"], geocoded[q]["lon"]) if "lat" in geocoded[q] else None
+            for q in queries
+        ]
+
+        state["schedule"] = build_schedule(activities, coordinates, dates, center=center)
+        return state
+    
     def _build_itinerary(self, state: TravelPlanState) -> TravelPlanState:
         """Node: Build final itinerary"""
         print("📅 Building itinerary...")
@@ -97,10 +218,13 @@ class TravelCoordinator:
             state["start_date"],
             state["end_date"],
             state["destination_info"].get("research", ""),
-            state["activities_info"].get("activities", ""),
+            state["schedule"],
             state["budget_info"].get("budget_analysis", ""),
-            state["activities_info"].get("season_context", "")
+            state["activities_info"].get("season_context", ""),
+            deadline=self.deadline
         )
+        days = result.get("days", [])
+        totals = compute_totals(days, state["budget"])
         
         # Compile final plan
         state["final_plan"] = {
@@ -110,20 +234,57 @@ class TravelCoordinator:
             "destination_overview": state["destination_info"].get("research", ""),
             "destination_image": state["destination_info"].get("image", {}),
             "season_context": state["activities_info"].get("season_context", ""),
+            "activities": state["activities_info"].get("activity_records", []),
+            "schedule": state["schedule"],
             "budget_analysis": state["budget_info"].get("budget_analysis", ""),
-            "itinerary": result.get("itinerary", ""),
-            "num_days": result.get("num_days", 0)
+            "itinerary": render_itinerary(days, totals),
+            "itinerary_days": days,
+            "cost_totals": totals,
+            "num_days": result.get("num_days", 0),
+            "deadline": self.deadline.get_summary() if self.deadline else None
         }
         
         return state
     
     def plan_trip(self, destination: str, start_date: str, end_date: str, 
-                  budget: float, interests: list):
+                  budget: float, interests: list, progress_callback=None, profile=None):
         """
         Main entry point - orchestrate all agents to create travel plan
+        progress_callback(stage, status) is called as each stage starts and completes
+        profile=True profiles this plan (see src.utils.profiling); None follows PROFILE_PLANS
         """
         # Validate trip duration
-        from datetime import datetime
+        error = self._check_dates(start_date, end_date)
+        if error:
+            return error
+        plan_key = self.plan_key(destination, start_date, end_date, budget, interests)
+        if progress_callback:
+            with _plan_listeners_lock:
+                _plan_listeners.setdefault(plan_key, []).append(progress_callback)
+        try:
+            (plan, findings), shared = _plan_flight.do(
+                plan_key,
+                lambda: self._run_plan(plan_key, destination, start_date, end_date, budget, interests, profile)
+            )
+        finally:
+            if progress_callback:
+                with _plan_listeners_lock:
+                    _plan_listeners[plan_key].remove(progress_callback)
+                    if not _plan_listeners[plan_key]:
+                        del _plan_listeners[plan_key]
+        
+        # Callers annotate their plan (e.g. with a trip id), so each gets its own copy
+        plan, self.stage_findings = copy.deepcopy((plan, findings))
+        if shared:
+            PLANS.inc(outcome="coalesced")
+            print(f"🔗 Joined an identical plan already in progress for {destination}")
+            if "usage_stats" in plan:
+                plan["usage_stats"] = dict(self.cost_tracker.get_summary(), coalesced=True)
+        return plan
+    
+    @staticmethod
+    def _check_dates(start_date, end_date):
+        """Error dict for an unsupported date range, else None"""
         start = datetime.strptime(start_date, "%Y-%m-%d")
         end = datetime.strptime(end_date, "%Y-%m-%d")
         num_days = (end - start).days + 1
@@ -137,6 +298,97 @@ class TravelCoordinator:
             return {
                 "error": "Invalid date range. End date must be after start date."
             }
+        return None
+    
+    def compare_destinations(self, destinations: list, start_date: str, end_date: str,
+                             budget: float, interests: list):
+        """
+        Compare candidate cities for the same dates, budget and interests
+        Research and cost searches run concurrently per city
+        (stored research is reused), then one LLM call estimates costs for all
+        of them. No itineraries are written: plan the picked city with plan_trip,
+        which reuses the research and searches done here.
+        Returns:
+            Dict with the ranked "destinations", or "error"
+        """
+        error = self._check_dates(start_date, end_date)
+        if error:
+            return error
+        cities = normalize_candidates(destinations)
+        if not MIN_CANDIDATES <= len(cities) <= MAX_CANDIDATES:
+            return {"error": f"Compare {MIN_CANDIDATES} to {MAX_CANDIDATES} different destinations"}
+        
+        def gather(city):
+            research = self.dest_agent.research(city, interests, deadline=self.deadline)
+            costs = self.budget_agent.search_tool.search(
+                self.budget_agent.search_query(city), max_results=3,
+                timeout=self.deadline.tool_timeout(10) if self.deadline else 10
+            )
+            return research, costs
+        
+        started = time.time()
+        try:
+            with self._admit():
+                self.deadline = Deadline(self.deadline_s) if self.deadline_s else None
+                if self.deadline:
+                    self.deadline.start_stage("compare_destinations")
+                print(f"🔀 Comparing {', '.join(cities)}...")
+                with ThreadPoolExecutor(max_workers=len(cities), thread_name_prefix="compare") as pool:
+                    gathered = dict(zip(cities, pool.map(gather, cities)))
+                estimates = self.budget_agent.compare_costs(
+                    cities, start_date, end_date, budget, interests,
+                    {city: costs for city, (_, costs) in gathered.items()},
+                    deadline=self.deadline
+                )
+        except AdmissionRejected as e:
+            print(f"⏳ Comparison not admitted: {e.reason}")
+            return {"error": e.reason, "retry_after": e.retry_after}
+        except Exception as e:
+            print(f"❌ Error comparing destinations: {e}")
+            return {"error": str(e)}
+        STAGE_DURATION.observe(time.time() - started, stage="compare_destinations")
+        
+        candidates = []
+        for city, (research, _) in gathered.items():
+            estimate = estimates.get(city, {})
+            candidates.append({
+                "destination": city,
+                "overview": research["research"].split("\n", 1)[0],
+                "image": research.get("image", {}),
+                "daily_cost_usd": estimate.get("daily_cost_usd"),
+                "estimated_total_usd": estimate.get("estimated_total_usd"),
+                "verdict": estimate.get("verdict"),
+                "season_rating": estimate.get("season_rating"),
+                "summary": estimate.get("summary", ""),
+                "budget_fit": budget_fit(estimate.get("estimated_total_usd"), budget),
+                "season_fit": season_fit(estimate.get("season_rating")),
+            })
+        return {
+            "destinations": rank_candidates(candidates),
+            "dates": f"{start_date} to {end_date}",
+            "start_date": start_date,
+            "end_date": end_date,
+            "budget": budget,
+            "interests": interests,
+            "deadline": self.deadline.get_summary() if self.deadline else None,
+            "usage_stats": self.cost_tracker.get_summary(),
+        }
+    
+    def _run_plan(self, plan_key, destination, start_date, end_date, budget, interests, profile=None):
+        """Run the graph once (profiled if requested); returns (plan, stage findings)"""
+        self.profiler = start_profiler(destination, profile)
+        try:
+            plan, findings = self._invoke_graph(plan_key, destination, start_date, end_date, budget, interests)
+        finally:
+            profiler, self.profiler = self.profiler, None
+        if profiler:
+            plan["profile"] = profiler.finish({"destination": destination, "stages": findings})
+        return plan, findings
+    
+    def _invoke_graph(self, plan_key, destination, start_date, end_date, budget, interests):
+        """Run the graph once; returns (plan, stage findings)"""
+        self.stage_findings = {}
+        self._plan_key = plan_key
         initial_state = {
             "destination": destination,
             "start_date": start_date,
@@ -146,19 +398,129 @@ class TravelCoordinator:
             "destination_info": {},
             "activities_info": {},
             "budget_info": {},
+            "schedule": [],
             "itinerary_info": {},
             "final_plan": {},
             "error": ""
         }
         
+        started = None
         try:
-            # Run the graph
-            final_state = self.graph.invoke(initial_state)
+            # Admission control: queue or reject before any upstream call is made
+            with self._admit():
+                # The clock starts once admitted; time queued is bounded by admission control
+                started = time.time()
+                self.deadline = Deadline(self.deadline_s) if self.deadline_s else None
+                PLANS_IN_PROGRESS.inc()
+                try:
+                    # Run the graph
+                    final_state = self.graph.invoke(initial_state)
+                finally:
+                    PLANS_IN_PROGRESS.dec()
             # Add cost tracking info
             final_state["final_plan"]["usage_stats"] = self.cost_tracker.get_summary()
-            return final_state["final_plan"]
+            self._record_plan("ok", started)
+            return final_state["final_plan"], self.stage_findings
+        except AdmissionRejected as e:
+            print(f"⏳ Plan not admitted: {e.reason}")
+            self._record_plan("rejected", started)
+            return {"error": e.reason, "retry_after": e.retry_after}, {}
         except Exception as e:
+            self._record_plan("error", started)
             print(f"❌ Error in coordination: {e}")
             import traceback
             traceback.print_exc()
-            return {"error": str(e)}
\ No newline at end of file
+            return {"error": str(e)}, {}
+    
+    def regenerate_day(self, trip_id: int, day_index: int, feedback: str = "", db=None):
+        """
+        Rewrite one day of a saved trip with a single LLM call and save it back
+        Reuses the stored schedule, activities, budget and season context; the
+        neighbouring days are passed as context and left unchanged.
+        Args:
+            day_index: 0-based day of the trip
+            feedback: What the traveler wants changed
+        Returns:
+            Updated plan, or dict with "error"
+        """
+        db = db or DatabaseManager(DB_PATH)
+        trip = db.get_trip(trip_id)
+        if trip is None:
+            return {"error": "Trip not found"}
+        plan = json.loads(trip["itinerary_json"] or "{}")
+        # Trips saved before itineraries were structured only have the markdown
+        structured = plan.get("itinerary_days")
+        if structured:
+            preamble, days = "", [render_day(day) for day in structured]
+        else:
+            preamble, days = split_days(plan.get("itinerary", ""))
+        schedule = plan.get("schedule") or []
+        num_days = plan.get("num_days") or len(schedule) or len(days)
+        if not 0 <= day_index < num_days:
+            return {"error": f"Day {day_index + 1} is not part of this {num_days}-day trip"}
+        if not days:
+            return {"error": "No day sections were found in this itinerary; generate a new trip"}
+        if day_index >= len(days):
+            return {"error": f"The itinerary is missing Day {day_index + 1}; generate a new trip"}
+        
+        day_schedule = schedule[day_index] if day_index < len(schedule) else None
+        date = day_schedule["date"] if day_schedule else \
+            (datetime.strptime(trip["start_date"], "%Y-%m-%d") + timedelta(days=day_index)).strftime("%Y-%m-%d")
+        used_elsewhere = {
+            activity["name"]
+            for day in schedule if day is not day_schedule
+            for slot in day["slots"].values() for activity in slot
+        }
+        alternatives = [a for a in plan.get("activities", []) if a.get("name") not in used_elsewhere]
+        
+        try:
+            with self._admit():
+                result = self.itinerary_agent.regenerate_day(
+                    plan.get("destination", trip["destination"]),
+                    date,
+                    day_index + 1,
+                    num_days,
+                    day_schedule,
+                    days[day_index] if day_index < len(days) else "",
+                    days[day_index - 1] if day_index > 0 else "",
+                    days[day_index + 1] if day_index + 1 < len(days) else "",
+                    feedback,
+                    alternatives,
+                    plan.get("budget_analysis", ""),
+                    plan.get("season_context", ""),
+                )
+        except AdmissionRejected as e:
+            print(f"⏳ Day regeneration not admitted: {e.reason}")
+            return {"error": e.reason, "retry_after": e.retry_after}
+        except Exception as e:
+            print(f"❌ Error regenerating day {day_index + 1}: {e}")
+            return {"error": str(e)}
+        
+        if structured:
+            structured[day_index:day_index + 1] = [result["day"]]
+            plan["cost_totals"] = compute_totals(structured, plan.get("budget", trip["budget"]))
+            plan["itinerary"] = render_itinerary(structured, plan["cost_totals"])
+        else:
+            result["day"]["total_usd"] = day_total(result["day"])
+            days[day_index:day_index + 1] = [render_day(result["day"])]
+            plan["itinerary"] = join_days(preamble, days)
+        usage = self.cost_tracker.get_summary()
+        plan.setdefault("revisions", []).append({
+            "day": day_index + 1,
+            "feedback": feedback,
+            "input_tokens": usage["input_tokens"],
+            "output_tokens": usage["output_tokens"],
+            "estimated_cost_usd": usage["estimated_cost_usd"],
+        })
+        if not db.update_trip_itinerary(trip_id, plan):
+            return {"error": "Trip not found"}
+        db.save_agent_finding(trip_id, "itinerary_revision", plan["revisions"][-1])
+        print(f"✏️ Regenerated day {day_index + 1} of trip {trip_id}")
+        return plan
+    
+    @staticmethod
+    def _record_plan(outcome, started=None):
+        """Count a finished plan, and time it if it was admitted"""
+        PLANS.inc(outcome=outcome)
+        if started is not None:
+            PLAN_DURATION.observe(time.time() - started, outcome=outcome)
@@ -1,70 +1,160 @@
-from anthropic import Anthropic
+import threading
+from src.utils.cassette import anthropic_client
 from src.tools import SearchTool, ImageTool, GeocodingTool
-from src.utils.config import ANTHROPIC_API_KEY
+from src.utils.config import ANTHROPIC_API_KEY, DB_PATH
+from src.utils.model_router import ModelRouter
+from src.utils.snippets import format_search_context
+from src.utils.single_flight import get_single_flight
+from src.utils.metrics import CACHE_LOOKUPS
+from src.utils.cost_tracker import CostTracker
+from src.utils.admission import AdmissionRejected
+from src.utils.destination_knowledge import KNOWLEDGE_TOOL, parse_knowledge, assemble_view
+from src.database.knowledge_store import KnowledgeStore
+
+# Research passages to keep: the largest budget, since research covers every interest at once
+SEARCH_CONTEXT_TOKENS = 300
 
 class DestinationAgent:
-    def __init__(self, api_key=None, cost_tracker=None):
-        self.client = Anthropic(api_key=api_key or ANTHROPIC_API_KEY)
+    def __init__(self, api_key=None, cost_tracker=None, router=None, knowledge=None, admission=None, key_id=None):
+        self.client = anthropic_client(api_key or ANTHROPIC_API_KEY)
         self.search_tool = SearchTool()
         self.image_tool = ImageTool()
         self.geo_tool = GeocodingTool()
         self.cost_tracker = cost_tracker
-    
-    def research(self, destination: str, interests: list):
+        self.router = router or ModelRouter.from_config()
+        # Research is stored per destination; only the interest view is per plan
+        self.knowledge = knowledge or KnowledgeStore(DB_PATH)
+        self.flight = get_single_flight("knowledge")
+        # Background refreshes take their own admission slot, billed to the plan's key
+        self.admission = admission
+        self.key_id = key_id
+
+    @staticmethod
+    def search_query(destination: str):
+        return f"{destination} travel guide attractions things to do"
+
+    def research(self, destination: str, interests: list, refresh: bool = False, deadline=None):
         """
         Research destination and find relevant information
+        Stored research is reused while fresh (see src.database.knowledge_store)
+        and only the interest-specific view is assembled for this plan.
+        With a deadline, lookups that no longer fit are skipped (the research
+        then falls back to model knowledge) and recorded as degradations.
         """
         # Get coordinates for location context
-        coordinates = self.geo_tool.get_coordinates(destination)
-        
-        # Search for general destination info
-        search_query = f"{destination} travel guide attractions things to do"
-        search_results = self.search_tool.search(search_query, max_results=3)
-        
+        coordinates = self.geo_tool.get_coordinates(destination, timeout=deadline.tool_timeout(10) if deadline else 10)
+        if deadline and "error" in coordinates:
+            deadline.degrade("coordinates", coordinates["error"])
+
+        entry = None if refresh else self.knowledge.get(destination)
+        if not refresh:
+            CACHE_LOOKUPS.inc(namespace="knowledge", result=entry["status"] if entry else "miss")
+        if entry and entry["status"] != "expired":
+            print(f"  ♻️ Using stored destination research (v{entry['version']}, {entry['status']})")
+            if entry["status"] == "stale":
+                self._refresh_in_background(destination)
+        else:
+            entry = self.build_knowledge(destination, deadline=deadline)
+
         # Get destination image
-        image_data = self.image_tool.get_destination_image(destination)
-        
+        image_data = self.image_tool.get_destination_image(destination, timeout=deadline.tool_timeout(10) if deadline else 10)
+        if deadline and "error" in image_data:
+            deadline.degrade("image", image_data["error"])
+
+        return {
+            "research": assemble_view(entry["sections"], interests),
+            "image": image_data,
+            "coordinates": coordinates,
+            "sources": entry["sources"],
+            "knowledge": {k: entry[k] for k in ("version", "status", "refreshed_at")}
+        }
+
+    def build_knowledge(self, destination: str, deadline=None, cost_tracker=None):
+        """
+        Research a destination for all interests with one LLM call and store it
+        Concurrent builds for the same destination are coalesced.
+        Args:
+            cost_tracker: Tracker to bill instead of the agent's own
+        """
+        entry, _ = self.flight.do(KnowledgeStore.key_for(destination),
+                                  lambda: self._build_knowledge(destination, deadline, cost_tracker))
+        return entry
+
+    def _build_knowledge(self, destination: str, deadline=None, cost_tracker=None):
+        # Search for general destination info
+        search_results = self.search_tool.search(self.search_query(destination), max_results=3,
+                                                 timeout=deadline.tool_timeout(10) if deadline else 10)
+        degraded = "error" in search_results
+        if deadline and degraded:
+            deadline.degrade("destination search", search_results["error"])
+
         # Use Claude to synthesize information
         prompt = f"""You are a destination research agent for a travel planner.
 
 Destination: {destination}
-Traveler interests: {', '.join(interests)}
 
 Search results summary:
-{self._format_search_results(search_results)}
+{self._format_search_results(search_results, destination)}
+
+This research is reused for travelers with different interests, so cover a
+broad range: tag each attraction and neighborhood with the interests it suits.
 
-Provide:
+Record:
 1. Brief destination overview (2-3 sentences)
-2. Top 5 must-see attractions matching interests
-3. Cultural tips or local customs
-4. Best neighborhoods to explore
+2. 10-12 must-see attractions
+3. 4-6 neighborhoods worth exploring
+4. 3-5 cultural tips or local customs
 
-Keep response under 200 words."""
+Record the research with the record_destination_research tool."""
 
-        message = self.client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=400,
+        message = self.router.create_message(
+            self.client, "destination",
+            deadline=deadline,
+            max_tokens=1200,
+            tools=[KNOWLEDGE_TOOL],
+            tool_choice={"type": "tool", "name": KNOWLEDGE_TOOL["name"]},
             messages=[{"role": "user", "content": prompt}]
         )
-        
+
         # Log token usage (optional - for debugging)
-        print(f"  ⚡ Tokens used - Input: {message.usage.input_tokens}, Output: {message.usage.output_tokens}")
+        print(f"  ⚡ Tokens used ({message.model}) - Input: {message.usage.input_tokens}, Output: {message.usage.output_tokens}")
         # Track usage
-        if self.cost_tracker:
-            self.cost_tracker.add_usage(message.usage.input_tokens, message.usage.output_tokens)
-        return {
-            "research": message.content[0].text,
-            "image": image_data,
-            "coordinates": coordinates,
-            "sources": [r["url"] for r in search_results.get("results", [])]
-        }
-    
-    def _format_search_results(self, results):
-        """Format search results for Claude"""
-        if "error" in results:
-            return "No search results available"
-        
-        formatted = []
-        for r in results.get("results", []):
-            formatted.append(f"- {r['title']}: {r['content'][:200]}...")
-        return "\n".join(formatted)
\ No newline at end of file
+        cost_tracker = cost_tracker or self.cost_tracker
+        if cost_tracker:
+            cost_tracker.add_usage(message.usage.input_tokens, message.usage.output_tokens, stage="destination", model=message.model)
+
+        sections = parse_knowledge(message)
+        sources = [r["url"] for r in search_results.get("results", [])]
+        entry = {"sections": sections, "sources": sources, "version": None, "status": "unsaved", "refreshed_at": None}
+        # Research written without its search, or truncated, is used once but not kept
+        if not degraded and sections["overview"] and sections["attractions"]:
+            entry["version"] = self.knowledge.put(destination, sections, sources, model=message.model)
+            entry["status"] = "fresh"
+            entry["refreshed_at"] = self.knowledge.get(destination)["refreshed_at"]
+        return entry
+
+    def _refresh_in_background(self, destination: str):
+        """
+        Rebuild stale research without holding up the current plan
+        With an admission controller the refresh waits for its own slot and is
+        billed to its own tracker, so it counts against the key's quota without
+        adding to the current plan's usage.
+        """
+        def run():
+            try:
+                if self.admission is None:
+                    self.build_knowledge(destination)
+                    return
+                tracker = CostTracker(ledger=self.admission.ledger, key_id=self.key_id)
+                with self.admission.admit(self.key_id, spent=tracker.get_total_tokens):
+                    self.build_knowledge(destination, cost_tracker=tracker)
+            except AdmissionRejected as e:
+                print(f"[DEBUG] Background research refresh for {destination} skipped: {e.reason}")
+            except Exception as e:
+                print(f"[DEBUG] Background research refresh for {destination} failed: {e}")
+        threading.Thread(target=run, name="knowledge-refresh", daemon=True).start()
+
+    def _format_search_results(self, results, destination: str):
+        """Most relevant search passages for Claude, answer first"""
+        query = f"{destination} attractions must-see landmarks neighborhoods culture history food customs etiquette tips"
+        return format_search_context(results, query, SEARCH_CONTEXT_TOKENS)
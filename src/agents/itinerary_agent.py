@@ -1,18 +1,54 @@
-from anthropic import Anthropic
+import re
+from datetime import datetime, timedelta
+from src.utils.cassette import anthropic_client
 from src.utils.config import ANTHROPIC_API_KEY
+from src.utils.model_router import ModelRouter
+from src.utils.scheduler import serialize_schedule
+from src.utils.itinerary_model import ITINERARY_TOOL, parse_itinerary, outline_day
+
+# Day headings as rendered by src.utils.itinerary_model ("**Day 3 - 2026-05-03 - Sunday**"),
+# but not the "**Day 3 Total Estimated Cost**" lines
+DAY_HEADING = re.compile(r"^[#*\s]*Day\s+(\d+)\b(?!\s+Total)", re.MULTILINE | re.IGNORECASE)
+# Output budget for rewriting a single day
+DAY_MAX_TOKENS = 700
+# Characters of each neighbouring day given as context
+NEIGHBOR_CONTEXT_CHARS = 900
+
+def split_days(itinerary: str):
+    """
+    Split an itinerary into the text before Day 1 and one section per day
+    Returns:
+        (preamble, [day 1 section, day 2 section, ...])
+    """
+    starts = []
+    for match in DAY_HEADING.finditer(itinerary or ""):
+        # Later mentions of an earlier day (e.g. in tips) are not headings
+        if int(match.group(1)) == len(starts) + 1:
+            starts.append(match.start())
+    if not starts:
+        return itinerary or "", []
+    bounds = starts + [len(itinerary)]
+    days = [itinerary[bounds[i]:bounds[i + 1]].strip() for i in range(len(starts))]
+    return itinerary[:starts[0]].strip(), days
+
+def join_days(preamble: str, days: list) -> str:
+    return "\n\n".join([preamble] + days if preamble else days)
 
 class ItineraryAgent:
-    def __init__(self, api_key=None, cost_tracker=None):
-        self.client = Anthropic(api_key=api_key or ANTHROPIC_API_KEY)
+    def __init__(self, api_key=None, cost_tracker=None, router=None):
+        self.client = anthropic_client(api_key or ANTHROPIC_API_KEY)
         self.cost_tracker = cost_tracker
+        self.router = router or ModelRouter.from_config()
     def build_itinerary(self, destination: str, start_date: str, end_date: str, 
-                   destination_info: str, activities: str, budget_info: str, 
-                   season_context: str):
+                   destination_info: str, schedule: list, budget_info: str, 
+                   season_context: str, deadline=None):
         """
-        Synthesize all research into a day-by-day itinerary
+        Write the day-by-day itinerary for a precomputed schedule
+        (see src.utils.scheduler.build_schedule)
+        Returns:
+            Dict with one DayPlan per day (see src.utils.itinerary_model);
+            totals are left to compute_totals
         """
-        from datetime import datetime, timedelta
-        
         # Generate list of dates
         start = datetime.strptime(start_date, "%Y-%m-%d")
         end = datetime.strptime(end_date, "%Y-%m-%d")
@@ -37,63 +73,140 @@ class ItineraryAgent:
     Season & Weather Context:
     {season_context}
 
-    Available Activities:
-    {activities}
+    Planned Schedule (already grouped by area and ordered for the shortest route;
+    slot: name | location | duration | cost tier | indoor/outdoor):
+    {serialize_schedule(schedule)}
 
     Budget Considerations:
     {budget_info[:200]}
 
-    TASK: Create a day-by-day itinerary with the following structure for EACH day:
-
-    **Day [X] - [Date] - [Day of Week]**
-
-    **Morning (9am-12pm):**
-    - [Activity name and location]
-    - [Brief description and why it's scheduled in morning]
-    - Estimated cost: $[amount]
-
-    **Midday (12pm-5pm):**
-    - [Activity name and location]
-    - [Include lunch suggestion]
-    - Estimated cost: $[amount]
-
-    **Evening (5pm-10pm):**
-    - [Activity name and location]
-    - [Include dinner suggestion]
-    - Estimated cost: $[amount]
-
-    **Night (Optional, 10pm+):**
-    - [Optional nightlife/relaxation activity]
-    - Estimated cost: $[amount]
-
-    **Day [X] Total Estimated Cost: $[sum]**
+    TASK: Record the itinerary for this schedule with the record_itinerary tool,
+    one entry per day (day 1 to {num_days}), keeping each activity on its day and
+    in its slot. For each slot give the activity, where it is, a short
+    description of why it fits that time of day, a meal suggestion for the
+    Midday and Evening slots, and the estimated cost per traveler in USD.
+    Add the night's lodging cost for each day (0 on the last day). Do not add
+    up costs; day and trip totals are computed from your numbers.
 
     IMPORTANT:
-    - Balance indoor/outdoor activities based on season
-    - Group activities by geographic proximity to minimize travel time
+    - Follow the planned schedule; do not move activities between days or slots
+    - Fill empty slots with light suggestions near that day's other stops
     - Include meal suggestions that match the area you're in
-    - Vary the pace - don't overschedule
+    - Vary the pace - don't overschedule; the Night slot is optional
     - Consider typical opening hours
-    - End each day with realistic daily cost estimate
-    - Make it feel natural and enjoyable, not rushed
-    - Be concise but specific
+    - Keep costs realistic for the budget above
+    - Be concise but specific"""
 
-    Create the full {num_days}-day itinerary now. Keep each day's description focused and actionable."""
-
-        message = self.client.messages.create(
-            model="claude-sonnet-4-20250514",
+        message = self.router.create_message(
+            self.client, "itinerary",
+            deadline=deadline,
             max_tokens=max_tokens,
+            tools=[ITINERARY_TOOL],
+            tool_choice={"type": "tool", "name": ITINERARY_TOOL["name"]},
             messages=[{"role": "user", "content": prompt}]
         )
         
         # Log token usage (optional - for debugging)
-        print(f"  ⚡ Tokens used - Input: {message.usage.input_tokens}, Output: {message.usage.output_tokens}")
+        print(f"  ⚡ Tokens used ({message.model}) - Input: {message.usage.input_tokens}, Output: {message.usage.output_tokens}")
         # Track usage
         if self.cost_tracker:
-            self.cost_tracker.add_usage(message.usage.input_tokens, message.usage.output_tokens)
+            self.cost_tracker.add_usage(message.usage.input_tokens, message.usage.output_tokens, stage="itinerary", model=message.model)
+
+        # Days cut off (e.g. by the deadline) are outlined from the schedule
+        written = {day["day"]: day for day in parse_itinerary(message, dates)}
+        missing = [i + 1 for i in range(num_days) if i + 1 not in written]
+        if missing:
+            print(f"[DEBUG] Itinerary missing days {missing}, outlining them from the schedule")
+            if deadline is not None:
+                deadline.degrade("itinerary days", f"{', '.join(f'Day {n}' for n in missing)} outlined from the schedule")
+        days = [
+            written.get(i + 1) or outline_day(i + 1, dates[i], schedule[i] if i < len(schedule) else None)
+            for i in range(num_days)
+        ]
         return {
-            "itinerary": message.content[0].text,
+            "days": days,
             "num_days": num_days,
             "dates": dates,
             "tokens_used": message.usage.output_tokens
-        }
\ No newline at end of file
+        }
+
+    def regenerate_day(self, destination: str, date: str, day_number: int, num_days: int,
+                       day_schedule: dict, current_day: str, previous_day: str, next_day: str,
+                       feedback: str, alternatives: list, budget_info: str, season_context: str,
+                       deadline=None):
+        """
+        Rewrite one day of an existing itinerary
+        Args:
+            day_schedule: This day's entry of the stored schedule (or None)
+            current_day, previous_day, next_day: Day sections of the current itinerary ("" if none)
+            feedback: What the traveler wants changed
+            alternatives: Activity records not scheduled on other days
+        Returns:
+            Dict with the new DayPlan
+        """
+        weekday = datetime.strptime(date, "%Y-%m-%d").strftime("%A")
+        alternative_lines = "\n".join(
+            f"- {a['name']} | {a.get('location') or ''} | {a.get('cost_tier', '')} | {a.get('setting', '')}"
+            for a in alternatives
+        ) or "(none)"
+
+        prompt = f"""You are an itinerary building agent. Rewrite ONE day of an existing {num_days}-day itinerary.
+
+    Destination: {destination}
+    Day to rewrite: Day {day_number} - {date} - {weekday}
+
+    Traveler feedback on this day:
+    {feedback or "(none - offer a fresh take on the day)"}
+
+    Planned schedule for this day (slot: name | location | duration | cost tier | indoor/outdoor):
+    {serialize_schedule([day_schedule]) if day_schedule else "(none)"}
+
+    Other activities found for this trip, not used on other days:
+    {alternative_lines}
+
+    Current version of this day:
+    {current_day[:NEIGHBOR_CONTEXT_CHARS] or "(missing)"}
+
+    Previous day (keep as is, for context):
+    {previous_day[:NEIGHBOR_CONTEXT_CHARS] or "(none - this is the first day)"}
+
+    Next day (keep as is, for context):
+    {next_day[:NEIGHBOR_CONTEXT_CHARS] or "(none - this is the last day)"}
+
+    Season & Weather Context:
+    {season_context[:300]}
+
+    Budget Considerations:
+    {budget_info[:200]}
+
+    TASK: Record only Day {day_number} with the record_itinerary tool, using the
+    same slots as the other days (Morning, Midday, Evening, optional Night), each
+    with a meal suggestion where it fits and the estimated cost per traveler in
+    USD, plus the night's lodging cost (0 on the last day). Do not add up costs.
+
+    IMPORTANT:
+    - Address the feedback; keep the planned activities it doesn't object to
+    - Replace rejected activities with alternatives from the list, or nearby ideas
+    - Don't repeat activities or restaurants from the previous or next day
+    - Keep the pace realistic and respect typical opening hours
+    - Be concise but specific"""
+
+        message = self.router.create_message(
+            self.client, "itinerary",
+            deadline=deadline,
+            max_tokens=DAY_MAX_TOKENS,
+            tools=[ITINERARY_TOOL],
+            tool_choice={"type": "tool", "name": ITINERARY_TOOL["name"]},
+            messages=[{"role": "user", "content": prompt}]
+        )
+
+        print(f"  ⚡ Tokens used ({message.model}) - Input: {message.usage.input_tokens}, Output: {message.usage.output_tokens}")
+        if self.cost_tracker:
+            self.cost_tracker.add_usage(message.usage.input_tokens, message.usage.output_tokens, stage="itinerary_day", model=message.model)
+        days = parse_itinerary(message, [date], first_day=day_number)
+        if not days:
+            raise ValueError(f"No itinerary was returned for Day {day_number}")
+        return {
+            "day": days[0],
+            "tokens_used": message.usage.output_tokens
+        }
@@ -0,0 +1,121 @@
+"""
+Speculative prefetch of destination lookups.
+
+The destination is known as soon as it is typed into the trip form, well
+before the plan is submitted. Its geocode, image and destination/budget
+searches are fetched into the shared caches in the background, so
+plan_trip starts warm - or joins lookups still in flight (see
+src.utils.single_flight).
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from src.utils.config import PREFETCH_MAX_PER_SESSION, PREFETCH_DEBOUNCE, PREFETCH_WORKERS
+
+# Shared by every session in the process, so prefetch never runs unbounded
+_executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="prefetch")
+
+def prefetch_destination(destination: str, cancelled: threading.Event = None):
+    """
+    Warm the caches plan_trip reads first, in the order it reads them
+    Returns:
+        Names of the lookups that ran before cancellation
+    """
+    # Imported here so the UI can create a Prefetcher without loading the agents
+    from src.agents.destination_agent import DestinationAgent
+    from src.agents.budget_agent import BudgetAgent
+    from src.tools import SearchTool, ImageTool, GeocodingTool
+    geo_tool = GeocodingTool()
+    search_tool = SearchTool()
+    image_tool = ImageTool()
+    steps = [
+        ("geocode", lambda: geo_tool.get_coordinates(destination)),
+        ("destination_search", lambda: search_tool.search(DestinationAgent.search_query(destination), max_results=3)),
+        ("image", lambda: image_tool.get_destination_image(destination)),
+        ("budget_search", lambda: search_tool.search(BudgetAgent.search_query(destination), max_results=3)),
+    ]
+    done = []
+    for name, fetch in steps:
+        if cancelled is not None and cancelled.is_set():
+            break
+        fetch()
+        done.append(name)
+    return done
+
+class Prefetcher:
+    """
+    Per-session speculative prefetch.
+
+    A destination is fetched once it has been stable for `debounce` seconds;
+    entering another one cancels the pending prefetch (lookups already
+    running finish into the cache). At most `max_prefetches` run per session.
+    """
+
+    def __init__(self, fetch=prefetch_destination, max_prefetches: int = PREFETCH_MAX_PER_SESSION,
+                 debounce: float = PREFETCH_DEBOUNCE):
+        self.fetch = fetch
+        self.max_prefetches = max_prefetches
+        self.debounce = debounce
+        self.started = 0
+        self.destination = None
+        self._timer = None
+        self._future = None
+        self._cancelled = None
+        self._lock = threading.Lock()
+
+    def request(self, destination: str) -> bool:
+        """Schedule a prefetch for destination; False if skipped"""
+        destination = " ".join(destination.split())
+        with self._lock:
+            if len(destination) < 3 or destination.lower() == (self.destination or "").lower():
+                return False
+            if self.started >= self.max_prefetches:
+                return False
+            self._cancel_pending()
+            self.destination = destination
+            self._cancelled = threading.Event()
+            self._timer = threading.Timer(self.debounce, self._submit, args=(destination, self._cancelled))
+            self._timer.daemon = True
+            self._timer.start()
+            return True
+
+    def cancel(self):
+        """Drop the pending prefetch, if any"""
+        with self._lock:
+            self._cancel_pending()
+            self.destination = None
+
+    def _cancel_pending(self):
+        if self._cancelled is not None:
+            self._cancelled.set()
+        if self._timer is not None:
+            self._timer.cancel()
+        if self._future is not None:
+            self._future.cancel()
+        self._timer = self._future = self._cancelled = None
+
+    def _submit(self, destination: str, cancelled: threading.Event):
+        with self._lock:
+            if cancelled.is_set() or self.started >= self.max_prefetches:
+                return
+            self.started += 1
+            self._future = _executor.submit(self._run, destination, cancelled)
+
+    def _run(self, destination: str, cancelled: threading.Event):
+        try:
+            done = self.fetch(destination, cancelled)
+            print(f"⚡ Prefetched {destination}: {', '.join(done) if done else 'cancelled'}")
+            return done
+        except Exception as e:
+            print(f"[DEBUG] Prefetch for {destination} failed: {e}")
+            return None
+
+# One-off prefetches (e.g. from the planning API) waiting or running on the pool
+_pending = threading.BoundedSemaphore(PREFETCH_WORKERS * 4)
+
+def prefetch_async(destination: str) -> bool:
+    """Queue a one-off prefetch on the shared pool; False when it is saturated"""
+    if not _pending.acquire(blocking=False):
+        return False
+    future = _executor.submit(prefetch_destination, " ".join(destination.split()))
+    future.add_done_callback(lambda f: _pending.release())
+    return True
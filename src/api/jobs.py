@@ -0,0 +1,130 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from src.agents.coordinator import TravelCoordinator
+from src.database import DatabaseManager
+from src.utils.config import DB_PATH, PLANNER_WORKERS, PLAN_JOB_TTL
+
+class PlanJob:
+    """One submitted plan: its status, progress events and final result"""
+    
+    @staticmethod
+    def is_last_event(event: dict):
+        """The result ends the stream unless a trip_saved event with its trip id follows"""
+        return event["type"] == "trip_saved" or (event["type"] == "result" and not event.get("saving"))
+
+    def __init__(self, request: dict):
+        self.id = uuid.uuid4().hex
+        self.request = request
+        self.status = "queued"
+        self.events = []
+        self.result = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.closed = False
+        self._cond = threading.Condition()
+
+    def add_event(self, event: dict):
+        with self._cond:
+            self.events.append(dict(event, ts=round(time.time(), 3)))
+            self.closed = self.is_last_event(event)
+            self._cond.notify_all()
+
+    def wait_for_events(self, after: int, timeout: float):
+        """Events after index `after`, waiting up to timeout for new ones"""
+        with self._cond:
+            if len(self.events) <= after and not self.closed:
+                self._cond.wait(timeout)
+            return self.events[after:]
+
+    @property
+    def done(self):
+        return self.status in ("done", "failed")
+
+    def to_dict(self):
+        return {
+            "plan_id": self.id,
+            "status": self.status,
+            "events": list(self.events),
+            "result": self.result,
+        }
+
+class PlanJobManager:
+    """Runs plans on a bounded worker pool and keeps recent jobs for polling/streaming"""
+
+    def __init__(self, workers: int = PLANNER_WORKERS, job_ttl: float = PLAN_JOB_TTL, db=None):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="planner")
+        self.job_ttl = job_ttl
+        self.db = db or DatabaseManager(DB_PATH)
+        self.jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, request: dict, api_key: str = None) -> PlanJob:
+        job = PlanJob(request)
+        with self._lock:
+            self._expire_jobs()
+            self.jobs[job.id] = job
+        job.add_event({"type": "status", "status": "queued"})
+        # The key is only held by the running task, never stored on the job
+        self.executor.submit(self._run, job, api_key)
+        return job
+
+    def get(self, plan_id: str):
+        with self._lock:
+            return self.jobs.get(plan_id)
+
+    def _expire_jobs(self):
+        cutoff = time.time() - self.job_ttl
+        for plan_id in [pid for pid, job in self.jobs.items() if job.finished_at and job.finished_at < cutoff]:
+            del self.jobs[plan_id]
+
+    def _run(self, job: PlanJob, api_key: str = None):
+        job.status = "running"
+        job.add_event({"type": "status", "status": "running"})
+        saved = None
+        try:
+            coordinator = TravelCoordinator(api_key=api_key)
+            request = job.request
+            plan = coordinator.plan_trip(
+                destination=request["destination"],
+                start_date=request["start_date"],
+                end_date=request["end_date"],
+                budget=request["budget"],
+                interests=request["interests"],
+                profile=request.get("profile"),
+                progress_callback=lambda stage, status: job.add_event({"type": "progress", "stage": stage, "status": status})
+            )
+            if "error" not in plan:
+                # The plan is returned right away; its trip id follows once the write-behind commits
+                saved = self.db.save_trip_async(
+                    destination=request["destination"],
+                    start_date=request["start_date"],
+                    end_date=request["end_date"],
+                    budget=request["budget"],
+                    interests=request["interests"],
+                    itinerary=plan,
+                    findings=coordinator.stage_findings
+                )
+                plan["trip_id"] = None
+            job.result = plan
+            job.status = "failed" if "error" in plan else "done"
+        except Exception as e:
+            print(f"❌ Plan job {job.id} failed: {e}")
+            job.result = {"error": str(e)}
+            job.status = "failed"
+            saved = None
+        job.finished_at = time.time()
+        job.add_event({"type": "result", "status": job.status, "result": job.result, "saving": saved is not None})
+        if saved is not None:
+            saved.add_done_callback(lambda future: self._attach_trip_id(job, future))
+
+    def _attach_trip_id(self, job: PlanJob, future):
+        """Record the saved trip's id on the job and send it to event streams"""
+        try:
+            trip_id = future.result()
+        except Exception as e:
+            print(f"❌ Saving plan {job.id} failed: {e}")
+            trip_id = None
+        job.result["trip_id"] = trip_id
+        job.add_event({"type": "trip_saved", "trip_id": trip_id})
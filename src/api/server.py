@@ -0,0 +1,169 @@
+"""
+Headless planning API.
+
+Runs the agent pipeline independently of the Streamlit UI so planning
+workers can be scaled on their own and reused by other frontends:
+
+    uvicorn src.api.server:app --host 0.0.0.0 --port 8000
+
+Plans run on a worker pool inside the process that accepted them. Use
+POST /plans/stream (submit and stream in one request) behind a plain load
+balancer; GET /plans/{id} and /plans/{id}/events need sticky routing.
+"""
+import json
+from typing import List, Optional
+from fastapi import FastAPI, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse, Response
+from pydantic import BaseModel, Field
+from src.agents.prefetcher import prefetch_async
+from src.agents.coordinator import TravelCoordinator
+from src.api.jobs import PlanJob, PlanJobManager
+from src.database.usage_ledger import DEMO_KEY_ID
+from src.utils.admission import get_admission_controller
+from src.utils.single_flight import get_single_flight_stats
+from src.utils.metrics import REGISTRY, CONTENT_TYPE
+from src.utils.config import MAINTENANCE_INTERVAL
+
+# Seconds between keep-alive comments on idle event streams
+HEARTBEAT_INTERVAL = 15
+
+class PlanRequest(BaseModel):
+    destination: str = Field(min_length=1)
+    start_date: str = Field(pattern=r"^\d{4}-\d{2}-\d{2}$")
+    end_date: str = Field(pattern=r"^\d{4}-\d{2}-\d{2}$")
+    budget: float = Field(gt=0)
+    interests: List[str] = Field(min_length=1, max_length=5)
+    # True profiles this plan; unset follows PROFILE_PLANS / PROFILE_SAMPLE_RATE
+    profile: Optional[bool] = None
+
+class PrefetchRequest(BaseModel):
+    destination: str = Field(min_length=3, max_length=100)
+
+class CompareRequest(BaseModel):
+    destinations: List[str] = Field(min_length=2, max_length=5)
+    start_date: str = Field(pattern=r"^\d{4}-\d{2}-\d{2}$")
+    end_date: str = Field(pattern=r"^\d{4}-\d{2}-\d{2}$")
+    budget: float = Field(gt=0)
+    interests: List[str] = Field(min_length=1, max_length=5)
+
+class RegenerateDayRequest(BaseModel):
+    feedback: str = Field(default="", max_length=500)
+
+app = FastAPI(title="WanderAI Planning API")
+jobs = PlanJobManager()
+
+if MAINTENANCE_INTERVAL:
+    from src.database.maintenance import start_background_maintenance
+    start_background_maintenance(MAINTENANCE_INTERVAL)
+
+def _event_stream(job):
+    """Server-sent events for a job until its result has been sent"""
+    sent = 0
+    while True:
+        events = job.wait_for_events(sent, timeout=HEARTBEAT_INTERVAL)
+        if not events:
+            yield ": keep-alive\n\n"
+            continue
+        for event in events:
+            yield f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+        sent += len(events)
+        if PlanJob.is_last_event(events[-1]):
+            return
+
+def _sse(job):
+    return StreamingResponse(
+        _event_stream(job),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Plan-Id": job.id}
+    )
+
+@app.get("/health")
+def health():
+    return {"status": "ok"}
+
+@app.post("/plans", status_code=202)
+def submit_plan(request: PlanRequest, x_anthropic_key: Optional[str] = Header(default=None)):
+    """Submit a plan; poll GET /plans/{id} or stream /plans/{id}/events"""
+    job = jobs.submit(request.model_dump(), api_key=x_anthropic_key)
+    return {"plan_id": job.id, "status": job.status}
+
+@app.post("/plans/stream")
+def submit_and_stream_plan(request: PlanRequest, x_anthropic_key: Optional[str] = Header(default=None)):
+    """Submit a plan and stream its progress and result in the same response"""
+    return _sse(jobs.submit(request.model_dump(), api_key=x_anthropic_key))
+
+@app.post("/prefetch", status_code=202)
+def prefetch(request: PrefetchRequest):
+    """Speculatively warm the lookups for a destination the user is still entering"""
+    if not prefetch_async(request.destination):
+        raise HTTPException(status_code=429, detail="Prefetch pool is busy")
+    return {"accepted": True}
+
+@app.get("/plans/{plan_id}")
+def get_plan(plan_id: str):
+    job = jobs.get(plan_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Plan not found")
+    return job.to_dict()
+
+@app.get("/plans/{plan_id}/events")
+def stream_plan(plan_id: str):
+    job = jobs.get(plan_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Plan not found")
+    return _sse(job)
+
+@app.get("/trips")
+def list_trips(limit: int = Query(5, ge=1, le=100)):
+    return jobs.db.get_recent_trips(limit=limit)
+
+@app.get("/trips/search")
+def search_trips(q: str, limit: int = Query(10, ge=1, le=100), offset: int = Query(0, ge=0)):
+    return jobs.db.search_trips(q, limit=limit, offset=offset)
+
+@app.get("/trips/{trip_id}")
+def get_trip(trip_id: int):
+    trip = jobs.db.get_trip(trip_id)
+    if trip is None:
+        raise HTTPException(status_code=404, detail="Trip not found")
+    trip["itinerary"] = json.loads(trip.pop("itinerary_json") or "{}")
+    return trip
+
+@app.post("/compare")
+def compare_destinations(request: CompareRequest, x_anthropic_key: Optional[str] = Header(default=None)):
+    """Rank candidate cities by budget fit and season; plan the chosen one with POST /plans"""
+    result = TravelCoordinator(api_key=x_anthropic_key).compare_destinations(**request.model_dump())
+    if "error" in result:
+        if result.get("retry_after") is not None:
+            raise HTTPException(status_code=429, detail=result["error"],
+                                headers={"Retry-After": str(int(result["retry_after"]))})
+        raise HTTPException(status_code=400, detail=result["error"])
+    return result
+
+@app.post("/trips/{trip_id}/days/{day_index}/regenerate")
+def regenerate_day(trip_id: int, day_index: int, request: RegenerateDayRequest,
+                   x_anthropic_key: Optional[str] = Header(default=None)):
+    """Rewrite one day (0-based) of a saved trip with a single LLM call; returns the updated plan"""
+    plan = TravelCoordinator(api_key=x_anthropic_key).regenerate_day(trip_id, day_index, request.feedback, db=jobs.db)
+    if "error" in plan:
+        if plan["error"] == "Trip not found":
+            raise HTTPException(status_code=404, detail=plan["error"])
+        if plan.get("retry_after") is not None:
+            raise HTTPException(status_code=429, detail=plan["error"],
+                                headers={"Retry-After": str(int(plan["retry_after"]))})
+        raise HTTPException(status_code=400, detail=plan["error"])
+    return plan
+
+@app.get("/stats/coalescing")
+def coalescing_stats():
+    """Per-group counts of calls, upstream executions and coalesced callers"""
+    return get_single_flight_stats()
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus scrape endpoint"""
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+@app.get("/quota/demo")
+def demo_quota():
+    return get_admission_controller().get_status(DEMO_KEY_ID)
@@ -1,7 +1,26 @@
 import sqlite3
 import json
+import re
 from datetime import datetime
 from pathlib import Path
+from src.database.write_behind import get_writer
+
+# Trips whose plan duplicates an older trip store only a pointer to it
+# (see src.database.maintenance.deduplicate_trips)
+DUPLICATE_OF_PREFIX = '{"duplicate_of": '
+
+def duplicate_stub(trip_id):
+    """itinerary_json of a trip that shares the plan stored with trip_id"""
+    return json.dumps({"duplicate_of": trip_id})
+
+# Trip rows with the plan of deduplicated trips filled in from the trip they point to
+_TRIPS_RESOLVED = """
+    SELECT t.id, t.destination, t.start_date, t.end_date, t.budget, t.interests, t.created_at,
+           COALESCE(original.itinerary_json, t.itinerary_json) AS itinerary_json
+    FROM trips t
+    LEFT JOIN trips original ON original.id =
+        CASE WHEN t.itinerary_json LIKE ? || '%' THEN json_extract(t.itinerary_json, '$.duplicate_of') END
+"""
 
 class DatabaseManager:
     def __init__(self, db_path="travelai.db"):
@@ -11,12 +30,33 @@ class DatabaseManager:
     def init_database(self):
         """Initialize database with schema"""
         conn = sqlite3.connect(self.db_path)
+        index_exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'trips_fts'").fetchone()
         schema_path = Path(__file__).parent / "schema.sql"
         with open(schema_path, 'r') as f:
             conn.executescript(f.read())
+        if not index_exists:
+            self._backfill_search_index(conn)
         conn.commit()
         conn.close()
     
+    def _backfill_search_index(self, conn):
+        """Configure a newly created full-text index and add trips saved before it existed"""
+        # Weight destination matches highest, then interests, overview, itinerary
+        conn.execute("INSERT INTO trips_fts (trips_fts, rank) VALUES ('rank', 'bm25(10.0, 4.0, 2.0, 1.0)')")
+        cursor = conn.execute("""
+            INSERT INTO trips_fts (rowid, destination, interests, overview, itinerary)
+            SELECT
+                id,
+                destination,
+                interests,
+                CASE WHEN json_valid(itinerary_json) THEN json_extract(itinerary_json, '$.destination_overview') END,
+                CASE WHEN json_valid(itinerary_json) THEN json_extract(itinerary_json, '$.itinerary') END
+            FROM trips
+            WHERE id > (SELECT COALESCE(MAX(rowid), 0) FROM trips_fts)
+        """)
+        if cursor.rowcount > 0:
+            print(f"🔎 Indexed {cursor.rowcount} existing trips for search")
+    
     def save_trip(self, destination, start_date, end_date, budget, interests, itinerary):
         """Save a trip to database"""
         conn = sqlite3.connect(self.db_path)
@@ -30,16 +70,139 @@ class DatabaseManager:
         conn.close()
         return trip_id
     
+    def update_trip_itinerary(self, trip_id, itinerary):
+        """Replace a saved trip's plan (the search index follows via trigger); returns False if missing"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute("UPDATE trips SET itinerary_json = ? WHERE id = ?", (json.dumps(itinerary), trip_id))
+        updated = cursor.rowcount > 0
+        conn.commit()
+        conn.close()
+        return updated
+    
+    def save_trip_async(self, destination, start_date, end_date, budget, interests, itinerary, findings=None):
+        """
+        Queue a trip (and optional {agent_name: findings}) for the background
+        writer, off the request path
+        Returns:
+            Future resolving to the new trip id
+        """
+        trip_row = (destination, start_date, end_date, budget, json.dumps(interests), json.dumps(itinerary))
+        finding_rows = [(agent_name, json.dumps(data)) for agent_name, data in (findings or {}).items()]
+        
+        def write(cursor):
+            cursor.execute("""
+                INSERT INTO trips (destination, start_date, end_date, budget, interests, itinerary_json)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, trip_row)
+            trip_id = cursor.lastrowid
+            cursor.executemany("""
+                INSERT INTO agent_findings (trip_id, agent_name, findings)
+                VALUES (?, ?, ?)
+            """, [(trip_id, agent_name, data) for agent_name, data in finding_rows])
+            return trip_id
+        
+        return get_writer(self.db_path).submit(write)
+    
+    def flush_writes(self, timeout=None):
+        """Wait for queued background writes to be committed"""
+        return get_writer(self.db_path).flush(timeout)
+    
     def get_all_trips(self):
         """Retrieve all trips"""
         conn = sqlite3.connect(self.db_path)
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM trips ORDER BY created_at DESC")
+        cursor.execute(_TRIPS_RESOLVED + "ORDER BY t.created_at DESC", (DUPLICATE_OF_PREFIX,))
+        trips = [dict(row) for row in cursor.fetchall()]
+        conn.close()
+        return trips
+    
+    def get_recent_trips(self, limit=5):
+        """Most recent trips without the (large) itinerary payload"""
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT id, destination, start_date, end_date, budget, interests, created_at
+            FROM trips ORDER BY created_at DESC, id DESC LIMIT ?
+        """, (limit,))
+        trips = [dict(row) for row in cursor.fetchall()]
+        conn.close()
+        return trips
+    
+    def get_trip(self, trip_id):
+        """Retrieve a single trip, or None (deduplicated trips get the plan they point to)"""
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute(_TRIPS_RESOLVED + "WHERE t.id = ?", (DUPLICATE_OF_PREFIX, trip_id))
+        row = cursor.fetchone()
+        conn.close()
+        return dict(row) if row else None
+    
+    def get_top_destinations(self, days=7, limit=30):
+        """
+        Most planned destinations over the last N days, each with its most
+        common interest selection
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT destination, interests, COUNT(*) AS trips
+            FROM trips
+            WHERE created_at >= datetime('now', ?)
+            GROUP BY lower(trim(destination)), interests
+            ORDER BY trips DESC
+        """, (f"-{int(days)} days",))
+        rows = cursor.fetchall()
+        conn.close()
+        
+        destinations = {}
+        for destination, interests, trips in rows:
+            key = destination.strip().lower()
+            if key not in destinations:
+                # Rows are ordered by count, so the first interests seen are the most common
+                destinations[key] = {"destination": destination.strip(), "interests": json.loads(interests or "[]"), "trips": 0}
+            destinations[key]["trips"] += trips
+        ranked = sorted(destinations.values(), key=lambda d: d["trips"], reverse=True)
+        return ranked[:limit]
+    
+    def search_trips(self, query, limit=10, offset=0):
+        """
+        Full-text search over destination, interests, overview and itinerary
+        Returns:
+            Trips ranked by relevance (best first) with a highlighted snippet
+        """
+        match = self._fts_query(query)
+        if not match:
+            return []
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT t.id, t.destination, t.start_date, t.end_date, t.budget, t.interests, t.created_at,
+                   snippet(trips_fts, -1, '**', '**', '…', 12) AS snippet,
+                   trips_fts.rank AS rank
+            FROM trips_fts
+            JOIN trips t ON t.id = trips_fts.rowid
+            WHERE trips_fts MATCH ?
+            ORDER BY trips_fts.rank
+            LIMIT ? OFFSET ?
+        """, (match, limit, offset))
         trips = [dict(row) for row in cursor.fetchall()]
         conn.close()
         return trips
     
+    def _fts_query(self, query):
+        """Turn free text into a safe FTS5 query: all terms, last one as a prefix"""
+        terms = re.findall(r"\w+", query or "")
+        if not terms:
+            return ""
+        quoted = [f'"{term}"' for term in terms]
+        quoted[-1] += "*"
+        return " ".join(quoted)
+    
     def save_agent_finding(self, trip_id, agent_name, findings):
         """Save agent findings for debugging"""
         conn = sqlite3.connect(self.db_path)
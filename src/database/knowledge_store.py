@@ -0,0 +1,155 @@
+"""
+Persistent per-destination research.
+
+Destination research is stored once per city as structured sections
+(overview, attractions, neighborhoods, customs) with a version and the
+time it was last refreshed. Plans assemble their interest-specific view
+from it locally instead of calling the model again.
+
+Freshness policy:
+    fresh    younger than KNOWLEDGE_TTL - used as is
+    stale    younger than KNOWLEDGE_MAX_STALE - used, and refreshed in the background
+    expired  older, invalidated, or written by an older schema - rebuilt before use
+
+Inspect or invalidate entries from the command line:
+
+    python -m src.database.knowledge_store --list
+    python -m src.database.knowledge_store --invalidate Tokyo
+"""
+import json
+import sqlite3
+import time
+from pathlib import Path
+from src.utils.config import KNOWLEDGE_TTL, KNOWLEDGE_MAX_STALE
+from src.utils.destination_knowledge import KNOWLEDGE_SCHEMA_VERSION
+
+class KnowledgeStore:
+    def __init__(self, db_path="travelai.db", ttl=KNOWLEDGE_TTL, max_stale=KNOWLEDGE_MAX_STALE):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.init_database()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def init_database(self):
+        """Initialize database with schema"""
+        conn = self._connect()
+        schema_path = Path(__file__).parent / "schema.sql"
+        with open(schema_path, 'r') as f:
+            conn.executescript(f.read())
+        conn.commit()
+        conn.close()
+
+    @staticmethod
+    def key_for(destination: str) -> str:
+        return " ".join(destination.lower().split())
+
+    def _status(self, row) -> str:
+        age = time.time() - row["refreshed_at"]
+        if row["invalidated"] or row["schema_version"] != KNOWLEDGE_SCHEMA_VERSION or age >= self.max_stale:
+            return "expired"
+        return "fresh" if age < self.ttl else "stale"
+
+    def get(self, destination: str):
+        """Stored research with its version and freshness status, or None"""
+        conn = self._connect()
+        conn.row_factory = sqlite3.Row
+        row = conn.execute(
+            "SELECT * FROM destination_knowledge WHERE destination_key = ?",
+            (self.key_for(destination),)
+        ).fetchone()
+        conn.close()
+        if row is None:
+            return None
+        return {
+            "destination": row["destination"],
+            "version": row["version"],
+            "sections": json.loads(row["sections_json"]),
+            "sources": json.loads(row["sources_json"] or "[]"),
+            "model": row["model"],
+            "refreshed_at": row["refreshed_at"],
+            "status": self._status(row),
+        }
+
+    def put(self, destination: str, sections: dict, sources: list = None, model: str = None) -> int:
+        """Store freshly built research; returns its version"""
+        conn = self._connect()
+        row = conn.execute("""
+            INSERT INTO destination_knowledge
+                (destination_key, destination, schema_version, version, sections_json, sources_json, model, refreshed_at)
+            VALUES (?, ?, ?, 1, ?, ?, ?, ?)
+            ON CONFLICT (destination_key) DO UPDATE SET
+                destination = excluded.destination,
+                schema_version = excluded.schema_version,
+                version = version + 1,
+                sections_json = excluded.sections_json,
+                sources_json = excluded.sources_json,
+                model = excluded.model,
+                refreshed_at = excluded.refreshed_at,
+                invalidated = 0
+            RETURNING version
+        """, (self.key_for(destination), destination, KNOWLEDGE_SCHEMA_VERSION, json.dumps(sections),
+              json.dumps(sources or []), model, time.time())).fetchone()
+        conn.commit()
+        conn.close()
+        return row[0]
+
+    def invalidate(self, destination: str = None) -> int:
+        """Force a rebuild on next use of one destination (or all); returns entries affected"""
+        conn = self._connect()
+        if destination is None:
+            cursor = conn.execute("UPDATE destination_knowledge SET invalidated = 1")
+        else:
+            cursor = conn.execute(
+                "UPDATE destination_knowledge SET invalidated = 1 WHERE destination_key = ?",
+                (self.key_for(destination),)
+            )
+        conn.commit()
+        conn.close()
+        return cursor.rowcount
+
+    def needs_refresh(self, destination: str, window: float = 0) -> bool:
+        """True when missing, not fresh, or leaving the fresh window within window seconds"""
+        entry = self.get(destination)
+        if entry is None or entry["status"] != "fresh":
+            return True
+        return time.time() - entry["refreshed_at"] >= self.ttl - window
+
+    def list_entries(self):
+        """Summary of every stored destination"""
+        conn = self._connect()
+        conn.row_factory = sqlite3.Row
+        rows = conn.execute("SELECT * FROM destination_knowledge ORDER BY destination_key").fetchall()
+        conn.close()
+        return [
+            {
+                "destination": row["destination"],
+                "version": row["version"],
+                "refreshed_at": row["refreshed_at"],
+                "status": self._status(row),
+            }
+            for row in rows
+        ]
+
+if __name__ == "__main__":
+    import argparse
+    from src.utils.config import DB_PATH
+    parser = argparse.ArgumentParser(description="Inspect or invalidate stored destination research")
+    parser.add_argument("--list", action="store_true", help="List stored destinations")
+    parser.add_argument("--invalidate", metavar="DESTINATION", help="Rebuild this destination on next use")
+    parser.add_argument("--invalidate-all", action="store_true", help="Rebuild every destination on next use")
+    args = parser.parse_args()
+
+    store = KnowledgeStore(DB_PATH)
+    if args.invalidate:
+        print(f"Invalidated {store.invalidate(args.invalidate)} entries")
+    elif args.invalidate_all:
+        print(f"Invalidated {store.invalidate()} entries")
+    else:
+        for entry in store.list_entries():
+            age_days = (time.time() - entry["refreshed_at"]) / 86400
+            print(f"{entry['destination']:<30} v{entry['version']:<4} {entry['status']:<8} {age_days:.1f} days old")
@@ -0,0 +1,324 @@
+"""
+Retention and compaction for travelai.db.
+
+Each run:
+    1. ages out rows past their retention (agent findings, usage ledger,
+       optionally trips), expired api_cache rows and long-expired research
+    2. deduplicates trips (same request and same plan, e.g. the copies
+       saved by callers that shared one coalesced plan): every trip id keeps
+       working, but only the first copy stores the plan
+    3. returns free pages with incremental vacuum, merges the full-text
+       index and refreshes planner statistics with ANALYZE
+    4. reports file and per-table sizes
+
+Deletes run in small batches with a pause in between so plans writing at the
+same time are not blocked. Run once from the command line:
+
+    python -m src.database.maintenance
+    python -m src.database.maintenance --report
+
+or every N seconds in the background with MAINTENANCE_INTERVAL=N. Switching
+the file to incremental vacuum takes one full VACUUM, which blocks writers, so
+only the command line does it; background runs skip the vacuum until then.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from src.utils.config import (
+    DB_PATH,
+    TRIPS_RETENTION_DAYS,
+    FINDINGS_RETENTION_DAYS,
+    USAGE_RETENTION_DAYS,
+    KNOWLEDGE_MAX_STALE,
+    MAINTENANCE_VACUUM_PAGES,
+)
+from src.utils.metrics import REGISTRY
+from src.database.db_manager import DUPLICATE_OF_PREFIX, duplicate_stub
+
+# Rows deleted per transaction, and the pause between batches (seconds)
+DELETE_BATCH_SIZE = 500
+BATCH_PAUSE = 0.05
+# Plan fields that differ between copies of the same plan
+VOLATILE_PLAN_FIELDS = ("usage_stats", "profile", "deadline", "trip_id")
+# SQLite auto_vacuum modes
+AUTO_VACUUM_INCREMENTAL = 2
+
+DB_SIZE = REGISTRY.gauge("travelai_db_size_bytes", "Size of the SQLite database file", ["file"])
+DB_ROWS = REGISTRY.gauge("travelai_db_rows", "Rows per table after the last maintenance run", ["table"])
+
+class DatabaseMaintenance:
+    def __init__(self, db_path=DB_PATH, trips_days=TRIPS_RETENTION_DAYS, findings_days=FINDINGS_RETENTION_DAYS,
+                 usage_days=USAGE_RETENTION_DAYS, knowledge_max_age=KNOWLEDGE_MAX_STALE,
+                 vacuum_pages=MAINTENANCE_VACUUM_PAGES):
+        """
+        Args:
+            trips_days, findings_days, usage_days: Retention in days (0 = keep forever)
+            knowledge_max_age: Seconds after which stored research is deleted
+            vacuum_pages: Free pages returned per run (0 = all)
+        """
+        self.db_path = db_path
+        self.trips_days = trips_days
+        self.findings_days = findings_days
+        self.usage_days = usage_days
+        self.knowledge_max_age = knowledge_max_age
+        self.vacuum_pages = vacuum_pages
+        self._vacuum_hint_shown = False
+        self.init_database()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        return conn
+
+    def init_database(self):
+        """Initialize database with schema (adds the indexes retention relies on)"""
+        conn = self._connect()
+        schema_path = Path(__file__).parent / "schema.sql"
+        with open(schema_path, 'r') as f:
+            conn.executescript(f.read())
+        conn.commit()
+        conn.close()
+
+    def _delete_in_batches(self, conn, table, where, params=()):
+        """Delete matching rows a batch at a time; returns rows deleted"""
+        deleted = 0
+        while True:
+            cursor = conn.execute(
+                f"DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table} WHERE {where} LIMIT ?)",
+                (*params, DELETE_BATCH_SIZE)
+            )
+            conn.commit()
+            deleted += cursor.rowcount
+            if cursor.rowcount < DELETE_BATCH_SIZE:
+                return deleted
+            time.sleep(BATCH_PAUSE)
+
+    def _duplicates_of(self, conn):
+        """{trip id: [ids of trips that point to its plan]}"""
+        duplicates = {}
+        rows = conn.execute(
+            "SELECT id, json_extract(itinerary_json, '$.duplicate_of') FROM trips WHERE itinerary_json LIKE ? || '%' ORDER BY id",
+            (DUPLICATE_OF_PREFIX,)
+        )
+        for trip_id, original_id in rows:
+            duplicates.setdefault(original_id, []).append(trip_id)
+        return duplicates
+
+    def _delete_trips(self, conn, trip_ids):
+        """
+        Delete trips and their findings (the search index follows via trigger)
+        Trips that point to a deleted trip's plan get the plan back first: the
+        oldest surviving one stores it and the others point to that one.
+        """
+        if not trip_ids:
+            return 0
+        doomed = set(trip_ids)
+        for original_id, duplicate_ids in self._duplicates_of(conn).items():
+            survivors = [trip_id for trip_id in duplicate_ids if trip_id not in doomed]
+            if original_id not in doomed or not survivors:
+                continue
+            conn.execute("UPDATE trips SET itinerary_json = (SELECT itinerary_json FROM trips WHERE id = ?) WHERE id = ?",
+                         (original_id, survivors[0]))
+            conn.executemany("UPDATE trips SET itinerary_json = ? WHERE id = ?",
+                             [(duplicate_stub(survivors[0]), trip_id) for trip_id in survivors[1:]])
+            conn.commit()
+        for i in range(0, len(trip_ids), DELETE_BATCH_SIZE):
+            batch = trip_ids[i:i + DELETE_BATCH_SIZE]
+            marks = ",".join("?" * len(batch))
+            conn.execute(f"DELETE FROM agent_findings WHERE trip_id IN ({marks})", batch)
+            conn.execute(f"DELETE FROM trips WHERE id IN ({marks})", batch)
+            conn.commit()
+            time.sleep(BATCH_PAUSE)
+        return len(trip_ids)
+
+    def apply_retention(self, conn):
+        """Delete rows past their retention; returns rows deleted per table"""
+        deleted = {}
+        if self.trips_days:
+            old = [row[0] for row in conn.execute(
+                "SELECT id FROM trips WHERE created_at < datetime('now', ?)", (f"-{int(self.trips_days)} days",)
+            )]
+            deleted["trips"] = self._delete_trips(conn, old)
+        if self.findings_days:
+            deleted["agent_findings"] = self._delete_in_batches(
+                conn, "agent_findings", "timestamp < datetime('now', ?)", (f"-{int(self.findings_days)} days",)
+            )
+        if self.usage_days:
+            deleted["usage_ledger"] = self._delete_in_batches(
+                conn, "usage_ledger", "day < date('now', ?)", (f"-{int(self.usage_days)} days",)
+            )
+        deleted["api_cache"] = self._delete_in_batches(conn, "api_cache", "expires_at < ?", (time.time(),))
+        deleted["destination_knowledge"] = self._delete_in_batches(
+            conn, "destination_knowledge", "refreshed_at < ?", (time.time() - self.knowledge_max_age,)
+        )
+        return deleted
+
+    @staticmethod
+    def _plan_fingerprint(itinerary_json):
+        try:
+            plan = json.loads(itinerary_json or "{}")
+        except ValueError:
+            return itinerary_json
+        if isinstance(plan, dict):
+            for field in VOLATILE_PLAN_FIELDS:
+                plan.pop(field, None)
+        return json.dumps(plan, sort_keys=True)
+
+    def deduplicate_trips(self, conn):
+        """
+        Store each plan repeated for the same request once, in the oldest trip
+        The later copies keep their rows, so their trip ids stay valid, but
+        their plan is replaced by a pointer to the oldest copy (resolved by
+        DatabaseManager.get_trip) and their findings, copies too, are deleted.
+        Returns:
+            Number of trips deduplicated
+        """
+        groups = conn.execute("""
+            SELECT group_concat(id) FROM trips
+            WHERE itinerary_json IS NULL OR itinerary_json NOT LIKE ? || '%'
+            GROUP BY lower(trim(destination)), start_date, end_date, budget, interests
+            HAVING COUNT(*) > 1
+        """, (DUPLICATE_OF_PREFIX,)).fetchall()
+        duplicates = []
+        for (ids,) in groups:
+            ids = sorted(int(i) for i in ids.split(","))
+            marks = ",".join("?" * len(ids))
+            rows = conn.execute(f"SELECT id, itinerary_json FROM trips WHERE id IN ({marks}) ORDER BY id", ids)
+            originals = {}
+            for trip_id, itinerary_json in rows:
+                fingerprint = self._plan_fingerprint(itinerary_json)
+                if fingerprint in originals:
+                    duplicates.append((duplicate_stub(originals[fingerprint]), trip_id))
+                else:
+                    originals[fingerprint] = trip_id
+        for i in range(0, len(duplicates), DELETE_BATCH_SIZE):
+            batch = duplicates[i:i + DELETE_BATCH_SIZE]
+            conn.executemany("UPDATE trips SET itinerary_json = ? WHERE id = ?", batch)
+            conn.executemany("DELETE FROM agent_findings WHERE trip_id = ?", [(trip_id,) for _, trip_id in batch])
+            conn.commit()
+            time.sleep(BATCH_PAUSE)
+        return len(duplicates)
+
+    def compact(self, conn, full_vacuum=False):
+        """
+        Return free pages to the filesystem and refresh planner statistics
+        Args:
+            full_vacuum: Allow the one-time full VACUUM that switches the file
+                to incremental vacuum (it blocks writers, so not in the background)
+        """
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != AUTO_VACUUM_INCREMENTAL:
+            if full_vacuum:
+                # Switching modes takes one full VACUUM; later runs are incremental
+                print("🧹 Enabling incremental vacuum (one-time full VACUUM)")
+                conn.execute(f"PRAGMA auto_vacuum = {AUTO_VACUUM_INCREMENTAL}")
+                conn.execute("VACUUM")
+            elif not self._vacuum_hint_shown:
+                print("🧹 Free pages are not returned until incremental vacuum is enabled: "
+                      "run python -m src.database.maintenance once")
+                self._vacuum_hint_shown = True
+        # Merge the full-text index segments left behind by deletes and updates
+        conn.execute("INSERT INTO trips_fts (trips_fts) VALUES ('optimize')")
+        conn.commit()
+        freed = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        # executescript steps the pragma to completion (execute frees a single page)
+        pages = f"({int(self.vacuum_pages)})" if self.vacuum_pages else ""
+        conn.executescript(f"PRAGMA incremental_vacuum{pages};")
+        freed -= conn.execute("PRAGMA freelist_count").fetchone()[0]
+        conn.execute("ANALYZE")
+        conn.commit()
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return {"pages_freed": freed}
+
+    def report(self, conn=None):
+        """File sizes, free pages and per-table rows and bytes"""
+        own = conn is None
+        conn = conn or self._connect()
+        try:
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+            tables = [row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' "
+                "AND name NOT LIKE 'trips_fts_%' ORDER BY name"
+            )]
+            try:
+                table_bytes = dict(conn.execute("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name").fetchall())
+            except sqlite3.Error:
+                table_bytes = {}  # SQLite built without the dbstat table
+            report = {
+                "file_bytes": os.path.getsize(self.db_path),
+                "wal_bytes": os.path.getsize(self.db_path + "-wal") if os.path.exists(self.db_path + "-wal") else 0,
+                "free_bytes": conn.execute("PRAGMA freelist_count").fetchone()[0] * page_size,
+                "tables": {},
+            }
+            for table in tables:
+                rows = conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+                report["tables"][table] = {"rows": rows, "bytes": table_bytes.get(table)}
+                DB_ROWS.set(rows, table=table)
+            DB_SIZE.set(report["file_bytes"], file="db")
+            DB_SIZE.set(report["wal_bytes"], file="wal")
+            return report
+        finally:
+            if own:
+                conn.close()
+
+    def run_once(self, full_vacuum=False):
+        """
+        One full maintenance pass
+        Args:
+            full_vacuum: See compact
+        Returns:
+            Summary with rows deleted, duplicates removed, pages freed and sizes
+        """
+        started = time.time()
+        conn = self._connect()
+        try:
+            before = os.path.getsize(self.db_path)
+            summary = {"deleted": self.apply_retention(conn)}
+            summary["duplicates_merged"] = self.deduplicate_trips(conn)
+            summary.update(self.compact(conn, full_vacuum=full_vacuum))
+            summary["report"] = self.report(conn)
+            summary["bytes_reclaimed"] = before - summary["report"]["file_bytes"]
+        finally:
+            conn.close()
+        summary["duration_s"] = round(time.time() - started, 2)
+        print(f"🧹 Maintenance: {sum(summary['deleted'].values())} expired rows, "
+              f"{summary['duplicates_merged']} duplicate trips merged, "
+              f"{summary['bytes_reclaimed'] / 1024:.0f} KiB reclaimed")
+        return summary
+
+def start_background_maintenance(interval: float, maintenance: DatabaseMaintenance = None):
+    """
+    Run maintenance every interval seconds on a daemon thread
+    Returns:
+        threading.Event that stops the loop when set
+    """
+    stop = threading.Event()
+
+    def loop():
+        current = maintenance or DatabaseMaintenance()
+        # Let the app finish starting up before the first pass
+        while not stop.wait(interval):
+            try:
+                current.run_once()
+            except Exception as e:
+                print(f"❌ Database maintenance failed: {e}")
+
+    threading.Thread(target=loop, name="db-maintenance", daemon=True).start()
+    return stop
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Apply retention, deduplicate and compact travelai.db")
+    parser.add_argument("--report", action="store_true", help="Only report sizes")
+    parser.add_argument("--trips-days", type=int, default=TRIPS_RETENTION_DAYS, help="Trip retention in days (0 = forever)")
+    parser.add_argument("--findings-days", type=int, default=FINDINGS_RETENTION_DAYS, help="Agent findings retention in days (0 = forever)")
+    parser.add_argument("--usage-days", type=int, default=USAGE_RETENTION_DAYS, help="Usage ledger retention in days (0 = forever)")
+    args = parser.parse_args()
+
+    cli_maintenance = DatabaseMaintenance(trips_days=args.trips_days, findings_days=args.findings_days,
+                                          usage_days=args.usage_days)
+    result = cli_maintenance.report() if args.report else cli_maintenance.run_once(full_vacuum=True)
+    print(json.dumps(result, indent=2))
@@ -16,4 +16,80 @@ CREATE TABLE IF NOT EXISTS agent_findings (
     findings TEXT,
     timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (trip_id) REFERENCES trips(id)
-);
\ No newline at end of file
+);
+
+CREATE TABLE IF NOT EXISTS usage_ledger (
+    key_id TEXT NOT NULL,
+    day DATE NOT NULL,
+    stage TEXT NOT NULL,
+    calls INTEGER DEFAULT 0,
+    input_tokens INTEGER DEFAULT 0,
+    output_tokens INTEGER DEFAULT 0,
+    cost_usd REAL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (key_id, day, stage)
+);
+
+CREATE INDEX IF NOT EXISTS idx_trips_created_at ON trips(created_at);
+-- Retention and trip deletes (see src/database/maintenance.py)
+CREATE INDEX IF NOT EXISTS idx_agent_findings_trip_id ON agent_findings(trip_id);
+CREATE INDEX IF NOT EXISTS idx_agent_findings_timestamp ON agent_findings(timestamp);
+
+-- Full-text index over trips, kept in sync by triggers (backfilled in DatabaseManager)
+CREATE VIRTUAL TABLE IF NOT EXISTS trips_fts USING fts5(
+    destination,
+    interests,
+    overview,
+    itinerary,
+    tokenize = 'porter unicode61'
+);
+
+CREATE TRIGGER IF NOT EXISTS trips_fts_insert AFTER INSERT ON trips BEGIN
+    INSERT INTO trips_fts (rowid, destination, interests, overview, itinerary)
+    VALUES (
+        new.id,
+        new.destination,
+        new.interests,
+        CASE WHEN json_valid(new.itinerary_json) THEN json_extract(new.itinerary_json, '$.destination_overview') END,
+        CASE WHEN json_valid(new.itinerary_json) THEN json_extract(new.itinerary_json, '$.itinerary') END
+    );
+END;
+
+CREATE TRIGGER IF NOT EXISTS trips_fts_delete AFTER DELETE ON trips BEGIN
+    DELETE FROM trips_fts WHERE rowid = old.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trips_fts_update AFTER UPDATE ON trips BEGIN
+    DELETE FROM trips_fts WHERE rowid = old.id;
+    INSERT INTO trips_fts (rowid, destination, interests, overview, itinerary)
+    VALUES (
+        new.id,
+        new.destination,
+        new.interests,
+        CASE WHEN json_valid(new.itinerary_json) THEN json_extract(new.itinerary_json, '$.destination_overview') END,
+        CASE WHEN json_valid(new.itinerary_json) THEN json_extract(new.itinerary_json, '$.itinerary') END
+    );
+END;
+
+-- Shared cache of external API results (geocoding, search, images, research)
+CREATE TABLE IF NOT EXISTS api_cache (
+    namespace TEXT NOT NULL,
+    cache_key TEXT NOT NULL,
+    value_json TEXT NOT NULL,
+    fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (namespace, cache_key)
+);
+
+-- Interest-independent destination research, reused across plans (see src/database/knowledge_store.py)
+CREATE TABLE IF NOT EXISTS destination_knowledge (
+    destination_key TEXT PRIMARY KEY,
+    destination TEXT NOT NULL,
+    schema_version INTEGER NOT NULL,
+    version INTEGER NOT NULL DEFAULT 1,
+    sections_json TEXT NOT NULL,
+    sources_json TEXT,
+    model TEXT,
+    refreshed_at REAL NOT NULL,
+    invalidated INTEGER NOT NULL DEFAULT 0
+);
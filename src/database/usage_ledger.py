@@ -0,0 +1,86 @@
+import sqlite3
+import hashlib
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+DEMO_KEY_ID = "demo"
+
+def key_id_for(api_key=None):
+    """Stable, non-reversible identifier for an API key (raw keys are never stored)"""
+    if not api_key:
+        return DEMO_KEY_ID
+    return "key_" + hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+def today():
+    """Ledger day bucket (UTC, so all processes agree on the rollover)"""
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+def seconds_until_tomorrow():
+    """Seconds until the next ledger day starts (UTC midnight)"""
+    now = datetime.now(timezone.utc)
+    tomorrow = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return (tomorrow - now).total_seconds()
+
+class UsageLedger:
+    """Persistent token/cost ledger aggregated per API key, per day and per stage"""
+
+    def __init__(self, db_path="travelai.db"):
+        self.db_path = db_path
+        self.init_database()
+
+    def _connect(self):
+        # Several Streamlit sessions (and processes) write here concurrently:
+        # WAL lets readers proceed during writes, busy timeout queues writers
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        return conn
+
+    def init_database(self):
+        """Initialize database with schema"""
+        conn = self._connect()
+        schema_path = Path(__file__).parent / "schema.sql"
+        with open(schema_path, 'r') as f:
+            conn.executescript(f.read())
+        conn.commit()
+        conn.close()
+
+    def record(self, key_id, stage, input_tokens, output_tokens, cost_usd):
+        """Add one LLM call to today's bucket (single atomic upsert)"""
+        conn = self._connect()
+        conn.execute("""
+            INSERT INTO usage_ledger (key_id, day, stage, calls, input_tokens, output_tokens, cost_usd)
+            VALUES (?, ?, ?, 1, ?, ?, ?)
+            ON CONFLICT (key_id, day, stage) DO UPDATE SET
+                calls = calls + 1,
+                input_tokens = input_tokens + excluded.input_tokens,
+                output_tokens = output_tokens + excluded.output_tokens,
+                cost_usd = cost_usd + excluded.cost_usd,
+                updated_at = CURRENT_TIMESTAMP
+        """, (key_id, today(), stage, input_tokens, output_tokens, cost_usd))
+        conn.commit()
+        conn.close()
+
+    def get_daily_tokens(self, key_id, day=None):
+        """Total input + output tokens used by a key on a day"""
+        conn = self._connect()
+        row = conn.execute("""
+            SELECT COALESCE(SUM(input_tokens + output_tokens), 0)
+            FROM usage_ledger WHERE key_id = ? AND day = ?
+        """, (key_id, day or today())).fetchone()
+        conn.close()
+        return row[0]
+
+    def get_daily_usage(self, key_id, day=None):
+        """Per-stage usage breakdown for a key on a day"""
+        conn = self._connect()
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT stage, calls, input_tokens, output_tokens, cost_usd
+            FROM usage_ledger WHERE key_id = ? AND day = ?
+            ORDER BY stage
+        """, (key_id, day or today()))
+        usage = [dict(row) for row in cursor.fetchall()]
+        conn.close()
+        return usage
@@ -0,0 +1,147 @@
+import atexit
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+_STOP = object()
+
+class WriteBehindWriter:
+    """
+    Background SQLite writer.
+
+    Writes are queued as jobs (callables taking a cursor) and applied by a
+    single thread that coalesces whatever is queued into one transaction.
+    The queue is bounded; when it is full the caller writes synchronously
+    instead of dropping data. Pending writes are flushed at interpreter exit.
+    """
+
+    def __init__(self, db_path, max_queue=1000, batch_size=100, put_timeout=0.5):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.put_timeout = put_timeout
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._closed = False
+        # Held while checking _closed and queueing, so nothing lands behind _STOP
+        self._close_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="db-write-behind", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _enqueue(self, item, timeout=None) -> bool:
+        """
+        Queue an item unless the writer is closed
+        The _closed check and the put happen under one lock so nothing lands
+        behind _STOP, but the lock is not held while waiting for room.
+        Args:
+            timeout: Seconds to wait for room when the queue is full (None = no limit)
+        Returns:
+            True if queued, False if closed or still full after timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._close_lock:
+                if self._closed:
+                    return False
+                try:
+                    self._queue.put_nowait(item)
+                    return True
+                except queue.Full:
+                    pass
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.005)
+
+    def submit(self, job) -> Future:
+        """Queue job(cursor) for writing; the Future resolves to its return value"""
+        future = Future()
+        if self._enqueue((job, future), timeout=self.put_timeout):
+            return future
+        if not self._closed:
+            print("[DEBUG] Write-behind queue full, writing synchronously")
+        # Backpressure (or shutdown): write in the caller's thread
+        conn = self._connect()
+        try:
+            self._apply(conn, [(job, future)])
+        finally:
+            conn.close()
+        return future
+
+    def flush(self, timeout=None):
+        """Block until everything queued so far is committed"""
+        done = threading.Event()
+        started = time.monotonic()
+        if not self._enqueue((lambda cursor: done.set(), Future()), timeout=timeout):
+            # Closed means the writer thread already drained the queue
+            return self._closed
+        return done.wait(None if timeout is None else max(0.0, timeout - (time.monotonic() - started)))
+
+    def close(self):
+        """Flush pending writes and stop the writer thread"""
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+        # No put can follow _STOP once _closed is set under the lock
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _run(self):
+        conn = self._connect()
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            # Coalesce everything already waiting into the same transaction
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if _STOP in batch:
+                stopping = True
+                batch = [item for item in batch if item is not _STOP]
+                # Drain anything queued behind the stop marker
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is not _STOP:
+                        batch.append(item)
+            if batch:
+                self._apply(conn, batch)
+        conn.close()
+
+    def _apply(self, conn, batch):
+        """Run a batch in one transaction; on failure retry jobs one by one"""
+        try:
+            cursor = conn.cursor()
+            results = [job(cursor) for job, _ in batch]
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            if len(batch) == 1:
+                print(f"❌ Write-behind job failed: {e}")
+                batch[0][1].set_exception(e)
+                return
+            for item in batch:
+                self._apply(conn, [item])
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+def get_writer(db_path) -> WriteBehindWriter:
+    """Shared writer per database file (one per process)"""
+    with _writers_lock:
+        if db_path not in _writers:
+            _writers[db_path] = WriteBehindWriter(db_path)
+        return _writers[db_path]
@@ -1,3 +1,26 @@
-from .search_tool import SearchTool
-from .geocoding_tool import GeocodingTool
-from .image_tool import ImageTool
\ No newline at end of file
+"""Tools package; tools (and requests) are loaded on first attribute access"""
+import importlib
+from typing import TYPE_CHECKING
+
+_EXPORTS = {
+    "SearchTool": ".search_tool",
+    "GeocodingTool": ".geocoding_tool",
+    "ImageTool": ".image_tool",
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
+
+if TYPE_CHECKING:
+    from .search_tool import SearchTool
+    from .geocoding_tool import GeocodingTool
+    from .image_tool import ImageTool
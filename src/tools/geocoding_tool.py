@@ -1,34 +1,108 @@
-import requests
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from src.utils.cassette import http_get, get_cassette
+from src.utils.cache import get_cache
+from src.utils.metrics import track_tool_call
+from src.utils.config import GEOCODE_CACHE_TTL
+from src.utils.single_flight import get_single_flight
+
+# Failed lookups are retried sooner
+FAILED_LOOKUP_TTL = 3600
+# Per-service request timeout and the default budget for one lookup (seconds)
+SERVICE_TIMEOUT = 5
+LOOKUP_TIMEOUT = 10
 
 class GeocodingTool:
+    # Nominatim usage policy: at most one request per second
+    _nominatim_lock = threading.Lock()
+    _nominatim_last_call = 0.0
+
     def __init__(self):
         self.nominatim_url = "https://nominatim.openstreetmap.org/search"
         self.photon_url = "https://photon.komoot.io/api/"
-    
-    def get_coordinates(self, location: str):
+        # Shared across instances and processes: coordinates practically never change
+        self.cache = get_cache("geocode", GEOCODE_CACHE_TTL)
+        self.flight = get_single_flight("geocode")
+
+    def get_coordinates(self, location: str, bias: dict = None, refresh: bool = False,
+                        timeout: float = LOOKUP_TIMEOUT):
         """
         Get latitude and longitude for a location with fallback services
+        Args:
+            location: Place name to look up
+            bias: Optional {"lat", "lon"} to prefer results near (e.g. the destination city)
+            refresh: Skip the cache and fetch a fresh result
+            timeout: Seconds the lookup may take across both services (0 = cached result only)
         """
+        cache_key = self.cache_key(location, bias)
+        if not refresh:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+        if timeout <= 0:
+            return {"error": "Skipped: out of time"}
+
+        result, _ = self.flight.do(cache_key, lambda: self._lookup(location, bias, cache_key, timeout))
+        return result
+
+    def _lookup(self, location: str, bias: dict, cache_key, timeout: float):
+        expires_at = time.monotonic() + timeout
         # Try Photon first (faster, no rate limits)
-        result = self._try_photon(location)
-        if result and "error" not in result:
-            return result
-        
-        # Fallback to Nominatim
-        result = self._try_nominatim(location)
+        result = self._try_photon(location, bias, timeout=min(SERVICE_TIMEOUT, timeout))
+        if not result or "error" in result:
+            # Fallback to Nominatim
+            result = self._try_nominatim(location, expires_at)
+
         if result and "error" not in result:
+            self.cache.set(cache_key, result)
             return result
-        
-        return {"error": "Could not geocode location"}
-    
-    def _try_photon(self, location: str):
+
+        result = {"error": "Could not geocode location"}
+        # A lookup cut short by a deadline says nothing about the place itself
+        if timeout >= LOOKUP_TIMEOUT:
+            self.cache.set(cache_key, result, ttl=FAILED_LOOKUP_TTL)
+        return result
+
+    def get_coordinates_batch(self, locations: list, bias: dict = None, max_workers: int = 4,
+                              timeout: float = None):
+        """
+        Geocode many locations concurrently (cached lookups cost nothing)
+        Args:
+            timeout: Optional seconds for the whole batch; lookups that would
+                start after it are skipped (cached results are still used)
+        Returns:
+            Dict mapping each location to its result
+        """
+        unique = list(dict.fromkeys(locations))
+        expires_at = time.monotonic() + timeout if timeout is not None else None
+
+        def lookup(location):
+            if expires_at is None:
+                return self.get_coordinates(location, bias)
+            remaining = expires_at - time.monotonic()
+            return self.get_coordinates(location, bias, timeout=min(LOOKUP_TIMEOUT, remaining) if remaining >= 1 else 0)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(lookup, unique)
+            return dict(zip(unique, results))
+
+    def cache_key(self, location: str, bias: dict = None):
+        if bias and "lat" in bias:
+            return [location.strip().lower(), round(bias["lat"], 1), round(bias["lon"], 1)]
+        return [location.strip().lower()]
+
+    def _try_photon(self, location: str, bias: dict = None, timeout: float = SERVICE_TIMEOUT):
         """Try Photon geocoding service (Komoot)"""
         try:
             params = {"q": location, "limit": 1}
-            response = requests.get(self.photon_url, params=params, timeout=5)
-            response.raise_for_status()
+            if bias and "lat" in bias:
+                params.update({"lat": bias["lat"], "lon": bias["lon"]})
+            with track_tool_call("geocode", self.photon_url):
+                response = http_get(self.photon_url, params=params, timeout=timeout)
+                response.raise_for_status()
             data = response.json()
-            
+
             if data.get("features"):
                 coords = data["features"][0]["geometry"]["coordinates"]
                 props = data["features"][0]["properties"]
@@ -40,16 +114,32 @@ class GeocodingTool:
         except Exception as e:
             print(f"[DEBUG] Photon failed: {e}")
             return None
-    
-    def _try_nominatim(self, location: str):
+
+    def _try_nominatim(self, location: str, expires_at: float = None):
         """Try Nominatim geocoding service (OpenStreetMap)"""
         try:
+            with GeocodingTool._nominatim_lock:
+                wait = 1.0 - (time.monotonic() - GeocodingTool._nominatim_last_call)
+                if get_cassette().mode == "replay":
+                    # Replayed responses never reach Nominatim, so there is nothing to throttle
+                    wait = 0
+                if expires_at is not None and expires_at - time.monotonic() - max(wait, 0) < 1:
+                    return None
+                if wait > 0:
+                    time.sleep(wait)
+                GeocodingTool._nominatim_last_call = time.monotonic()
+
+            timeout = SERVICE_TIMEOUT
+            if expires_at is not None:
+                timeout = min(timeout, expires_at - time.monotonic())
+
             params = {"q": location, "format": "json", "limit": 1}
             headers = {"User-Agent": "WanderAI/1.0 (travel-planner-app)"}
-            response = requests.get(self.nominatim_url, params=params, headers=headers, timeout=5)
-            response.raise_for_status()
+            with track_tool_call("geocode", self.nominatim_url):
+                response = http_get(self.nominatim_url, params=params, headers=headers, timeout=timeout)
+                response.raise_for_status()
             data = response.json()
-            
+
             if data:
                 return {
                     "lat": float(data[0]["lat"]),
@@ -1,19 +1,41 @@
-import requests
-from src.utils.config import UNSPLASH_ACCESS_KEY
+from src.utils.cassette import http_get
+from src.utils.config import UNSPLASH_ACCESS_KEY, IMAGE_CACHE_TTL
+from src.utils.cache import get_cache
+from src.utils.metrics import track_tool_call
+from src.utils.single_flight import get_single_flight
 
 class ImageTool:
     def __init__(self):
         self.access_key = UNSPLASH_ACCESS_KEY
         self.base_url = "https://api.unsplash.com/search/photos"
+        self.cache = get_cache("image", IMAGE_CACHE_TTL)
+        self.flight = get_single_flight("image")
     
-    def get_destination_image(self, location: str):
+    def cache_key(self, location: str):
+        return [location.strip().lower()]
+    
+    def get_destination_image(self, location: str, refresh: bool = False, timeout: float = 10):
         """
         Get representative image for a destination
         Args:
             location: Location name
+            refresh: Skip the cache and fetch a fresh image
+            timeout: Seconds to wait for the API (0 = cached image only)
         Returns:
             Dict with image URL and photographer attribution
         """
+        cache_key = self.cache_key(location)
+        if not refresh:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+        if timeout <= 0:
+            return {"error": "Skipped: out of time"}
+        
+        image, _ = self.flight.do(cache_key, lambda: self._fetch(location, cache_key, timeout))
+        return image
+    
+    def _fetch(self, location: str, cache_key, timeout: float):
         params = {
             "query": f"{location} travel landmark",
             "per_page": 1,
@@ -24,17 +46,20 @@ class ImageTool:
         }
         
         try:
-            response = requests.get(self.base_url, params=params, headers=headers, timeout=10)
-            response.raise_for_status()
+            with track_tool_call("image", self.base_url):
+                response = http_get(self.base_url, params=params, headers=headers, timeout=timeout)
+                response.raise_for_status()
             data = response.json()
             
             if data["results"]:
                 result = data["results"][0]
-                return {
+                image = {
                     "url": result["urls"]["regular"],
                     "photographer": result["user"]["name"],
                     "photographer_url": result["user"]["links"]["html"]
                 }
+                self.cache.set(cache_key, image)
+                return image
             return {"error": "No image found"}
         except Exception as e:
             return {"error": str(e)}
\ No newline at end of file
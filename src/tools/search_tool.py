@@ -1,20 +1,43 @@
-import requests
-from src.utils.config import TAVILY_API_KEY
+from src.utils.cassette import http_post
+from src.utils.config import TAVILY_API_KEY, SEARCH_CACHE_TTL
+from src.utils.cache import get_cache
+from src.utils.single_flight import get_single_flight
+from src.utils.metrics import track_tool_call
 
 class SearchTool:
     def __init__(self):
         self.api_key = TAVILY_API_KEY
         self.base_url = "https://api.tavily.com/search"
+        self.cache = get_cache("search", SEARCH_CACHE_TTL)
+        self.flight = get_single_flight("search")
     
-    def search(self, query: str, max_results: int = 5):
+    def cache_key(self, query: str, max_results: int = 5):
+        return [" ".join(query.lower().split()), max_results]
+    
+    def search(self, query: str, max_results: int = 5, refresh: bool = False, timeout: float = 10):
         """
         Search the web using Tavily API
         Args:
             query: Search query string
             max_results: Maximum number of results to return
+            refresh: Skip the cache and fetch fresh results
+            timeout: Seconds to wait for the API (0 = cached results only)
         Returns:
             List of search results with title, content, and URL
         """
+        cache_key = self.cache_key(query, max_results)
+        if not refresh:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+        if timeout <= 0:
+            return {"error": "Skipped: out of time", "results": []}
+        
+        # Concurrent plans for the same city share one upstream request
+        results, _ = self.flight.do(cache_key, lambda: self._fetch(query, max_results, cache_key, timeout))
+        return results
+    
+    def _fetch(self, query: str, max_results: int, cache_key, timeout: float):
         payload = {
             "api_key": self.api_key,
             "query": query,
@@ -24,8 +47,9 @@ class SearchTool:
         }
         
         try:
-            response = requests.post(self.base_url, json=payload, timeout=10)
-            response.raise_for_status()
+            with track_tool_call("search", self.base_url):
+                response = http_post(self.base_url, json=payload, timeout=timeout)
+                response.raise_for_status()
             data = response.json()
             
             results = {
@@ -39,6 +63,7 @@ class SearchTool:
                     for r in data.get("results", [])
                 ]
             }
+            self.cache.set(cache_key, results)
             return results
         except Exception as e:
             return {"error": str(e), "results": []}
\ No newline at end of file
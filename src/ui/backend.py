@@ -0,0 +1,247 @@
+"""
+Planning backends used by the Streamlit app.
+
+RemoteBackend is a thin client of the planning API (src/api/server.py) and is
+used when PLANNING_API_URL is set; LocalBackend runs the pipeline in-process
+for local development. Both expose the same methods.
+"""
+import json
+import queue
+import threading
+from concurrent.futures import Future
+from src.utils.config import DB_PATH, PLANNING_API_URL, DEMO_MAX_CONCURRENT_PLANS
+
+# Shown when the planning service can't report the demo quota (no bar, not busy)
+UNKNOWN_QUOTA = {
+    "active_plans": 0,
+    "queued_plans": 0,
+    "max_concurrent_plans": DEMO_MAX_CONCURRENT_PLANS,
+    "tokens_used_today": 0,
+    "daily_token_budget": 0,
+}
+
+def _done_future(value):
+    future = Future()
+    future.set_result(value)
+    return future
+
+class LocalBackend:
+    def __init__(self, db_path=DB_PATH):
+        from src.database import DatabaseManager
+        from src.agents.prefetcher import Prefetcher
+        self.db = DatabaseManager(db_path)
+        self.prefetcher = Prefetcher()
+
+    def prefetch(self, destination):
+        """Start warming lookups for a destination still being entered"""
+        return self.prefetcher.request(destination)
+
+    def plan_trip(self, destination, start_date, end_date, budget, interests, api_key=None, on_progress=None):
+        """
+        Run the pipeline and queue the trip for saving
+        Returns:
+            (plan, Future resolving to the saved trip id or None)
+        """
+        from src.agents import TravelCoordinator
+        coordinator = TravelCoordinator(api_key=api_key)
+        
+        # Graph nodes run on worker threads; relay progress so on_progress
+        # always runs in the caller's (Streamlit script) thread
+        events = queue.Queue()
+        outcome = {}
+        
+        def run():
+            try:
+                outcome["plan"] = coordinator.plan_trip(
+                    destination, start_date, end_date, budget, interests,
+                    progress_callback=lambda stage, status: events.put((stage, status))
+                )
+            except Exception as e:
+                outcome["plan"] = {"error": str(e)}
+            events.put(None)
+        
+        threading.Thread(target=run, name="local-plan", daemon=True).start()
+        for event in iter(events.get, None):
+            if on_progress:
+                on_progress(*event)
+        plan = outcome["plan"]
+        
+        if "error" in plan:
+            return plan, _done_future(None)
+        future = self.db.save_trip_async(
+            destination=destination,
+            start_date=start_date,
+            end_date=end_date,
+            budget=budget,
+            interests=interests,
+            itinerary=plan,
+            findings=coordinator.stage_findings
+        )
+        return plan, future
+
+    def get_recent_trips(self, limit=5):
+        return self.db.get_recent_trips(limit=limit)
+
+    def search_trips(self, query, limit=10, offset=0):
+        return self.db.search_trips(query, limit=limit, offset=offset)
+
+    def load_trip(self, trip_id):
+        """Saved plan for a trip id, or None"""
+        trip = self.db.get_trip(trip_id)
+        return json.loads(trip["itinerary_json"]) if trip else None
+
+    def compare_destinations(self, destinations, start_date, end_date, budget, interests, api_key=None):
+        """Rank candidate cities without writing itineraries; returns the comparison or {"error": ...}"""
+        from src.agents import TravelCoordinator
+        return TravelCoordinator(api_key=api_key).compare_destinations(destinations, start_date, end_date, budget, interests)
+
+    def regenerate_day(self, trip_id, day_index, feedback="", api_key=None):
+        """Rewrite one day (0-based) of a saved trip; returns the updated plan or {"error": ...}"""
+        from src.agents import TravelCoordinator
+        return TravelCoordinator(api_key=api_key).regenerate_day(trip_id, day_index, feedback, db=self.db)
+
+    def get_demo_status(self):
+        from src.utils.admission import get_admission_controller
+        from src.database.usage_ledger import DEMO_KEY_ID
+        return get_admission_controller().get_status(DEMO_KEY_ID)
+
+class RemoteBackend:
+    def __init__(self, base_url=PLANNING_API_URL, timeout=10):
+        import requests
+        from src.agents.prefetcher import Prefetcher
+        self.session = requests.Session()
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        # Debounced and bounded here; the service runs the lookups
+        self.prefetcher = Prefetcher(fetch=self._post_prefetch)
+
+    def prefetch(self, destination):
+        """Start warming lookups for a destination still being entered"""
+        return self.prefetcher.request(destination)
+
+    def _post_prefetch(self, destination, cancelled=None):
+        if cancelled is not None and cancelled.is_set():
+            return []
+        response = self.session.post(f"{self.base_url}/prefetch", json={"destination": destination}, timeout=self.timeout)
+        return ["remote"] if response.status_code == 202 else []
+
+    def _get(self, path, default, **params):
+        """GET JSON from the service; default when it is unreachable or returns an error"""
+        import requests
+        try:
+            response = self.session.get(f"{self.base_url}{path}", params=params, timeout=self.timeout)
+            response.raise_for_status()
+            return response.json()
+        except (requests.RequestException, ValueError) as e:
+            print(f"[DEBUG] Planning service GET {path} failed: {e}")
+            return default
+
+    def plan_trip(self, destination, start_date, end_date, budget, interests, api_key=None, on_progress=None):
+        """Submit the plan and follow its event stream until the result arrives"""
+        payload = {
+            "destination": destination,
+            "start_date": start_date,
+            "end_date": end_date,
+            "budget": budget,
+            "interests": interests,
+        }
+        headers = {"X-Anthropic-Key": api_key} if api_key else {}
+        response = None
+        try:
+            response = self.session.post(f"{self.base_url}/plans/stream", json=payload, headers=headers,
+                                         stream=True, timeout=(self.timeout, None))
+            if response.status_code == 422:
+                return {"error": f"Invalid request: {response.json().get('detail')}"}, _done_future(None)
+            response.raise_for_status()
+            events = self._read_events(response)
+            for event in events:
+                if event.get("type") == "progress" and on_progress:
+                    on_progress(event["stage"], event["status"])
+                elif event.get("type") == "result":
+                    plan = event["result"]
+                    if not event.get("saving"):
+                        return plan, _done_future(plan.get("trip_id"))
+                    # The trip id arrives in a later event; keep reading off the caller's thread
+                    trip_id = Future()
+                    threading.Thread(target=self._follow_save, args=(response, events, trip_id),
+                                     name="plan-save", daemon=True).start()
+                    response = None
+                    return plan, trip_id
+        except Exception as e:
+            return {"error": f"Planning service unavailable: {e}"}, _done_future(None)
+        finally:
+            if response is not None:
+                response.close()
+        return {"error": "Planning service closed the stream before sending a result"}, _done_future(None)
+
+    def _follow_save(self, response, events, trip_id):
+        """Resolve trip_id from the trip_saved event (None if the stream ends without one)"""
+        try:
+            for event in events:
+                if event.get("type") == "trip_saved":
+                    trip_id.set_result(event["trip_id"])
+                    return
+        except Exception as e:
+            print(f"[DEBUG] Lost the plan stream before the trip was saved: {e}")
+        finally:
+            response.close()
+            if not trip_id.done():
+                trip_id.set_result(None)
+
+    def _read_events(self, response):
+        """Parse a server-sent event stream into dicts"""
+        data = []
+        for line in response.iter_lines(decode_unicode=True):
+            if line is None or line.startswith(":"):
+                continue
+            if line.startswith("data:"):
+                data.append(line[5:].strip())
+            elif line == "" and data:
+                yield json.loads("\n".join(data))
+                data = []
+
+    def get_recent_trips(self, limit=5):
+        return self._get("/trips", [], limit=limit)
+
+    def search_trips(self, query, limit=10, offset=0):
+        return self._get("/trips/search", [], q=query, limit=limit, offset=offset)
+
+    def load_trip(self, trip_id):
+        """Saved plan for a trip id, or None"""
+        trip = self._get(f"/trips/{trip_id}", None)
+        return trip["itinerary"] if trip else None
+
+    def compare_destinations(self, destinations, start_date, end_date, budget, interests, api_key=None):
+        """Rank candidate cities without writing itineraries; returns the comparison or {"error": ...}"""
+        return self._post_json("/compare", {
+            "destinations": destinations,
+            "start_date": start_date,
+            "end_date": end_date,
+            "budget": budget,
+            "interests": interests,
+        }, api_key)
+
+    def regenerate_day(self, trip_id, day_index, feedback="", api_key=None):
+        """Rewrite one day (0-based) of a saved trip; returns the updated plan or {"error": ...}"""
+        return self._post_json(f"/trips/{trip_id}/days/{day_index}/regenerate", {"feedback": feedback}, api_key)
+
+    def _post_json(self, path, payload, api_key=None):
+        """POST a synchronous request; errors come back as {"error": ...}"""
+        headers = {"X-Anthropic-Key": api_key} if api_key else {}
+        try:
+            response = self.session.post(f"{self.base_url}{path}", json=payload, headers=headers,
+                                         timeout=(self.timeout, None))
+        except Exception as e:
+            return {"error": f"Planning service unavailable: {e}"}
+        if response.status_code >= 400:
+            return {"error": str(response.json().get("detail", response.text))}
+        return response.json()
+
+    def get_demo_status(self):
+        return self._get("/quota/demo", dict(UNKNOWN_QUOTA))
+
+def get_backend():
+    """Remote client when a planning service is configured, else in-process"""
+    if PLANNING_API_URL:
+        return RemoteBackend(PLANNING_API_URL)
+    return LocalBackend()
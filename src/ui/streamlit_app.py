@@ -6,9 +6,10 @@ from pathlib import Path
 # Add parent directory to path for imports
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
-from src.agents import TravelCoordinator
-from src.database import DatabaseManager
-from src.utils.config import validate_config
+from src.ui.backend import get_backend
+from src.utils.config import validate_config, WARMER_INTERVAL, METRICS_PORT, METRICS_HOST, MAINTENANCE_INTERVAL
+from src.utils.destination_knowledge import INTEREST_TAGS
+from src.utils.itinerary_model import render_day
 
 # Page config
 st.set_page_config(
@@ -61,8 +62,39 @@ if 'trip_plan' not in st.session_state:
     st.session_state.trip_plan = None
 if 'generating' not in st.session_state:
     st.session_state.generating = False
-if 'db' not in st.session_state:
-    st.session_state.db = DatabaseManager()
+if 'comparison' not in st.session_state:
+    st.session_state.comparison = None
+if 'comparing' not in st.session_state:
+    st.session_state.comparing = False
+if 'backend' not in st.session_state:
+    st.session_state.backend = get_backend()
+
+# Background cache warmer: one per server process
+@st.cache_resource
+def start_cache_warmer():
+    from src.agents.cache_warmer import start_background_warmer
+    return start_background_warmer(WARMER_INTERVAL)
+
+if WARMER_INTERVAL:
+    start_cache_warmer()
+
+# Database retention and compaction: one per server process
+@st.cache_resource
+def start_db_maintenance():
+    from src.database.maintenance import start_background_maintenance
+    return start_background_maintenance(MAINTENANCE_INTERVAL)
+
+if MAINTENANCE_INTERVAL:
+    start_db_maintenance()
+
+# Prometheus scrape endpoint: one per server process
+@st.cache_resource
+def start_metrics():
+    from src.utils.metrics import start_metrics_server
+    return start_metrics_server(METRICS_PORT, METRICS_HOST)
+
+if METRICS_PORT:
+    start_metrics()
 
 # Header
 st.markdown('<div class="main-header">✈️ WanderAI</div>', unsafe_allow_html=True)
@@ -86,22 +118,63 @@ with st.sidebar:
             help="Your API key is only used for this session and never stored."
         )
         st.caption("🔒 Your key is never stored or logged")
+    else:
+        demo_status = st.session_state.backend.get_demo_status()
+        if demo_status["daily_token_budget"]:
+            used_fraction = min(demo_status["tokens_used_today"] / demo_status["daily_token_budget"], 1.0)
+            st.progress(used_fraction, text=f"Demo quota used today: {used_fraction:.0%}")
+        if demo_status["active_plans"] >= demo_status["max_concurrent_plans"]:
+            st.caption(f"⏳ Demo key is busy ({demo_status['queued_plans']} waiting) - your plan may be queued")
     
     st.divider()
     
     # Past trips
     st.header("📚 Past Trips")
-    past_trips = st.session_state.db.get_all_trips()
+    TRIPS_PER_PAGE = 5
+    search_query = st.text_input("🔎 Search trips", placeholder="e.g., Lisbon, ramen, museums")
+    if 'search_page' not in st.session_state or st.session_state.get('last_search') != search_query:
+        st.session_state.search_page = 0
+        st.session_state.last_search = search_query
+    
+    if search_query:
+        # Fetch one extra row to know whether there is a next page
+        past_trips = st.session_state.backend.search_trips(
+            search_query,
+            limit=TRIPS_PER_PAGE + 1,
+            offset=st.session_state.search_page * TRIPS_PER_PAGE
+        )
+    else:
+        past_trips = st.session_state.backend.get_recent_trips(limit=TRIPS_PER_PAGE)
+    has_next_page = len(past_trips) > TRIPS_PER_PAGE
     
     if past_trips:
-        for trip in past_trips[:5]:  # Show last 5 trips
+        for trip in past_trips[:TRIPS_PER_PAGE]:
             with st.expander(f"🌍 {trip['destination']} - {trip['start_date']}"):
                 st.write(f"**Dates:** {trip['start_date']} to {trip['end_date']}")
                 st.write(f"**Budget:** ${trip['budget']}")
+                if trip.get('snippet'):
+                    st.caption(trip['snippet'])
                 if st.button(f"Load Trip", key=f"load_{trip['id']}"):
-                    import json
-                    st.session_state.trip_plan = json.loads(trip['itinerary_json'])
+                    st.session_state.trip_plan = st.session_state.backend.load_trip(trip['id'])
+                    st.session_state.trip_id = trip['id']
+                    st.session_state.trip_id_future = None
+                    st.session_state.show_day = 0
+                    st.rerun()
+        
+        if search_query and (st.session_state.search_page > 0 or has_next_page):
+            col_prev, col_page, col_next = st.columns([1, 1, 1])
+            with col_prev:
+                if st.button("◀", disabled=st.session_state.search_page == 0, key="search_prev"):
+                    st.session_state.search_page -= 1
                     st.rerun()
+            with col_page:
+                st.caption(f"Page {st.session_state.search_page + 1}")
+            with col_next:
+                if st.button("▶", disabled=not has_next_page, key="search_next"):
+                    st.session_state.search_page += 1
+                    st.rerun()
+    elif search_query:
+        st.info("No trips match your search.")
     else:
         st.info("No past trips yet. Create your first itinerary!")
 
@@ -111,14 +184,32 @@ col1, col2 = st.columns([2, 1])
 with col1:
     st.header("🗺️ Plan Your Trip")
     
+    # Outside the form so lookups for the city can start while the rest is filled in
+    def prefetch_destination():
+        st.session_state.backend.prefetch(st.session_state.destination)
+    
+    destination = st.text_input(
+        "Destination City",
+        placeholder="e.g., Tokyo, Paris, New York",
+        help="Enter a single city name",
+        key="destination",
+        on_change=prefetch_destination
+    )
+    
+    compare_mode = st.toggle("🔀 Compare with other cities", key="compare_mode",
+                             help="Rank several cities for your dates and budget, then plan the one you pick")
+    compare_with = ""
+    if compare_mode:
+        compare_with = st.text_input(
+            "Compare with",
+            placeholder="e.g., Porto, Seville",
+            help="Up to 4 more cities, separated by commas",
+            key="compare_with"
+        )
+    candidates = [destination] + [city.strip() for city in compare_with.split(",") if city.strip()]
+    
     # Input form
     with st.form("trip_form"):
-        destination = st.text_input(
-            "Destination City",
-            placeholder="e.g., Tokyo, Paris, New York",
-            help="Enter a single city name"
-        )
-        
         col_date1, col_date2 = st.columns(2)
         with col_date1:
             start_date = st.date_input(
@@ -144,13 +235,15 @@ with col1:
         
         interests = st.multiselect(
             "Your Interests",
-            ["Food & Dining", "Culture & History", "Nature & Outdoors", "Shopping", 
-             "Nightlife", "Art & Museums", "Adventure", "Photography", "Relaxation", "Architecture"],
+            INTEREST_TAGS,
             default=["Food & Dining", "Culture & History"],
             help="Select up to 5 interests (recommended)"
         )
         
-        submitted = st.form_submit_button("🚀 Generate Itinerary", use_container_width=True)
+        submitted = st.form_submit_button(
+            "🔀 Compare Destinations" if compare_mode else "🚀 Generate Itinerary",
+            use_container_width=True
+        )
         
         if submitted:
             # Validation
@@ -162,6 +255,11 @@ with col1:
                 st.error("❌ Please select no more than 5 interests")
             elif end_date <= start_date:
                 st.error("❌ End date must be after start date")
+            elif compare_mode and not 2 <= len(candidates) <= 5:
+                st.error("❌ Please enter 2 to 5 cities to compare")
+            elif compare_mode:
+                st.session_state.comparing = True
+                st.rerun()
             else:
                 st.session_state.generating = True
                 st.rerun()
@@ -192,56 +290,117 @@ with col2:
     - Single-city trips only
     """)
 
+# Compare destinations
+if st.session_state.comparing:
+    st.session_state.comparing = False
+    
+    with st.spinner(f"🔀 Comparing {', '.join(candidates)}..."):
+        comparison = st.session_state.backend.compare_destinations(
+            candidates,
+            start_date.strftime("%Y-%m-%d"),
+            end_date.strftime("%Y-%m-%d"),
+            float(budget),
+            interests,
+            api_key=user_api_key
+        )
+    if "error" in comparison:
+        st.error(f"❌ Error: {comparison['error']}")
+    else:
+        st.session_state.comparison = comparison
+        st.session_state.trip_plan = None
+        st.rerun()
+
+# Comparison results: plan only the city the traveler picks
+if st.session_state.comparison and not st.session_state.trip_plan:
+    st.divider()
+    comparison = st.session_state.comparison
+    st.header("🔀 Destination Comparison")
+    st.subheader(f"📅 {comparison['dates']} • 💰 ${comparison['budget']} budget")
+    verdict_icons = {"comfortable": "🟢", "tight": "🟡", "insufficient": "🔴"}
+    
+    for candidate in comparison["destinations"]:
+        with st.container(border=True):
+            col_name, col_cost, col_season, col_pick = st.columns([3, 2, 2, 2])
+            with col_name:
+                st.markdown(f"**#{candidate['rank']} {candidate['destination']}**")
+                st.caption(candidate['summary'] or candidate['overview'])
+            with col_cost:
+                if candidate['estimated_total_usd']:
+                    st.metric("Estimated Cost", f"${candidate['estimated_total_usd']:,.0f}",
+                              help=f"About ${candidate['daily_cost_usd']:,.0f} per day")
+                if candidate['verdict']:
+                    st.caption(f"{verdict_icons.get(candidate['verdict'], '')} Budget is {candidate['verdict']}")
+            with col_season:
+                if candidate['season_rating']:
+                    st.metric("Season", "⭐" * candidate['season_rating'])
+            with col_pick:
+                if st.button(f"🚀 Plan {candidate['destination']}", key=f"pick_{candidate['destination']}",
+                             use_container_width=True):
+                    st.session_state.plan_request = {
+                        "destination": candidate['destination'],
+                        "start_date": comparison['start_date'],
+                        "end_date": comparison['end_date'],
+                        "budget": comparison['budget'],
+                        "interests": comparison['interests'],
+                    }
+                    st.session_state.comparison = None
+                    st.session_state.generating = True
+                    st.rerun()
+    
+    if 'usage_stats' in comparison:
+        st.caption(f"⚡ Comparison cost: ${comparison['usage_stats']['estimated_cost_usd']:.4f}")
+
 # Generate itinerary
 if st.session_state.generating:
     st.session_state.generating = False
+    # A city picked from a comparison, else the form
+    plan_request = st.session_state.get('plan_request') or {
+        "destination": destination,
+        "start_date": start_date.strftime("%Y-%m-%d"),
+        "end_date": end_date.strftime("%Y-%m-%d"),
+        "budget": float(budget),
+        "interests": interests,
+    }
+    st.session_state.plan_request = None
     
     with st.spinner("🤖 AI agents are working on your itinerary..."):
         # Progress indicator
         progress_bar = st.progress(0)
         status_text = st.empty()
         
-        status_text.text("🔍 Researching destination...")
-        progress_bar.progress(25)
-        
-        # Create coordinator
-        coordinator = TravelCoordinator(api_key=user_api_key)
+        # Real progress reported by the pipeline as each stage completes
+        stage_progress = {
+            "research_destination": ("🔍 Researching destination...", 5, 20),
+            "find_activities": ("🎯 Finding activities...", 20, 45),
+            "analyze_budget": ("💰 Analyzing budget...", 45, 60),
+            "plan_schedule": ("🗺️ Scheduling activities...", 60, 65),
+            "build_itinerary": ("📅 Building itinerary...", 65, 95),
+        }
         
-        status_text.text("🎯 Finding activities...")
-        progress_bar.progress(50)
+        def on_progress(stage, status):
+            if stage in stage_progress:
+                label, started_pct, completed_pct = stage_progress[stage]
+                status_text.text(label)
+                progress_bar.progress(completed_pct if status == "completed" else started_pct)
         
-        # Generate trip
-        trip_plan = coordinator.plan_trip(
-            destination=destination,
-            start_date=start_date.strftime("%Y-%m-%d"),
-            end_date=end_date.strftime("%Y-%m-%d"),
-            budget=float(budget),
-            interests=interests
+        # Generate trip (saved in the background by the backend)
+        trip_plan, trip_id_future = st.session_state.backend.plan_trip(
+            **plan_request,
+            api_key=user_api_key,
+            on_progress=on_progress
         )
         
-        status_text.text("💰 Analyzing budget...")
-        progress_bar.progress(75)
-        
         if "error" in trip_plan:
             st.error(f"❌ Error: {trip_plan['error']}")
         else:
             st.session_state.trip_plan = trip_plan
-            
-            # Save to database
-            import json
-            st.session_state.db.save_trip(
-                destination=destination,
-                start_date=start_date.strftime("%Y-%m-%d"),
-                end_date=end_date.strftime("%Y-%m-%d"),
-                budget=float(budget),
-                interests=interests,
-                itinerary=trip_plan
-            )
+            st.session_state.trip_id = None
+            st.session_state.trip_id_future = trip_id_future
+            st.session_state.show_day = 0
             
             status_text.text("✅ Complete!")
             progress_bar.progress(100)
-        
-        st.rerun()
+            st.rerun()
 
 # Display results
 if st.session_state.trip_plan and "error" not in st.session_state.trip_plan:
@@ -260,6 +419,10 @@ if st.session_state.trip_plan and "error" not in st.session_state.trip_plan:
     st.header(f"🌍 {plan['destination']}")
     st.subheader(f"📅 {plan['dates']} • 💰 ${plan['budget']} budget")
     
+    degradations = (plan.get("deadline") or {}).get("degradations", [])
+    if degradations:
+        st.caption("⏱️ Some lookups were skipped to finish on time: " + ", ".join(d["what"] for d in degradations))
+    
     # Overview section
     with st.expander("📖 Destination Overview", expanded=True):
         st.write(plan['destination_overview'])
@@ -274,7 +437,63 @@ if st.session_state.trip_plan and "error" not in st.session_state.trip_plan:
     
     # Main itinerary
     st.header("📋 Your Itinerary")
-    st.markdown(plan['itinerary'])
+    itinerary_days = plan.get('itinerary_days')
+    if itinerary_days:
+        totals = plan['cost_totals']
+        col_total, col_budget, col_left = st.columns(3)
+        with col_total:
+            st.metric("Estimated Total", f"${totals['total_usd']:,.0f}")
+        with col_budget:
+            st.metric("Budget", f"${totals['budget']:,.0f}")
+        with col_left:
+            remaining = totals['remaining_usd']
+            st.metric("Left Over", f"{'-' if remaining < 0 else ''}${abs(remaining):,.0f}")
+        if not totals['within_budget']:
+            st.warning(f"⚠️ This plan is about ${-totals['remaining_usd']:,.0f} over budget. "
+                       "Try regenerating the priciest days with cheaper picks.")
+        st.caption(f"Activities and meals ${totals['activities_usd']:,.0f} • Lodging ${totals['lodging_usd']:,.0f}")
+        if totals.get('unpriced_slots'):
+            st.caption(f"ℹ️ {totals['unpriced_slots']} activities have no cost estimate and are not in the total")
+        
+        # Only the selected day is rendered (tabs would render every day on each rerun)
+        if st.session_state.get('show_day') is not None:
+            st.session_state.itinerary_day = st.session_state.pop('show_day')
+        if st.session_state.get('itinerary_day', 0) >= len(itinerary_days):
+            st.session_state.itinerary_day = 0
+        selected_day = st.radio(
+            "Day", list(range(len(itinerary_days))), horizontal=True, key="itinerary_day",
+            label_visibility="collapsed",
+            format_func=lambda i: f"Day {itinerary_days[i]['day']} · ${itinerary_days[i]['total_usd']:,.0f}"
+        )
+        st.markdown(render_day(itinerary_days[selected_day]))
+    else:
+        st.markdown(plan['itinerary'])
+    
+    # Rewrite a single day instead of the whole trip
+    with st.expander("✏️ Not happy with a day?"):
+        regen_day = st.selectbox("Day", list(range(1, (plan.get('num_days') or 0) + 1)),
+                                 format_func=lambda d: f"Day {d}", key="regen_day")
+        regen_feedback = st.text_input("What should change?", key="regen_feedback",
+                                       placeholder="e.g. fewer museums, more time outdoors")
+        if st.button("🔁 Regenerate this day", disabled=regen_day is None):
+            if st.session_state.get('trip_id') is None and st.session_state.get('trip_id_future') is not None:
+                try:
+                    st.session_state.trip_id = st.session_state.trip_id_future.result(timeout=10)
+                except Exception:
+                    st.session_state.trip_id = None
+            if st.session_state.get('trip_id') is None:
+                st.warning("This trip hasn't been saved yet. Try again in a moment.")
+            else:
+                with st.spinner(f"Rewriting day {regen_day}..."):
+                    updated = st.session_state.backend.regenerate_day(
+                        st.session_state.trip_id, regen_day - 1, regen_feedback, api_key=user_api_key
+                    )
+                if "error" in updated:
+                    st.error(f"❌ Error: {updated['error']}")
+                else:
+                    st.session_state.trip_plan = updated
+                    st.session_state.show_day = regen_day - 1
+                    st.rerun()
     
     # Usage stats
     if 'usage_stats' in plan:
@@ -287,6 +506,8 @@ if st.session_state.trip_plan and "error" not in st.session_state.trip_plan:
                 st.metric("Output Tokens", f"{stats['output_tokens']:,}")
             with col3:
                 st.metric("Estimated Cost", f"${stats['estimated_cost_usd']:.4f}")
+            if stats.get('coalesced'):
+                st.caption("🔗 An identical plan was already being generated, so this one was shared at no extra cost")
     
     # Action buttons
     col1, col2 = st.columns(2)
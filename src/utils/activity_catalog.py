@@ -0,0 +1,97 @@
+from typing import TypedDict
+
+COST_TIERS = ["$", "$$", "$$$"]
+TIMES_OF_DAY = ["Morning", "Midday", "Evening", "Night"]
+SETTINGS = ["Indoor", "Outdoor", "Either"]
+
+class Activity(TypedDict):
+    """One activity record produced by the activity agent"""
+    name: str
+    description: str
+    location: str
+    duration_hours: float
+    cost_tier: str
+    time_of_day: str
+    setting: str
+
+# Tool definition used to force schema-constrained output from the activity agent
+ACTIVITY_TOOL = {
+    "name": "record_activities",
+    "description": "Record the catalog of recommended activities for this trip.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "activities": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "name": {"type": "string", "description": "Short activity name"},
+                        "description": {"type": "string", "description": "1-2 sentence description"},
+                        "location": {"type": "string", "description": "Specific venue or neighborhood that can be found on a map"},
+                        "duration_hours": {"type": "number", "description": "Typical duration in hours (half day = 4, full day = 8)"},
+                        "cost_tier": {"type": "string", "enum": COST_TIERS},
+                        "time_of_day": {"type": "string", "enum": TIMES_OF_DAY},
+                        "setting": {"type": "string", "enum": SETTINGS}
+                    },
+                    "required": ["name", "description", "location", "duration_hours", "cost_tier", "time_of_day", "setting"]
+                }
+            }
+        },
+        "required": ["activities"]
+    }
+}
+
+def parse_activities(message) -> list:
+    """Extract and normalize Activity records from a tool-use response"""
+    raw = []
+    for block in message.content:
+        if getattr(block, "type", None) == "tool_use" and block.name == ACTIVITY_TOOL["name"]:
+            raw = block.input.get("activities", []) if isinstance(block.input, dict) else []
+            break
+
+    activities = []
+    for item in raw:
+        if not isinstance(item, dict) or not item.get("name"):
+            continue
+        try:
+            duration = float(item.get("duration_hours", 2))
+        except (TypeError, ValueError):
+            duration = 2.0
+        activities.append(Activity(
+            name=str(item["name"]).strip(),
+            description=str(item.get("description", "")).strip(),
+            location=str(item.get("location", "")).strip(),
+            duration_hours=duration,
+            cost_tier=item.get("cost_tier") if item.get("cost_tier") in COST_TIERS else "$$",
+            time_of_day=item.get("time_of_day") if item.get("time_of_day") in TIMES_OF_DAY else "Midday",
+            setting=item.get("setting") if item.get("setting") in SETTINGS else "Either",
+        ))
+    return activities
+
+def serialize_activities(activities: list, fields=("name", "location", "duration_hours", "cost_tier", "time_of_day", "setting")) -> str:
+    """
+    Compact one-line-per-record rendering for downstream prompts.
+    Pass a subset of fields to keep later stages' prompts small.
+    """
+    lines = []
+    for i, activity in enumerate(activities, 1):
+        values = []
+        for field in fields:
+            value = activity.get(field, "")
+            if field == "duration_hours":
+                value = f"{value:g}h"
+            values.append(str(value))
+        lines.append(f"{i}. " + " | ".join(values))
+    return "\n".join(lines)
+
+def format_activities(activities: list) -> str:
+    """Human-readable numbered list (the pre-structured output format)"""
+    lines = []
+    for i, a in enumerate(activities, 1):
+        lines.append(
+            f"{i}. **{a['name']}** ({a['location']}) - {a['description']}\n"
+            f"   Duration: {a['duration_hours']:g}h • Cost: {a['cost_tier']} • "
+            f"Best time: {a['time_of_day']} • {a['setting']}"
+        )
+    return "\n".join(lines)
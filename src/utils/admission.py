@@ -0,0 +1,143 @@
+import threading
+import time
+from contextlib import contextmanager
+from src.database.usage_ledger import UsageLedger, DEMO_KEY_ID, seconds_until_tomorrow
+from src.utils.config import (
+    DB_PATH,
+    DEMO_MAX_CONCURRENT_PLANS,
+    DEMO_DAILY_TOKEN_BUDGET,
+    USER_MAX_CONCURRENT_PLANS,
+    ADMISSION_MAX_QUEUE,
+    ADMISSION_QUEUE_TIMEOUT,
+    ESTIMATED_TOKENS_PER_PLAN,
+)
+
+class AdmissionRejected(Exception):
+    """Raised when a plan cannot be admitted (quota exhausted or queue full)"""
+
+    def __init__(self, reason: str, retry_after: float = None):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+class AdmissionController:
+    """
+    Process-wide gate in front of plan_trip.
+
+    Caps concurrent plans per key, queues callers (bounded) while the cap is
+    reached, and rejects plans up front when the daily token budget could not
+    cover them, instead of letting them hit rate limits mid-plan.
+    """
+
+    def __init__(self, ledger: UsageLedger, demo_max_concurrent=DEMO_MAX_CONCURRENT_PLANS,
+                 demo_daily_tokens=DEMO_DAILY_TOKEN_BUDGET, user_max_concurrent=USER_MAX_CONCURRENT_PLANS,
+                 max_queue=ADMISSION_MAX_QUEUE, queue_timeout=ADMISSION_QUEUE_TIMEOUT,
+                 tokens_per_plan=ESTIMATED_TOKENS_PER_PLAN):
+        self.ledger = ledger
+        self.demo_max_concurrent = demo_max_concurrent
+        self.demo_daily_tokens = demo_daily_tokens
+        self.user_max_concurrent = user_max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.tokens_per_plan = tokens_per_plan
+
+        self._cond = threading.Condition()
+        self._active = {}   # key_id -> running plans
+        self._waiting = {}  # key_id -> queued callers
+        self._spent = {}    # key_id -> callables returning the tokens each running plan has recorded
+
+    def _limits(self, key_id):
+        if key_id == DEMO_KEY_ID:
+            return self.demo_max_concurrent, self.demo_daily_tokens
+        return self.user_max_concurrent, None
+
+    def _check_budget(self, key_id, daily_tokens, used):
+        """
+        Reject if today's usage plus what running plans may still spend could exceed the budget
+        Running plans' recorded tokens are already in used, so only their unspent share is reserved.
+        """
+        if daily_tokens is None:
+            return
+        reserved = sum(max(0, self.tokens_per_plan - spent()) for spent in self._spent.get(key_id, []))
+        if used + reserved + self.tokens_per_plan > daily_tokens:
+            raise AdmissionRejected(
+                "The demo key has reached its daily limit. Please try again tomorrow or use your own API key.",
+                retry_after=seconds_until_tomorrow()
+            )
+
+    @contextmanager
+    def admit(self, key_id, spent=None):
+        """
+        Hold a plan slot for key_id for the duration of the block
+        Args:
+            spent: Returns the tokens this plan has recorded so far (None = treated as 0)
+        """
+        max_concurrent, daily_tokens = self._limits(key_id)
+        spent = spent or (lambda: 0)
+        queued = False
+        deadline = None
+
+        try:
+            while True:
+                # The ledger read can wait on a busy database, so it is done without the lock
+                used = self.ledger.get_daily_tokens(key_id) if daily_tokens is not None else 0
+                with self._cond:
+                    self._check_budget(key_id, daily_tokens, used)
+                    if self._active.get(key_id, 0) < max_concurrent:
+                        self._active[key_id] = self._active.get(key_id, 0) + 1
+                        self._spent.setdefault(key_id, []).append(spent)
+                        break
+                    if not queued:
+                        if self._waiting.get(key_id, 0) >= self.max_queue:
+                            raise AdmissionRejected(
+                                "Too many trips are being planned right now. Please try again in a minute.",
+                                retry_after=self.queue_timeout
+                            )
+                        self._waiting[key_id] = self._waiting.get(key_id, 0) + 1
+                        queued = True
+                        deadline = time.monotonic() + self.queue_timeout
+                    while self._active.get(key_id, 0) >= max_concurrent:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise AdmissionRejected(
+                                "Timed out waiting for a free planning slot. Please try again in a minute.",
+                                retry_after=self.queue_timeout
+                            )
+                        self._cond.wait(remaining)
+                # A slot freed up; usage may have grown while we were queued, so read it again
+        finally:
+            if queued:
+                with self._cond:
+                    self._waiting[key_id] -= 1
+
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active[key_id] -= 1
+                self._spent[key_id].remove(spent)
+                self._cond.notify_all()
+
+    def get_status(self, key_id):
+        """Current load and remaining daily quota for a key"""
+        max_concurrent, daily_tokens = self._limits(key_id)
+        used = self.ledger.get_daily_tokens(key_id)
+        with self._cond:
+            return {
+                "active_plans": self._active.get(key_id, 0),
+                "queued_plans": self._waiting.get(key_id, 0),
+                "max_concurrent_plans": max_concurrent,
+                "tokens_used_today": used,
+                "daily_token_budget": daily_tokens,
+            }
+
+_controller = None
+_controller_lock = threading.Lock()
+
+def get_admission_controller():
+    """Shared controller so all sessions in this process see the same limits"""
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            _controller = AdmissionController(UsageLedger(DB_PATH))
+        return _controller
@@ -0,0 +1,168 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from src.utils.config import DB_PATH
+from src.utils.metrics import CACHE_LOOKUPS
+
+_MISSING = object()
+
+class TTLCache:
+    """Small thread-safe LRU cache with per-entry expiry"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl: float = None):
+        with self._lock:
+            self._data[key] = (time.monotonic() + (ttl if ttl is not None else self.ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self):
+        return len(self._data)
+
+class ResponseCache:
+    """
+    Two-tier cache for external API results: an in-process TTLCache in front
+    of a shared SQLite table, so entries survive restarts and can be warmed
+    by another process (see src.agents.cache_warmer).
+    """
+
+    def __init__(self, namespace: str, ttl: float, db_path: str = None, memory_size: int = 1024):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.db_path = db_path or DB_PATH
+        self.memory = TTLCache(maxsize=memory_size, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._init_table()
+
+    def _connect(self):
+        """This thread's connection, opened (and switched to WAL) on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _reset_connection(self):
+        """Drop this thread's connection after an error; the next lookup reconnects"""
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+    def _init_table(self):
+        conn = self._connect()
+        schema_path = Path(__file__).parent.parent / "database" / "schema.sql"
+        with open(schema_path, 'r') as f:
+            conn.executescript(f.read())
+        conn.commit()
+
+    def _serialize_key(self, key) -> str:
+        return json.dumps(key, sort_keys=True, default=str)
+
+    def get(self, key, default=None):
+        """Cached value, or default when missing or expired"""
+        skey = self._serialize_key(key)
+        value = self.memory.get(skey, _MISSING)
+        if value is not _MISSING:
+            self.hits += 1
+            CACHE_LOOKUPS.inc(namespace=self.namespace, result="hit")
+            return value
+
+        try:
+            row = self._connect().execute(
+                "SELECT value_json, expires_at FROM api_cache WHERE namespace = ? AND cache_key = ?",
+                (self.namespace, skey)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"[DEBUG] Cache read failed: {e}")
+            self._reset_connection()
+            row = None
+
+        remaining = row[1] - time.time() if row else 0
+        if remaining <= 0:
+            self.misses += 1
+            CACHE_LOOKUPS.inc(namespace=self.namespace, result="miss")
+            return default
+        value = json.loads(row[0])
+        self.memory.set(skey, value, ttl=remaining)
+        self.hits += 1
+        CACHE_LOOKUPS.inc(namespace=self.namespace, result="hit")
+        return value
+
+    def set(self, key, value, ttl: float = None):
+        ttl = ttl if ttl is not None else self.ttl
+        skey = self._serialize_key(key)
+        self.memory.set(skey, value, ttl=ttl)
+        try:
+            conn = self._connect()
+            conn.execute("""
+                INSERT INTO api_cache (namespace, cache_key, value_json, expires_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (namespace, cache_key) DO UPDATE SET
+                    value_json = excluded.value_json,
+                    fetched_at = CURRENT_TIMESTAMP,
+                    expires_at = excluded.expires_at
+            """, (self.namespace, skey, json.dumps(value, default=str), time.time() + ttl))
+            conn.commit()
+        except sqlite3.Error as e:
+            # The in-process tier still serves this entry
+            print(f"[DEBUG] Cache write failed: {e}")
+            self._reset_connection()
+
+    def expires_in(self, key):
+        """Seconds until the shared entry expires (None if missing or unreadable)"""
+        try:
+            row = self._connect().execute(
+                "SELECT expires_at FROM api_cache WHERE namespace = ? AND cache_key = ?",
+                (self.namespace, self._serialize_key(key))
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"[DEBUG] Cache read failed: {e}")
+            self._reset_connection()
+            row = None
+        return row[0] - time.time() if row else None
+
+    def needs_refresh(self, key, window: float = 0) -> bool:
+        """True when the entry is missing or expires within window seconds"""
+        remaining = self.expires_in(key)
+        return remaining is None or remaining <= window
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+def get_cache(namespace: str, ttl: float) -> ResponseCache:
+    """Shared ResponseCache per namespace (one per process)"""
+    with _caches_lock:
+        if namespace not in _caches:
+            _caches[namespace] = ResponseCache(namespace, ttl)
+        return _caches[namespace]
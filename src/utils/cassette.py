@@ -0,0 +1,296 @@
+"""
+Record/replay of external calls, for offline and repeatable runs.
+
+Tools make their HTTP calls through http_get/http_post and agents build their
+Anthropic client with anthropic_client(), so a single cassette file can hold
+every call a plan_trip run makes:
+
+    CASSETTE_MODE=record CASSETTE_PATH=cassettes/lisbon.json python test_coordinator.py
+    CASSETTE_MODE=replay CASSETTE_PATH=cassettes/lisbon.json python test_coordinator.py
+
+Record mode makes the real calls and stores each request together with its
+response or error and how long it took. New recordings are appended to an
+existing cassette. Replay mode serves the calls with no network and no API
+keys. By default responses come back instantly; CASSETTE_LATENCY_SCALE=1
+replays the recorded latencies instead. Requests are matched on method, URL,
+query and body, and API keys are never stored. Identical requests are served
+in the order they were recorded, and the last one repeats once they run out.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from src.utils.config import CASSETTE_MODE, CASSETTE_PATH, CASSETTE_LATENCY_SCALE
+
+CASSETTE_MODES = ("off", "record", "replay")
+CASSETTE_VERSION = 1
+# Request fields left out of cassettes (credentials)
+SECRET_FIELDS = {"api_key", "access_key", "client_id", "authorization"}
+# LLM call arguments that don't change the response enough to tell calls apart
+# (max_tokens is capped by the time left when a plan has a deadline)
+LLM_UNMATCHED_ARGS = ("timeout", "max_tokens", "extra_headers")
+ANTHROPIC_MESSAGES_URL = "https://api.anthropic.com/v1/messages"
+
+class CassetteMiss(LookupError):
+    """A replayed request has no recording"""
+
+def _scrub(value):
+    if isinstance(value, dict):
+        return {k: _scrub(v) for k, v in value.items() if str(k).lower() not in SECRET_FIELDS}
+    if isinstance(value, (list, tuple)):
+        return [_scrub(v) for v in value]
+    return value
+
+def _request_key(kind: str, request: dict) -> str:
+    raw = json.dumps([kind, request], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()[:24]
+
+class Cassette:
+    def __init__(self, path: str = CASSETTE_PATH, mode: str = CASSETTE_MODE or "off",
+                 latency_scale: float = CASSETTE_LATENCY_SCALE):
+        """
+        Args:
+            path: JSON file holding the recorded interactions
+            mode: off (live calls), record or replay
+            latency_scale: Share of each recorded latency slept on replay (0 = instant)
+        """
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"CASSETTE_MODE must be one of {', '.join(CASSETTE_MODES)}, got {mode!r}")
+        self.path = Path(path)
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.interactions = []
+        self._by_key = {}  # request key -> interactions
+        self._served = {}  # request key -> interactions replayed so far
+        self._lock = threading.Lock()
+        if mode != "off" and self.path.exists():
+            self._load()
+        elif mode == "replay":
+            raise FileNotFoundError(f"Cassette {self.path} not found; record it first with CASSETTE_MODE=record")
+
+    def _load(self):
+        with open(self.path) as f:
+            data = json.load(f)
+        for interaction in data.get("interactions", []):
+            self._index(interaction)
+        print(f"📼 Cassette {self.path}: {len(self.interactions)} recorded calls ({self.mode})")
+
+    def _index(self, interaction: dict):
+        self.interactions.append(interaction)
+        key = _request_key(interaction["kind"], interaction["request"])
+        self._by_key.setdefault(key, []).append(interaction)
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"version": CASSETTE_VERSION, "interactions": self.interactions}, f, indent=1, default=str)
+        os.replace(tmp_path, self.path)
+
+    def call(self, kind: str, request: dict, live, codec):
+        """
+        Make a call through the cassette
+        Args:
+            kind: Kind of call (http, anthropic)
+            request: What identifies the call (secrets are stripped before matching)
+            live: Makes the real call
+            codec: Converts responses and errors to and from JSON
+        Returns:
+            The live or replayed response
+        """
+        if self.mode == "off":
+            return live()
+        request = _scrub(request)
+        if self.mode == "replay":
+            return self._replay(kind, request, codec)
+
+        started = time.perf_counter()
+        interaction = {"kind": kind, "request": request}
+        try:
+            result = live()
+            interaction["response"] = codec.encode(result)
+            return result
+        except Exception as e:
+            error = codec.encode_error(e)
+            if error is None:
+                raise
+            interaction["error"] = error
+            raise
+        finally:
+            if "response" in interaction or "error" in interaction:
+                interaction["elapsed_s"] = round(time.perf_counter() - started, 4)
+                with self._lock:
+                    self._index(interaction)
+                    self._save()
+
+    def _replay(self, kind: str, request: dict, codec):
+        key = _request_key(kind, request)
+        with self._lock:
+            recorded = self._by_key.get(key)
+            if not recorded:
+                raise CassetteMiss(f"No {kind} recording in {self.path} for {json.dumps(request, default=str)[:200]}")
+            served = self._served.get(key, 0)
+            interaction = recorded[min(served, len(recorded) - 1)]
+            self._served[key] = served + 1
+        if self.latency_scale > 0:
+            time.sleep(interaction.get("elapsed_s", 0) * self.latency_scale)
+        if "error" in interaction:
+            raise codec.decode_error(interaction["error"])
+        return codec.decode(interaction["response"])
+
+    def unplayed(self):
+        """Recorded interactions a replay has not used (to spot runs that diverged)"""
+        with self._lock:
+            return sum(max(0, len(recorded) - self._served.get(key, 0)) for key, recorded in self._by_key.items())
+
+_cassette = None
+_cassette_lock = threading.Lock()
+
+def get_cassette() -> Cassette:
+    """Process-wide cassette configured from CASSETTE_MODE and CASSETTE_PATH"""
+    global _cassette
+    with _cassette_lock:
+        if _cassette is None:
+            _cassette = Cassette()
+        return _cassette
+
+@contextmanager
+def use_cassette(path: str, mode: str = "replay", latency_scale: float = 0):
+    """Route external calls through another cassette while the block runs"""
+    global _cassette
+    cassette = Cassette(path, mode, latency_scale)
+    with _cassette_lock:
+        previous, _cassette = _cassette, cassette
+    try:
+        yield cassette
+    finally:
+        with _cassette_lock:
+            _cassette = previous
+
+# HTTP transport shared by the tools
+
+class RecordedResponse:
+    """The parts of requests.Response the tools use"""
+
+    def __init__(self, url: str, status_code: int, text: str):
+        self.url = url
+        self.status_code = status_code
+        self.text = text
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        if not self.ok:
+            import requests
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+class _HttpCodec:
+    @staticmethod
+    def encode(response):
+        return {"url": response.url, "status_code": response.status_code, "text": response.text}
+
+    @staticmethod
+    def decode(data):
+        return RecordedResponse(data["url"], data["status_code"], data["text"])
+
+    @staticmethod
+    def encode_error(error):
+        import requests
+        if not isinstance(error, requests.RequestException):
+            return None
+        return {"type": type(error).__name__, "message": str(error)}
+
+    @staticmethod
+    def decode_error(data):
+        import requests
+        error_class = getattr(requests.exceptions, data["type"], requests.RequestException)
+        return error_class(data["message"])
+
+def http_request(method: str, url: str, **kwargs):
+    """requests.request through the cassette (headers and timeout are not matched)"""
+    def live():
+        import requests
+        return requests.request(method, url, **kwargs)
+
+    request = {"method": method.upper(), "url": url, "params": kwargs.get("params"), "json": kwargs.get("json")}
+    return get_cassette().call("http", request, live, _HttpCodec)
+
+def http_get(url: str, **kwargs):
+    return http_request("GET", url, **kwargs)
+
+def http_post(url: str, **kwargs):
+    return http_request("POST", url, **kwargs)
+
+# Anthropic client
+
+class _AnthropicCodec:
+    @staticmethod
+    def encode(message):
+        return message.model_dump(mode="json")
+
+    @staticmethod
+    def decode(data):
+        from anthropic.types import Message
+        return Message.model_validate(data)
+
+    @staticmethod
+    def encode_error(error):
+        import anthropic
+        if not isinstance(error, anthropic.APIError):
+            return None
+        return {"type": type(error).__name__, "message": str(error), "status_code": getattr(error, "status_code", None)}
+
+    @staticmethod
+    def decode_error(data):
+        import anthropic
+        import httpx
+        request = httpx.Request("POST", ANTHROPIC_MESSAGES_URL)
+        if data.get("status_code"):
+            error_class = getattr(anthropic, data["type"], anthropic.APIStatusError)
+            return error_class(data["message"], response=httpx.Response(data["status_code"], request=request), body=None)
+        if data["type"] == "APITimeoutError":
+            return anthropic.APITimeoutError(request=request)
+        return anthropic.APIConnectionError(message=data["message"], request=request)
+
+class _CassetteMessages:
+    def __init__(self, client, cassette: Cassette):
+        self._client = client
+        self._cassette = cassette
+
+    def create(self, **kwargs):
+        request = {k: v for k, v in kwargs.items() if k not in LLM_UNMATCHED_ARGS}
+        return self._cassette.call("anthropic", request, lambda: self._client.messages.create(**kwargs), _AnthropicCodec)
+
+class CassetteClient:
+    """Anthropic client whose messages.create goes through a cassette (no real client on replay)"""
+
+    def __init__(self, client, cassette: Cassette):
+        self._client = client
+        self._cassette = cassette
+        self.messages = _CassetteMessages(client, cassette)
+
+    def with_options(self, **options):
+        if self._client is None:
+            return self
+        return CassetteClient(self._client.with_options(**options), self._cassette)
+
+def anthropic_client(api_key: str = None):
+    """
+    Anthropic client for an agent
+    Returns:
+        anthropic.Anthropic, or a CassetteClient when recording or replaying
+    """
+    cassette = get_cassette()
+    if cassette.mode == "replay":
+        return CassetteClient(None, cassette)
+    from anthropic import Anthropic
+    client = Anthropic(api_key=api_key)
+    return client if cassette.mode == "off" else CassetteClient(client, cassette)
@@ -0,0 +1,112 @@
+"""
+Local ranking for destination comparison mode.
+
+Candidates are scored on how well the estimated trip cost fits the budget
+and on the model's rating of the season. Only the city the traveler picks is
+then planned in full.
+"""
+
+# Candidate cities compared at once
+MIN_CANDIDATES = 2
+MAX_CANDIDATES = 5
+# Weight of each score in the overall ranking
+BUDGET_WEIGHT = 0.6
+SEASON_WEIGHT = 0.4
+# Score used when a component could not be estimated
+NEUTRAL_SCORE = 0.5
+
+VERDICTS = ["comfortable", "tight", "insufficient"]
+
+# Tool definition used to get structured cost estimates for all candidates in one call
+COST_COMPARISON_TOOL = {
+    "name": "record_cost_comparison",
+    "description": "Record a cost estimate and season rating for each candidate destination.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "destinations": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "destination": {"type": "string", "description": "City name exactly as given"},
+                        "daily_cost_usd": {"type": "number", "description": "Typical cost per day for one traveler: lodging, food, transport, activities"},
+                        "estimated_total_usd": {"type": "number", "description": "Estimated cost of the whole trip"},
+                        "verdict": {"type": "string", "enum": VERDICTS, "description": "How the budget compares to the estimate"},
+                        "season_rating": {"type": "integer", "minimum": 1, "maximum": 5,
+                                          "description": "How good these dates are to visit (5 = ideal)"},
+                        "summary": {"type": "string", "description": "One sentence on cost and season"}
+                    },
+                    "required": ["destination", "daily_cost_usd", "estimated_total_usd", "verdict", "season_rating", "summary"]
+                }
+            }
+        },
+        "required": ["destinations"]
+    }
+}
+
+def parse_cost_comparison(message, destinations: list) -> dict:
+    """Estimates from a tool-use response by destination (missing cities are left out)"""
+    raw = []
+    for block in message.content:
+        if getattr(block, "type", None) == "tool_use" and block.name == COST_COMPARISON_TOOL["name"]:
+            raw = block.input.get("destinations", []) if isinstance(block.input, dict) else []
+            break
+    by_key = {d.lower(): d for d in destinations}
+    estimates = {}
+    for item in raw if isinstance(raw, list) else []:
+        if not isinstance(item, dict):
+            continue
+        destination = by_key.get(" ".join(str(item.get("destination", "")).split()).lower())
+        if destination is None:
+            continue
+        try:
+            estimates[destination] = {
+                "daily_cost_usd": round(float(item.get("daily_cost_usd") or 0), 2),
+                "estimated_total_usd": round(float(item.get("estimated_total_usd") or 0), 2),
+                "verdict": item.get("verdict") if item.get("verdict") in VERDICTS else None,
+                "season_rating": int(item["season_rating"]) if item.get("season_rating") else None,
+                "summary": str(item.get("summary", "")).strip(),
+            }
+        except (TypeError, ValueError):
+            continue
+    return estimates
+
+def normalize_candidates(destinations: list):
+    """Distinct, non-empty city names in the order given"""
+    seen, cities = set(), []
+    for destination in destinations:
+        name = " ".join(str(destination).split())
+        if name and name.lower() not in seen:
+            seen.add(name.lower())
+            cities.append(name)
+    return cities
+
+def budget_fit(estimated_total: float, budget: float):
+    """1.0 when the estimate fits the budget, falling off quadratically as it overshoots"""
+    if not estimated_total or estimated_total <= 0:
+        return None
+    return round(min(1.0, budget / estimated_total) ** 2, 3)
+
+def season_fit(season_rating: int = None):
+    """Season score from the model's 1-5 rating"""
+    if season_rating:
+        return round((min(max(season_rating, 1), 5) - 1) / 4, 3)
+    return None
+
+def rank_candidates(candidates: list):
+    """
+    Score and order candidates (best first)
+    Args:
+        candidates: Dicts with budget_fit and season_fit (None when unknown)
+    Returns:
+        The candidates with score and rank added
+    """
+    for candidate in candidates:
+        budget_score = candidate["budget_fit"] if candidate["budget_fit"] is not None else NEUTRAL_SCORE
+        season_score = candidate["season_fit"] if candidate["season_fit"] is not None else NEUTRAL_SCORE
+        candidate["score"] = round(BUDGET_WEIGHT * budget_score + SEASON_WEIGHT * season_score, 3)
+    ranked = sorted(candidates, key=lambda c: -c["score"])
+    for rank, candidate in enumerate(ranked, 1):
+        candidate["rank"] = rank
+    return ranked
@@ -1,13 +1,103 @@
 import os
-from dotenv import load_dotenv
+from pathlib import Path
 
-load_dotenv()
+def _load_env():
+    """Load the nearest .env above this package, importing python-dotenv only if there is one"""
+    for directory in Path(__file__).resolve().parents:
+        if (directory / ".env").is_file():
+            from dotenv import load_dotenv
+            load_dotenv(directory / ".env")
+            return
+
+_load_env()
 
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
 #OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY")
 UNSPLASH_ACCESS_KEY = os.getenv("UNSPLASH_ACCESS_KEY")
 TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
 
+# Usage ledger and admission control (limits apply to the shared demo key)
+DB_PATH = os.getenv("TRAVELAI_DB_PATH", "travelai.db")
+DEMO_MAX_CONCURRENT_PLANS = int(os.getenv("DEMO_MAX_CONCURRENT_PLANS", "3"))
+DEMO_DAILY_TOKEN_BUDGET = int(os.getenv("DEMO_DAILY_TOKEN_BUDGET", "500000"))
+USER_MAX_CONCURRENT_PLANS = int(os.getenv("USER_MAX_CONCURRENT_PLANS", "2"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "10"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "60"))
+# Rough upper bound of one full plan (4 LLM calls), reserved while it runs
+ESTIMATED_TOKENS_PER_PLAN = int(os.getenv("ESTIMATED_TOKENS_PER_PLAN", "12000"))
+
+# Cache lifetimes for external results (seconds)
+GEOCODE_CACHE_TTL = int(os.getenv("GEOCODE_CACHE_TTL", str(30 * 24 * 3600)))
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", str(24 * 3600)))
+IMAGE_CACHE_TTL = int(os.getenv("IMAGE_CACHE_TTL", str(7 * 24 * 3600)))
+
+# Stored destination research: used as is while fresh, served and refreshed
+# in the background while stale, rebuilt once older than the max (seconds)
+KNOWLEDGE_TTL = int(os.getenv("KNOWLEDGE_TTL", str(30 * 24 * 3600)))
+KNOWLEDGE_MAX_STALE = int(os.getenv("KNOWLEDGE_MAX_STALE", str(90 * 24 * 3600)))
+
+# Database maintenance (src/database/maintenance.py): retention in days per
+# table (0 = keep forever), free pages returned per run (0 = all), and how
+# often to run it inside the app in seconds (0 = disabled)
+TRIPS_RETENTION_DAYS = int(os.getenv("TRIPS_RETENTION_DAYS", "0"))
+FINDINGS_RETENTION_DAYS = int(os.getenv("FINDINGS_RETENTION_DAYS", "30"))
+USAGE_RETENTION_DAYS = int(os.getenv("USAGE_RETENTION_DAYS", "90"))
+MAINTENANCE_VACUUM_PAGES = int(os.getenv("MAINTENANCE_VACUUM_PAGES", "0"))
+MAINTENANCE_INTERVAL = int(os.getenv("MAINTENANCE_INTERVAL", "0"))
+
+# Popular-destination cache warmer
+WARMER_TOP_DESTINATIONS = int(os.getenv("WARMER_TOP_DESTINATIONS", "30"))
+WARMER_LOOKBACK_DAYS = int(os.getenv("WARMER_LOOKBACK_DAYS", "7"))
+WARMER_MAX_API_CALLS = int(os.getenv("WARMER_MAX_API_CALLS", "200"))
+WARMER_MAX_LLM_CALLS = int(os.getenv("WARMER_MAX_LLM_CALLS", "20"))
+WARMER_CONCURRENCY = int(os.getenv("WARMER_CONCURRENCY", "4"))
+# Refresh entries that expire within this many seconds
+WARMER_REFRESH_WINDOW = int(os.getenv("WARMER_REFRESH_WINDOW", str(6 * 3600)))
+# Run the warmer inside the app every N seconds (0 = disabled)
+WARMER_INTERVAL = int(os.getenv("WARMER_INTERVAL", "0"))
+
+# Headless planning API (src/api); when PLANNING_API_URL is set the UI is a thin client
+PLANNING_API_URL = os.getenv("PLANNING_API_URL", "")
+PLANNER_WORKERS = int(os.getenv("PLANNER_WORKERS", "4"))
+PLAN_JOB_TTL = int(os.getenv("PLAN_JOB_TTL", "3600"))
+
+# End-to-end time budget for one plan in seconds, split across stages (0 = none)
+PLAN_DEADLINE_S = float(os.getenv("PLAN_DEADLINE_S", "120"))
+
+# Opt-in profiling of plans (see src/utils/profiling.py): mode "sample" or
+# "cprofile", share of plans profiled, output directory, sampling interval
+PROFILE_PLANS = os.getenv("PROFILE_PLANS", "").lower()
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "1.0"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "10"))
+PROFILE_MEMORY = os.getenv("PROFILE_MEMORY", "").lower() in ("1", "true", "yes")
+
+# Speculative prefetch of destination lookups while the trip form is filled in
+PREFETCH_MAX_PER_SESSION = int(os.getenv("PREFETCH_MAX_PER_SESSION", "5"))
+PREFETCH_DEBOUNCE = float(os.getenv("PREFETCH_DEBOUNCE", "0.8"))
+PREFETCH_WORKERS = int(os.getenv("PREFETCH_WORKERS", "4"))
+
+# Record/replay of tool and LLM calls (off | record | replay), see src.utils.cassette
+CASSETTE_MODE = os.getenv("CASSETTE_MODE", "").lower()
+CASSETTE_PATH = os.getenv("CASSETTE_PATH", "cassettes/default.json")
+# Share of the recorded latencies slept on replay (0 = instant, 1 = as recorded)
+CASSETTE_LATENCY_SCALE = float(os.getenv("CASSETTE_LATENCY_SCALE", "0"))
+
+# Prometheus scrape endpoint served next to the Streamlit app (0 = disabled);
+# the planning API always serves GET /metrics
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_HOST = os.getenv("METRICS_HOST", "0.0.0.0")
+
+# Model routing: MODEL_<AGENT> may name a tier (fast/balanced/quality) or a model id
+MODEL_OVERRIDES = {
+    agent: os.getenv(f"MODEL_{agent.upper()}")
+    for agent in ["destination", "activities", "budget", "itinerary"]
+    if os.getenv(f"MODEL_{agent.upper()}")
+}
+# Optional per-plan targets; when set, tiers are picked automatically
+PLAN_TARGET_LATENCY_S = float(os.getenv("PLAN_TARGET_LATENCY_S")) if os.getenv("PLAN_TARGET_LATENCY_S") else None
+PLAN_TARGET_COST_USD = float(os.getenv("PLAN_TARGET_COST_USD")) if os.getenv("PLAN_TARGET_COST_USD") else None
+
 # Validate keys are present
 def validate_config():
     missing = []
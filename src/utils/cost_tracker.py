@@ -1,30 +1,76 @@
+import threading
+from src.utils.model_router import get_model_pricing
+from src.utils.metrics import LLM_TOKENS, LLM_COST
+
 class CostTracker:
     """Simple cost tracking for API usage"""
-    
-    # Claude Sonnet 4 pricing (as of Dec 2024)
+
+    # Fallback pricing for unknown models: Claude Sonnet 4 (as of Dec 2024)
     INPUT_COST_PER_1M = 3.00   # $3 per 1M input tokens
     OUTPUT_COST_PER_1M = 15.00  # $15 per 1M output tokens
-    
-    def __init__(self):
+
+    def __init__(self, ledger=None, key_id=None):
         self.total_input_tokens = 0
         self.total_output_tokens = 0
-    
-    def add_usage(self, input_tokens: int, output_tokens: int):
+        self.total_cost = 0.0
+        self.by_model = {}
+        # Stages may record usage from several threads at once (e.g. comparing cities)
+        self._lock = threading.Lock()
+        # Optional persistent ledger shared across plans and processes
+        self.ledger = ledger
+        self.key_id = key_id
+
+    def add_usage(self, input_tokens: int, output_tokens: int, stage: str = "unknown", model: str = None):
         """Track token usage"""
-        self.total_input_tokens += input_tokens
-        self.total_output_tokens += output_tokens
-    
+        cost = self._cost(input_tokens, output_tokens, model)
+        with self._lock:
+            self.total_input_tokens += input_tokens
+            self.total_output_tokens += output_tokens
+            self.total_cost += cost
+
+            model_stats = self.by_model.setdefault(model or "unknown", {"input_tokens": 0, "output_tokens": 0, "cost_usd": 0.0})
+            model_stats["input_tokens"] += input_tokens
+            model_stats["output_tokens"] += output_tokens
+            model_stats["cost_usd"] += cost
+
+        model_label = model or "unknown"
+        LLM_TOKENS.inc(input_tokens, model=model_label, agent=stage, direction="input")
+        LLM_TOKENS.inc(output_tokens, model=model_label, agent=stage, direction="output")
+        LLM_COST.inc(cost, model=model_label, agent=stage)
+
+        if self.ledger:
+            try:
+                self.ledger.record(self.key_id, stage, input_tokens, output_tokens, cost)
+            except Exception as e:
+                # Accounting must never fail a plan
+                print(f"[DEBUG] Usage ledger write failed: {e}")
+
+    def _cost(self, input_tokens: int, output_tokens: int, model: str = None) -> float:
+        pricing = get_model_pricing(model) or (self.INPUT_COST_PER_1M, self.OUTPUT_COST_PER_1M)
+        input_cost = (input_tokens / 1_000_000) * pricing[0]
+        output_cost = (output_tokens / 1_000_000) * pricing[1]
+        return input_cost + output_cost
+
+    def get_total_tokens(self) -> int:
+        """Input plus output tokens tracked so far"""
+        with self._lock:
+            return self.total_input_tokens + self.total_output_tokens
+
     def get_estimated_cost(self) -> float:
         """Calculate estimated cost in USD"""
-        input_cost = (self.total_input_tokens / 1_000_000) * self.INPUT_COST_PER_1M
-        output_cost = (self.total_output_tokens / 1_000_000) * self.OUTPUT_COST_PER_1M
-        return input_cost + output_cost
-    
+        return self.total_cost
+
     def get_summary(self) -> dict:
         """Get usage summary"""
+        with self._lock:
+            by_model = {model: dict(stats) for model, stats in self.by_model.items()}
         return {
             "input_tokens": self.total_input_tokens,
             "output_tokens": self.total_output_tokens,
             "estimated_cost_usd": round(self.get_estimated_cost(), 4),
-            "trips_remaining_in_20_budget": int(20 / self.get_estimated_cost()) if self.get_estimated_cost() > 0 else 0
+            "trips_remaining_in_20_budget": int(20 / self.get_estimated_cost()) if self.get_estimated_cost() > 0 else 0,
+            "by_model": {
+                model: dict(stats, cost_usd=round(stats["cost_usd"], 4))
+                for model, stats in by_model.items()
+            }
         }
\ No newline at end of file
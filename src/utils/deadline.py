@@ -0,0 +1,93 @@
+import threading
+import time
+from src.utils.metrics import DEGRADATIONS
+
+# Share of the plan's time budget each stage may use. Time a stage leaves
+# unused is handed on to the stages after it.
+STAGE_SHARES = {
+    "research_destination": 0.20,
+    "find_activities": 0.30,
+    "analyze_budget": 0.15,
+    "plan_schedule": 0.05,
+    "build_itinerary": 0.30,
+}
+
+# Tool calls may use this share of what is left of their stage, so the
+# stage's LLM call still has time after them
+TOOL_SHARE = 0.4
+# Optional lookups are skipped rather than given less than this (seconds)
+MIN_TOOL_TIMEOUT = 1.0
+# LLM calls are never given less than this (seconds), even past the plan
+# budget: a stage's LLM call is required, so running late beats failing the plan
+MIN_LLM_TIMEOUT = 5.0
+
+class Deadline:
+    """
+    End-to-end time budget for one plan.
+
+    Each stage gets a slice of the remaining time (start_stage); tools and
+    LLM calls size their timeouts from what is left of that slice, and
+    optional work that no longer fits is dropped and recorded as a
+    degradation.
+    """
+
+    def __init__(self, seconds: float, shares: dict = None):
+        self.seconds = seconds
+        self.shares = shares or STAGE_SHARES
+        self.started = time.monotonic()
+        self.expires_at = self.started + seconds
+        self.stage = None
+        self.stage_expires_at = self.expires_at
+        self.degradations = []
+        self._overrun_stages = set()
+        self._lock = threading.Lock()
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def start_stage(self, name: str):
+        """Give the stage its share of the time still left"""
+        stages = list(self.shares)
+        later = stages[stages.index(name):] if name in self.shares else [name]
+        share_left = sum(self.shares.get(stage, 0) for stage in later)
+        share = self.shares.get(name, 0) / share_left if share_left else 1.0
+        self.stage = name
+        self.stage_expires_at = time.monotonic() + self.remaining() * share
+
+    def stage_remaining(self) -> float:
+        return max(0.0, min(self.stage_expires_at, self.expires_at) - time.monotonic())
+
+    def tool_timeout(self, default: float) -> float:
+        """Timeout for a tool call in the current stage; 0 (cached results only) if a call no longer fits"""
+        timeout = min(default, self.stage_remaining() * TOOL_SHARE)
+        return timeout if timeout >= MIN_TOOL_TIMEOUT else 0
+
+    def llm_timeout(self) -> float:
+        """
+        Timeout for the stage's LLM call: the rest of the stage, and at least
+        MIN_LLM_TIMEOUT. Going past the plan budget is recorded as a degradation.
+        """
+        if self.remaining() < MIN_LLM_TIMEOUT:
+            with self._lock:
+                first_overrun = self.stage not in self._overrun_stages
+                self._overrun_stages.add(self.stage)
+            if first_overrun:
+                self.degrade("deadline", f"LLM call given {MIN_LLM_TIMEOUT:.0f}s past the plan budget")
+        return max(self.stage_remaining(), MIN_LLM_TIMEOUT)
+
+    def degrade(self, what: str, reason: str):
+        """Record optional output that was dropped or cut short"""
+        with self._lock:
+            self.degradations.append({"stage": self.stage, "what": what, "reason": reason})
+        DEGRADATIONS.inc(what=what)
+        print(f"  ⏱️ Degraded {what} in {self.stage}: {reason}")
+
+    def get_summary(self):
+        return {
+            "budget_s": self.seconds,
+            "elapsed_s": round(self.elapsed(), 2),
+            "degradations": list(self.degradations),
+        }
@@ -0,0 +1,110 @@
+from typing import TypedDict, List
+from src.utils.snippets import tokenize
+
+# Interest tags the research is annotated with (the UI's interest options)
+INTEREST_TAGS = [
+    "Food & Dining", "Culture & History", "Nature & Outdoors", "Shopping", "Nightlife",
+    "Art & Museums", "Adventure", "Photography", "Relaxation", "Architecture",
+]
+
+# Bump when the sections below change shape; older entries are rebuilt
+KNOWLEDGE_SCHEMA_VERSION = 1
+
+class Place(TypedDict):
+    """An attraction or neighborhood, tagged with the interests it serves"""
+    name: str
+    description: str
+    interests: List[str]
+
+class DestinationKnowledge(TypedDict):
+    """Interest-independent research for one destination"""
+    overview: str
+    attractions: List[Place]
+    neighborhoods: List[Place]
+    customs: List[str]
+
+_PLACE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "name": {"type": "string"},
+        "description": {"type": "string", "description": "One sentence"},
+        "interests": {"type": "array", "items": {"type": "string", "enum": INTEREST_TAGS},
+                      "description": "Interests this place is a strong pick for"}
+    },
+    "required": ["name", "description", "interests"]
+}
+
+# Tool definition used to force structured output from the destination agent
+KNOWLEDGE_TOOL = {
+    "name": "record_destination_research",
+    "description": "Record reusable research about a destination for travelers with any interests.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "overview": {"type": "string", "description": "2-3 sentence destination overview"},
+            "attractions": {"type": "array", "items": _PLACE_SCHEMA,
+                            "description": "10-12 must-see attractions covering a range of interests"},
+            "neighborhoods": {"type": "array", "items": _PLACE_SCHEMA,
+                              "description": "4-6 neighborhoods worth exploring"},
+            "customs": {"type": "array", "items": {"type": "string"},
+                        "description": "3-5 cultural tips or local customs, one sentence each"}
+        },
+        "required": ["overview", "attractions", "neighborhoods", "customs"]
+    }
+}
+
+def _parse_places(raw) -> list:
+    places = []
+    for item in raw if isinstance(raw, list) else []:
+        if not isinstance(item, dict) or not item.get("name"):
+            continue
+        interests = item.get("interests") if isinstance(item.get("interests"), list) else []
+        places.append(Place(
+            name=str(item["name"]).strip(),
+            description=str(item.get("description", "")).strip(),
+            interests=[tag for tag in interests if tag in INTEREST_TAGS],
+        ))
+    return places
+
+def parse_knowledge(message) -> DestinationKnowledge:
+    """Extract and normalize DestinationKnowledge from a tool-use response"""
+    raw = {}
+    for block in message.content:
+        if getattr(block, "type", None) == "tool_use" and block.name == KNOWLEDGE_TOOL["name"]:
+            raw = block.input if isinstance(block.input, dict) else {}
+            break
+    customs = raw.get("customs") if isinstance(raw.get("customs"), list) else []
+    return DestinationKnowledge(
+        overview=str(raw.get("overview", "")).strip(),
+        attractions=_parse_places(raw.get("attractions")),
+        neighborhoods=_parse_places(raw.get("neighborhoods")),
+        customs=[str(c).strip() for c in customs if str(c).strip()],
+    )
+
+def _rank_places(places: list, interests: list) -> list:
+    """Places ordered by fit: tagged interests first, then word overlap"""
+    wanted = set(interests)
+    words = set(tokenize(" ".join(interests)))
+
+    def score(indexed):
+        index, place = indexed
+        tagged = len(wanted & set(place["interests"]))
+        overlap = len(words & set(tokenize(f"{place['name']} {place['description']}")))
+        return (-(2 * tagged + overlap), index)
+
+    return [place for _, place in sorted(enumerate(places), key=score)]
+
+def assemble_view(knowledge: DestinationKnowledge, interests: list,
+                  attractions: int = 5, neighborhoods: int = 3, customs: int = 3) -> str:
+    """Interest-specific research text built locally from stored knowledge"""
+    lines = [knowledge["overview"], "", "**Top attractions for your interests:**"]
+    for i, place in enumerate(_rank_places(knowledge["attractions"], interests)[:attractions], 1):
+        lines.append(f"{i}. **{place['name']}** - {place['description']}")
+    if knowledge["customs"]:
+        lines += ["", "**Cultural tips:**"]
+        lines += [f"- {custom}" for custom in knowledge["customs"][:customs]]
+    if knowledge["neighborhoods"]:
+        lines += ["", "**Neighborhoods to explore:**"]
+        for place in _rank_places(knowledge["neighborhoods"], interests)[:neighborhoods]:
+            lines.append(f"- **{place['name']}** - {place['description']}")
+    return "\n".join(lines)
@@ -0,0 +1,80 @@
+"""
+Cold import benchmark for the app's entry points.
+
+Each module is imported in a fresh interpreter, so numbers include
+everything the import pulls in. Also reports which heavy dependencies got
+loaded, to catch eager imports creeping back into light paths:
+
+    python -m src.utils.import_benchmark
+    python -m src.utils.import_benchmark --runs 10 src.ui.backend
+"""
+import json
+import statistics
+import subprocess
+import sys
+
+# Entry points, lightest first
+DEFAULT_MODULES = [
+    "src.utils.config",
+    "src.database",
+    "src.ui.backend",
+    "src.agents.prefetcher",
+    "src.tools",
+    "src.agents",
+    "src.agents.coordinator",
+]
+
+# Dependencies worth knowing about when they load
+HEAVY_MODULES = ["anthropic", "langgraph", "requests", "streamlit", "fastapi", "dotenv"]
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import importlib
+module = importlib.import_module({module!r})
+for name in getattr(module, "__all__", []):
+    getattr(module, name) if {resolve} else None
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+def measure(module: str, runs: int = 5, resolve: bool = False):
+    """
+    Cold import time of a module
+    Args:
+        resolve: Also access every name in the module's __all__ (forces lazy exports)
+    Returns:
+        Dict with median and min seconds and the heavy modules loaded
+    """
+    code = _PROBE.format(module=module, resolve=resolve, heavy=HEAVY_MODULES)
+    times, loaded = [], []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+        if result.returncode != 0:
+            return {"module": module, "error": result.stderr.strip().splitlines()[-1]}
+        data = json.loads(result.stdout.strip().splitlines()[-1])
+        times.append(data["seconds"])
+        loaded = data["loaded"]
+    return {
+        "module": module,
+        "median_s": statistics.median(times),
+        "min_s": min(times),
+        "loaded": loaded,
+    }
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Measure cold import times")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--resolve", action="store_true", help="Also load lazily exported names")
+    args = parser.parse_args()
+
+    print(f"{'module':<28} {'median':>8} {'min':>8}  heavy dependencies loaded")
+    for module in args.modules:
+        result = measure(module, runs=args.runs, resolve=args.resolve)
+        if "error" in result:
+            print(f"{module:<28} ❌ {result['error']}")
+            continue
+        print(f"{module:<28} {result['median_s'] * 1000:>6.0f}ms {result['min_s'] * 1000:>6.0f}ms  "
+              f"{', '.join(result['loaded']) or '-'}")
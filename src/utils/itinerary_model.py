@@ -0,0 +1,194 @@
+"""
+Structured itinerary: days, time slots and locally computed cost totals.
+
+The itinerary agent records each day through ITINERARY_TOOL with a cost per
+slot and per night of lodging. Day totals, the trip total and the budget
+check are added up here instead of by the model, and the markdown used for
+display, download and search is rendered from the structure.
+"""
+from datetime import datetime
+from typing import TypedDict, List, Optional
+from src.utils.activity_catalog import TIMES_OF_DAY
+
+SLOT_HOURS = {"Morning": "9am-12pm", "Midday": "12pm-5pm", "Evening": "5pm-10pm", "Night": "Optional, 10pm+"}
+
+class SlotPlan(TypedDict):
+    """One activity in a time slot of a day"""
+    slot: str
+    title: str
+    location: str
+    description: str
+    meal: str
+    cost_usd: Optional[float]
+
+class DayPlan(TypedDict):
+    """One day of the itinerary; total_usd is computed locally"""
+    day: int
+    date: str
+    weekday: str
+    slots: List[SlotPlan]
+    lodging_usd: Optional[float]
+    total_usd: float
+
+_SLOT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "slot": {"type": "string", "enum": TIMES_OF_DAY},
+        "title": {"type": "string", "description": "Activity name"},
+        "location": {"type": "string", "description": "Venue or neighborhood"},
+        "description": {"type": "string", "description": "1-2 sentences: what to do and why it fits this slot"},
+        "meal": {"type": "string", "description": "Meal suggestion nearby, or empty"},
+        "cost_usd": {"type": "number", "description": "Estimated cost per traveler in USD, including the meal"}
+    },
+    "required": ["slot", "title", "location", "description", "cost_usd"]
+}
+
+# Tool definition used to force structured output from the itinerary agent
+ITINERARY_TOOL = {
+    "name": "record_itinerary",
+    "description": "Record the day-by-day itinerary, one entry per day with its time slots.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "days": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "day": {"type": "integer", "description": "Day number, starting at 1"},
+                        "slots": {"type": "array", "items": _SLOT_SCHEMA},
+                        "lodging_usd": {"type": "number", "description": "Accommodation for the night after this day (0 on the last day)"}
+                    },
+                    "required": ["day", "slots", "lodging_usd"]
+                }
+            }
+        },
+        "required": ["days"]
+    }
+}
+
+def _money(value):
+    try:
+        return round(max(float(value), 0.0), 2)
+    except (TypeError, ValueError):
+        return None
+
+def _new_day(day_number: int, date: str, slots: list, lodging_usd=None) -> DayPlan:
+    return DayPlan(
+        day=day_number,
+        date=date,
+        weekday=datetime.strptime(date, "%Y-%m-%d").strftime("%A"),
+        slots=sorted(slots, key=lambda s: TIMES_OF_DAY.index(s["slot"])),
+        lodging_usd=lodging_usd,
+        total_usd=0.0,
+    )
+
+def parse_itinerary(message, dates: list, first_day: int = 1) -> list:
+    """
+    Extract DayPlans from a tool-use response
+    Args:
+        dates: Dates of the days expected, starting with day first_day
+    Returns:
+        DayPlans in day order; days the model left out are missing
+    """
+    raw = []
+    for block in message.content:
+        if getattr(block, "type", None) == "tool_use" and block.name == ITINERARY_TOOL["name"]:
+            raw = block.input.get("days", []) if isinstance(block.input, dict) else []
+            break
+
+    days = {}
+    for item in raw if isinstance(raw, list) else []:
+        if not isinstance(item, dict):
+            continue
+        try:
+            day_number = int(item.get("day"))
+        except (TypeError, ValueError):
+            continue
+        index = day_number - first_day
+        if not 0 <= index < len(dates) or day_number in days:
+            continue
+        slots = [
+            SlotPlan(
+                slot=slot["slot"],
+                title=str(slot.get("title", "")).strip(),
+                location=str(slot.get("location") or "").strip(),
+                description=str(slot.get("description") or "").strip(),
+                meal=str(slot.get("meal") or "").strip(),
+                cost_usd=_money(slot.get("cost_usd")),
+            )
+            for slot in item.get("slots") or []
+            if isinstance(slot, dict) and slot.get("slot") in TIMES_OF_DAY and slot.get("title")
+        ]
+        days[day_number] = _new_day(day_number, dates[index], slots, _money(item.get("lodging_usd")))
+    return [days[n] for n in sorted(days)]
+
+def outline_day(day_number: int, date: str, day_schedule: dict = None) -> DayPlan:
+    """A day built from the planned schedule alone (no descriptions or costs)"""
+    slots = []
+    for slot in TIMES_OF_DAY:
+        for activity in (day_schedule or {}).get("slots", {}).get(slot, []):
+            slots.append(SlotPlan(slot=slot, title=activity["name"], location=activity.get("location") or "",
+                                  description=activity.get("description", ""), meal="", cost_usd=None))
+    return _new_day(day_number, date, slots)
+
+def day_total(day: DayPlan) -> float:
+    """Slot costs plus lodging (unknown costs count as 0)"""
+    return round(sum(slot["cost_usd"] or 0 for slot in day["slots"]) + (day["lodging_usd"] or 0), 2)
+
+def compute_totals(days: list, budget: float):
+    """
+    Add up each day and the whole trip, and check the total against the budget
+    Sets total_usd on every day. Unknown costs count as 0.
+    Returns:
+        Dict with total_usd, activities_usd, lodging_usd, budget, remaining_usd,
+        within_budget and unpriced_slots
+    """
+    for day in days:
+        day["total_usd"] = day_total(day)
+    lodging = sum(day["lodging_usd"] or 0 for day in days)
+    total = round(sum(day["total_usd"] for day in days), 2)
+    return {
+        "total_usd": total,
+        "activities_usd": round(total - lodging, 2),
+        "lodging_usd": round(lodging, 2),
+        "budget": budget,
+        "remaining_usd": round(budget - total, 2),
+        "within_budget": total <= budget,
+        "unpriced_slots": sum(1 for day in days for slot in day["slots"] if slot["cost_usd"] is None),
+    }
+
+def _format_usd(value) -> str:
+    return "n/a" if value is None else f"${value:,.0f}"
+
+def render_day(day: DayPlan) -> str:
+    """Markdown for one day, in the layout the itinerary has always used"""
+    lines = [f"**Day {day['day']} - {day['date']} - {day['weekday']}**", ""]
+    for slot in TIMES_OF_DAY:
+        entries = [s for s in day["slots"] if s["slot"] == slot]
+        if not entries:
+            continue
+        lines.append(f"**{slot} ({SLOT_HOURS[slot]}):**")
+        for entry in entries:
+            lines.append(f"- {entry['title']}" + (f" - {entry['location']}" if entry["location"] else ""))
+            if entry["description"]:
+                lines.append(f"- {entry['description']}")
+            if entry["meal"]:
+                lines.append(f"- Meal: {entry['meal']}")
+            lines.append(f"- Estimated cost: {_format_usd(entry['cost_usd'])}")
+        lines.append("")
+    if day["lodging_usd"]:
+        lines.append(f"**Lodging:** {_format_usd(day['lodging_usd'])}")
+        lines.append("")
+    lines.append(f"**Day {day['day']} Total Estimated Cost: {_format_usd(day['total_usd'])}**")
+    return "\n".join(lines)
+
+def render_itinerary(days: list, totals: dict) -> str:
+    """Markdown for the whole trip, ending with the trip total against the budget"""
+    if totals["within_budget"]:
+        verdict = f"{_format_usd(totals['remaining_usd'])} under the {_format_usd(totals['budget'])} budget"
+    else:
+        verdict = f"{_format_usd(-totals['remaining_usd'])} over the {_format_usd(totals['budget'])} budget"
+    sections = [render_day(day) for day in days]
+    sections.append(f"**Trip Total Estimated Cost: {_format_usd(totals['total_usd'])}** ({verdict})")
+    return "\n\n".join(sections)
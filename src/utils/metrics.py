@@ -0,0 +1,248 @@
+"""
+Process-wide metrics in the Prometheus text format.
+
+Counters, gauges and histograms for plan throughput and latency, tool calls,
+LLM tokens and cost, and cache hits. Each process keeps its own values;
+Prometheus aggregates across processes when it scrapes them:
+
+    GET /metrics on the planning API (src/api/server.py)
+    METRICS_PORT=9100 serves /metrics next to the Streamlit app
+"""
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+def _format_labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, help_text: str, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values = {}  # label values -> value
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict):
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} expects labels {self.labels}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}")
+        return lines
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+    type_name = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+class Gauge(_Metric):
+    """Value that goes up and down"""
+    type_name = "gauge"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets, with their sum and count"""
+    type_name = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels=(), buckets=()):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry["buckets"][i] += 1
+            entry["sum"] += value
+            entry["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the block in seconds"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def get(self, **labels) -> dict:
+        entry = self._values.get(self._key(labels))
+        return {"sum": entry["sum"], "count": entry["count"]} if entry else {"sum": 0.0, "count": 0}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            items = sorted((key, {"buckets": list(e["buckets"]), "sum": e["sum"], "count": e["count"]})
+                           for key, e in self._values.items())
+        for key, entry in items:
+            for bound, count in zip(self.buckets, entry["buckets"]):
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {_format_value(count)}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(entry['sum'])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {_format_value(entry['count'])}")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labels=()) -> Counter:
+        return self._register(Counter(name, help_text, labels))
+
+    def gauge(self, name: str, help_text: str, labels=()) -> Gauge:
+        return self._register(Gauge(name, help_text, labels))
+
+    def histogram(self, name: str, help_text: str, labels=(), buckets=()) -> Histogram:
+        return self._register(Histogram(name, help_text, labels, buckets))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = MetricsRegistry()
+
+PLAN_BUCKETS = (5, 10, 20, 30, 45, 60, 90, 120, 180, 300)
+STAGE_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+TOOL_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+PLANS = REGISTRY.counter(
+    "travelai_plans_total", "Plans finished, by outcome (ok, error, rejected, coalesced)", ["outcome"])
+PLANS_IN_PROGRESS = REGISTRY.gauge(
+    "travelai_plans_in_progress", "Plans admitted and currently running")
+PLAN_DURATION = REGISTRY.histogram(
+    "travelai_plan_duration_seconds", "Wall time of admitted plans", ["outcome"], PLAN_BUCKETS)
+STAGE_DURATION = REGISTRY.histogram(
+    "travelai_stage_duration_seconds", "Wall time of each pipeline stage", ["stage"], STAGE_BUCKETS)
+DEGRADATIONS = REGISTRY.counter(
+    "travelai_degradations_total", "Lookups and outputs dropped to meet the plan deadline", ["what"])
+TOOL_CALLS = REGISTRY.counter(
+    "travelai_tool_calls_total", "Upstream HTTP calls made by tools", ["tool", "host", "outcome"])
+TOOL_DURATION = REGISTRY.histogram(
+    "travelai_tool_call_duration_seconds", "Latency of upstream HTTP calls", ["tool", "host"], TOOL_BUCKETS)
+LLM_TOKENS = REGISTRY.counter(
+    "travelai_llm_tokens_total", "LLM tokens used", ["model", "agent", "direction"])
+LLM_COST = REGISTRY.counter(
+    "travelai_llm_cost_usd_total", "Estimated LLM cost in USD", ["model", "agent"])
+CACHE_LOOKUPS = REGISTRY.counter(
+    "travelai_cache_lookups_total", "Cache lookups by namespace and result", ["namespace", "result"])
+COALESCED_CALLS = REGISTRY.counter(
+    "travelai_coalesced_calls_total", "Calls that joined an identical call in flight", ["group"])
+
+def _outcome(error: BaseException) -> str:
+    name = type(error).__name__
+    if "Timeout" in name:
+        return "timeout"
+    response = getattr(error, "response", None)
+    if response is not None and getattr(response, "status_code", None):
+        return f"http_{response.status_code}"
+    return "error"
+
+@contextmanager
+def track_tool_call(tool: str, url: str):
+    """Count and time an upstream call; exceptions are recorded and re-raised"""
+    host = urlsplit(url).hostname or "unknown"
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except Exception as e:
+        outcome = _outcome(e)
+        raise
+    finally:
+        TOOL_DURATION.observe(time.perf_counter() - started, tool=tool, host=host)
+        TOOL_CALLS.inc(tool=tool, host=host, outcome=outcome)
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+_server = None
+_server_lock = threading.Lock()
+
+def start_metrics_server(port: int, host: str = "0.0.0.0"):
+    """
+    Serve /metrics on a daemon thread (once per process)
+    Returns:
+        The running ThreadingHTTPServer
+    """
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+            print(f"📈 Metrics at http://{host}:{_server.server_port}/metrics")
+        return _server
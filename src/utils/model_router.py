@@ -0,0 +1,192 @@
+from src.utils.config import MODEL_OVERRIDES, PLAN_TARGET_LATENCY_S, PLAN_TARGET_COST_USD
+
+# Known models: USD per 1M tokens plus rough latency figures used by the
+# tiering policy (time to first token in seconds, output tokens per second)
+MODEL_SPECS = {
+    "claude-opus-4-20250514":    {"input": 15.00, "output": 75.00, "ttft": 2.0, "tokens_per_sec": 40},
+    "claude-sonnet-4-20250514":  {"input": 3.00,  "output": 15.00, "ttft": 1.2, "tokens_per_sec": 60},
+    "claude-3-5-haiku-20241022": {"input": 0.80,  "output": 4.00,  "ttft": 0.6, "tokens_per_sec": 120},
+    "claude-3-haiku-20240307":   {"input": 0.25,  "output": 1.25,  "ttft": 0.4, "tokens_per_sec": 150},
+}
+
+# Tier -> ordered model chain (primary first, then fallbacks on overload)
+TIERS = {
+    "quality":  ["claude-opus-4-20250514", "claude-sonnet-4-20250514"],
+    "balanced": ["claude-sonnet-4-20250514", "claude-3-5-haiku-20241022"],
+    "fast":     ["claude-3-5-haiku-20241022", "claude-3-haiku-20240307"],
+}
+TIER_ORDER = ["fast", "balanced", "quality"]
+
+# Typical token profile of each stage and the tiers it may run on.
+# Short summaries (destination, budget) are fine on the fast tier.
+AGENT_PROFILES = {
+    "destination": {"input": 700,  "output": 900,  "tiers": ["fast", "balanced"]},
+    "activities":  {"input": 1200, "output": 1000, "tiers": ["fast", "balanced"]},
+    "budget":      {"input": 900,  "output": 500,  "tiers": ["fast", "balanced"]},
+    "itinerary":   {"input": 2500, "output": 2500, "tiers": ["balanced", "quality"]},
+}
+DEFAULT_AGENT_TIERS = {
+    "destination": "fast",
+    "activities": "balanced",
+    "budget": "fast",
+    "itinerary": "balanced",
+}
+
+# Status codes worth retrying on another model: rate limited, overloaded, unavailable
+FALLBACK_STATUS_CODES = {429, 500, 503, 529}
+
+def get_model_pricing(model: str):
+    """(input, output) USD per 1M tokens, matching dated and undated model ids"""
+    spec = MODEL_SPECS.get(model)
+    if spec is None:
+        for name, candidate in MODEL_SPECS.items():
+            if model and (name.startswith(model) or model.startswith(name)):
+                spec = candidate
+                break
+    if spec is None:
+        return None
+    return spec["input"], spec["output"]
+
+def estimate_stage(agent: str, model: str):
+    """Estimated (latency seconds, cost USD) of one stage on a model"""
+    profile = AGENT_PROFILES[agent]
+    spec = MODEL_SPECS[model]
+    latency = spec["ttft"] + profile["output"] / spec["tokens_per_sec"]
+    cost = (profile["input"] * spec["input"] + profile["output"] * spec["output"]) / 1_000_000
+    return latency, cost
+
+# Never cap a text call below this many output tokens, however little time is left.
+# Tool-use calls are not capped: a truncated tool input is unusable JSON.
+MIN_MAX_TOKENS = 256
+
+def fit_max_tokens(model: str, max_tokens: int, seconds: float) -> int:
+    """max_tokens capped to what the model can generate in the given time"""
+    spec = MODEL_SPECS.get(model)
+    if spec is None:
+        return max_tokens
+    affordable = int((seconds - spec["ttft"]) * spec["tokens_per_sec"])
+    return max(min(max_tokens, affordable), min(max_tokens, MIN_MAX_TOKENS))
+
+def pick_tiers(target_latency_s=None, target_cost_usd=None):
+    """
+    Automatic tiering policy.
+
+    Starts every stage on its default tier and greedily downgrades the stage
+    that saves the most until the estimated sequential plan latency and cost
+    fit the targets (or nothing is left to downgrade). Targets never move a
+    stage above its default; pin MODEL_<AGENT> for that.
+    """
+    tiers = dict(DEFAULT_AGENT_TIERS)
+
+    def totals(assignment):
+        latency = cost = 0.0
+        for agent, tier in assignment.items():
+            stage_latency, stage_cost = estimate_stage(agent, TIERS[tier][0])
+            latency += stage_latency
+            cost += stage_cost
+        return latency, cost
+
+    def over_target(latency, cost):
+        over = 0.0
+        if target_latency_s is not None and latency > target_latency_s:
+            over += (latency - target_latency_s) / target_latency_s
+        if target_cost_usd is not None and cost > target_cost_usd:
+            over += (cost - target_cost_usd) / target_cost_usd
+        return over
+
+    while True:
+        current = over_target(*totals(tiers))
+        if current == 0:
+            break
+        best_agent, best_over = None, current
+        for agent, tier in tiers.items():
+            allowed = AGENT_PROFILES[agent]["tiers"]
+            position = allowed.index(tier)
+            if position == 0:
+                continue
+            candidate = dict(tiers, **{agent: allowed[position - 1]})
+            candidate_over = over_target(*totals(candidate))
+            if candidate_over < best_over:
+                best_agent, best_over = agent, candidate_over
+        if best_agent is None:
+            break
+        allowed = AGENT_PROFILES[best_agent]["tiers"]
+        tiers[best_agent] = allowed[allowed.index(tiers[best_agent]) - 1]
+
+    return tiers
+
+class ModelRouter:
+    """Per-agent model chains with fallback on overload"""
+
+    def __init__(self, routes: dict = None):
+        self.routes = {agent: list(TIERS[tier]) for agent, tier in DEFAULT_AGENT_TIERS.items()}
+        if routes:
+            self.routes.update(routes)
+
+    @classmethod
+    def from_tiers(cls, tiers: dict):
+        return cls({agent: list(TIERS[tier]) for agent, tier in tiers.items()})
+
+    @classmethod
+    def from_config(cls):
+        """
+        Build routes from the environment: the automatic policy when a latency
+        or cost target is set, then explicit MODEL_<AGENT> overrides on top
+        (either a tier name or a model id).
+        """
+        if PLAN_TARGET_LATENCY_S is not None or PLAN_TARGET_COST_USD is not None:
+            router = cls.from_tiers(pick_tiers(PLAN_TARGET_LATENCY_S, PLAN_TARGET_COST_USD))
+        else:
+            router = cls()
+
+        for agent, override in MODEL_OVERRIDES.items():
+            if agent not in router.routes:
+                continue
+            if override in TIERS:
+                router.routes[agent] = list(TIERS[override])
+            else:
+                # A specific model keeps the tier's fallbacks behind it
+                router.routes[agent] = [override] + [m for m in router.routes[agent] if m != override]
+        return router
+
+    def models_for(self, agent: str):
+        return self.routes.get(agent, TIERS["balanced"])
+
+    def create_message(self, client, agent: str, deadline=None, **kwargs):
+        """
+        Call messages.create on the agent's primary model, moving down the
+        chain when a model is overloaded, rate limited, times out or can't
+        be reached.
+
+        With a deadline (src.utils.deadline.Deadline) each attempt is given
+        the deadline's LLM timeout, max_tokens on text calls is capped to what
+        the model can generate in that time, and SDK retries are disabled.
+        """
+        import anthropic
+
+        models = self.models_for(agent)
+        for i, model in enumerate(models):
+            is_last = i == len(models) - 1
+            # Don't burn time on SDK retries when another model can take the call
+            model_client = client if is_last and deadline is None else client.with_options(max_retries=0)
+            call_kwargs = kwargs
+            if deadline is not None:
+                timeout = deadline.llm_timeout()
+                call_kwargs = dict(kwargs, timeout=timeout)
+                if "tools" not in kwargs:
+                    call_kwargs["max_tokens"] = fit_max_tokens(model, kwargs["max_tokens"], timeout)
+            try:
+                message = model_client.messages.create(model=model, **call_kwargs)
+                if deadline is not None and call_kwargs["max_tokens"] < kwargs["max_tokens"] \
+                        and getattr(message, "stop_reason", None) == "max_tokens":
+                    deadline.degrade(f"{agent} output", f"cut to {call_kwargs['max_tokens']} tokens to fit the deadline")
+                return message
+            except anthropic.APIStatusError as e:
+                if is_last or e.status_code not in FALLBACK_STATUS_CODES:
+                    raise
+                print(f"  ↪️ {model} unavailable ({e.status_code}), falling back to {models[i + 1]}")
+            except anthropic.APIConnectionError as e:
+                # Includes APITimeoutError, e.g. a call shortened by the deadline
+                if is_last:
+                    raise
+                print(f"  ↪️ {model} failed ({type(e).__name__}), falling back to {models[i + 1]}")
@@ -0,0 +1,182 @@
+"""
+Opt-in profiling of plan_trip.
+
+Enable for a share of plans with PROFILE_PLANS (sample | cprofile) and
+PROFILE_SAMPLE_RATE, or for a single plan with plan_trip(..., profile=True).
+Each profiled plan writes a directory under PROFILE_DIR containing:
+
+    stacks.collapsed   sampled stacks ("frame;frame;frame count") for flamegraph.pl / speedscope
+    plan.pstats        cProfile stats (cprofile mode; python -m pstats plan.pstats)
+    allocations.txt    top allocation sites during the plan (PROFILE_MEMORY=1, tracemalloc)
+    summary.json       wall/CPU time, stage durations, sample counts
+
+The sampler only reads stacks of the threads running this plan's stages, so
+its overhead is set by PROFILE_INTERVAL_MS rather than by the code profiled.
+cProfile traces every call and is meant for investigating, not production.
+"""
+import cProfile
+import json
+import random
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from src.utils.config import PROFILE_PLANS, PROFILE_SAMPLE_RATE, PROFILE_DIR, PROFILE_INTERVAL_MS, PROFILE_MEMORY
+
+PROFILE_MODES = ("sample", "cprofile")
+# Allocation sites listed in allocations.txt
+TOP_ALLOCATIONS = 30
+
+class StackSampler:
+    """Samples the stacks of registered threads at a fixed interval"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.counts = Counter()
+        self.samples = 0
+        self._threads = {}  # thread id -> name
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def add_thread(self, thread: threading.Thread):
+        self._threads[thread.ident] = thread.name
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for ident, name in list(self._threads.items()):
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.counts[self._collapse(name, frame)] += 1
+            self.samples += 1
+
+    @staticmethod
+    def _collapse(thread_name: str, frame) -> str:
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+            frame = frame.f_back
+        # Pooled thread names differ per worker; keep one root per pool
+        return ";".join([re.sub(r"_\d+$", "", thread_name)] + stack[::-1])
+
+    def write_collapsed(self, path: Path):
+        with open(path, "w") as f:
+            for stack, count in self.counts.most_common():
+                f.write(f"{stack} {count}\n")
+
+# Imports and tracemalloc's own bookkeeping are not the plan's allocations
+_ALLOCATION_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+]
+
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+
+class PlanProfiler:
+    """Profiles one plan; stages run inside thread() so their threads are covered"""
+
+    def __init__(self, mode: str, label: str, directory: str = PROFILE_DIR,
+                 interval_ms: float = PROFILE_INTERVAL_MS, memory: bool = PROFILE_MEMORY):
+        self.mode = mode
+        self.memory = memory
+        safe_label = re.sub(r"[^a-z0-9]+", "-", label.lower()).strip("-") or "plan"
+        self.path = Path(directory) / f"{time.strftime('%Y%m%d-%H%M%S')}-{safe_label}-{random.randrange(16**6):06x}"
+        self.sampler = StackSampler(interval_ms / 1000)
+        self.cprofile = cProfile.Profile() if mode == "cprofile" else None
+        self._started = None
+        self._cpu_started = None
+        self._baseline = None
+
+    def start(self):
+        global _tracemalloc_users
+        if self.memory:
+            with _tracemalloc_lock:
+                if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                _tracemalloc_users += 1
+            self._baseline = tracemalloc.take_snapshot().filter_traces(_ALLOCATION_FILTERS)
+        self._started = time.perf_counter()
+        self._cpu_started = time.process_time()
+        self.sampler.add_thread(threading.current_thread())
+        self.sampler.start()
+        return self
+
+    @contextmanager
+    def thread(self):
+        """Cover the current thread while the block runs (stages run sequentially)"""
+        self.sampler.add_thread(threading.current_thread())
+        if self.cprofile:
+            self.cprofile.enable()
+        try:
+            yield
+        finally:
+            if self.cprofile:
+                self.cprofile.disable()
+
+    def finish(self, extra: dict = None):
+        """
+        Stop profiling and write the artifacts
+        Returns:
+            Summary including the artifact directory
+        """
+        global _tracemalloc_users
+        wall = time.perf_counter() - self._started
+        cpu = time.process_time() - self._cpu_started
+        self.sampler.stop()
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        self.sampler.write_collapsed(self.path / "stacks.collapsed")
+        if self.cprofile:
+            self.cprofile.dump_stats(self.path / "plan.pstats")
+        if self.memory:
+            snapshot = tracemalloc.take_snapshot().filter_traces(_ALLOCATION_FILTERS)
+            with open(self.path / "allocations.txt", "w") as f:
+                for stat in snapshot.compare_to(self._baseline, "lineno")[:TOP_ALLOCATIONS]:
+                    f.write(f"{stat}\n")
+            with _tracemalloc_lock:
+                _tracemalloc_users -= 1
+                if _tracemalloc_users == 0:
+                    tracemalloc.stop()
+
+        summary = {
+            "dir": str(self.path),
+            "mode": self.mode,
+            "wall_s": round(wall, 3),
+            # Process-wide, so concurrent plans are included
+            "process_cpu_s": round(cpu, 3),
+            "samples": self.sampler.samples,
+            "interval_ms": self.sampler.interval * 1000,
+        }
+        summary.update(extra or {})
+        with open(self.path / "summary.json", "w") as f:
+            json.dump(summary, f, indent=2, default=str)
+        print(f"🔬 Profile written to {self.path}")
+        return summary
+
+def start_profiler(label: str, profile: bool = None):
+    """
+    Start a PlanProfiler when this plan should be profiled, else None
+    Args:
+        profile: True forces profiling (in the configured mode, or sampling),
+            False disables it, None applies PROFILE_PLANS and PROFILE_SAMPLE_RATE
+    """
+    mode = PROFILE_PLANS if PROFILE_PLANS in PROFILE_MODES else None
+    if profile is False:
+        return None
+    if profile is None and (mode is None or random.random() >= PROFILE_SAMPLE_RATE):
+        return None
+    return PlanProfiler(mode or "sample", label).start()
@@ -0,0 +1,202 @@
+"""
+Local day scheduler for the itinerary.
+
+Clusters geocoded activities into days by proximity, assigns them to time
+slots by their preferred time of day and indoor/outdoor setting, and orders
+each day with a nearest-neighbour + 2-opt route so the LLM only has to write
+the narrative for a precomputed schedule.
+"""
+import math
+from src.utils.activity_catalog import TIMES_OF_DAY
+
+# Hours of activities each slot comfortably holds
+SLOT_CAPACITY_HOURS = {"Morning": 3, "Midday": 5, "Evening": 4, "Night": 2}
+MAX_HOURS_PER_DAY = 9
+# Geocoded activities further than this from the destination are treated as misses
+MAX_DISTANCE_FROM_CENTER_KM = 80
+
+def haversine_km(a, b):
+    """Great-circle distance between two (lat, lon) points in km"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (a[0], a[1], b[0], b[1]))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371 * math.asin(math.sqrt(h))
+
+def _kmeans(points, k, iterations=20):
+    """Deterministic k-means (farthest-point seeding) over (lat, lon) points"""
+    centers = [points[0]]
+    while len(centers) < k:
+        centers.append(max(points, key=lambda p: min(haversine_km(p, c) for c in centers)))
+
+    labels = [0] * len(points)
+    for iteration in range(iterations):
+        new_labels = [min(range(k), key=lambda c: haversine_km(p, centers[c])) for p in points]
+        if iteration > 0 and new_labels == labels:
+            break
+        labels = new_labels
+        for c in range(k):
+            members = [p for p, label in zip(points, labels) if label == c]
+            if members:
+                centers[c] = (sum(p[0] for p in members) / len(members),
+                              sum(p[1] for p in members) / len(members))
+    return labels, centers
+
+def _order_route(items, start=None):
+    """
+    Open-path TSP heuristic: nearest neighbour from start, improved by 2-opt.
+    items are (activity, point) pairs; point may be None (kept at the end).
+    """
+    located = [item for item in items if item[1] is not None]
+    unlocated = [item for item in items if item[1] is None]
+    if len(located) < 2:
+        return located + unlocated
+
+    remaining = list(located)
+    if start is None:
+        route = [remaining.pop(0)]
+    else:
+        first = min(remaining, key=lambda item: haversine_km(start, item[1]))
+        remaining.remove(first)
+        route = [first]
+    while remaining:
+        nearest = min(remaining, key=lambda item: haversine_km(route[-1][1], item[1]))
+        remaining.remove(nearest)
+        route.append(nearest)
+
+    def length(path):
+        total = haversine_km(start, path[0][1]) if start is not None else 0
+        return total + sum(haversine_km(path[i][1], path[i + 1][1]) for i in range(len(path) - 1))
+
+    improved = True
+    while improved:
+        improved = False
+        for i in range(len(route) - 1):
+            for j in range(i + 1, len(route)):
+                if i == 0 and start is None and j == len(route) - 1:
+                    continue
+                candidate = route[:i] + route[i:j + 1][::-1] + route[j + 1:]
+                if length(candidate) < length(route) - 1e-9:
+                    route = candidate
+                    improved = True
+    return route + unlocated
+
+def _assign_days(activities, points, num_days):
+    """Cluster activities into num_days groups, then balance hours per day"""
+    days = [[] for _ in range(num_days)]
+    located = [i for i, p in enumerate(points) if p is not None]
+
+    if located:
+        k = min(num_days, len(located))
+        labels, centers = _kmeans([points[i] for i in located], k)
+        for i, label in zip(located, labels):
+            days[label].append(i)
+    else:
+        centers = []
+
+    def hours(day):
+        return sum(activities[i]["duration_hours"] for i in day)
+
+    # Move the farthest-from-center activities off overloaded days
+    for d, day in enumerate(days):
+        while hours(day) > MAX_HOURS_PER_DAY and len(day) > 1:
+            center = centers[d] if d < len(centers) else None
+            victim = max(day, key=lambda i: haversine_km(points[i], center) if center and points[i] else 0)
+            targets = [t for t in range(num_days) if t != d and hours(days[t]) + activities[victim]["duration_hours"] <= MAX_HOURS_PER_DAY]
+            if not targets:
+                break
+            if points[victim] is not None:
+                target = min(targets, key=lambda t: haversine_km(points[victim], centers[t]) if t < len(centers) else float("inf"))
+            else:
+                target = min(targets, key=lambda t: hours(days[t]))
+            day.remove(victim)
+            days[target].append(victim)
+
+    # Activities that could not be geocoded fill the lightest days
+    for i, p in enumerate(points):
+        if p is None:
+            min(days, key=hours).append(i)
+
+    # Spread out days that ended up empty while another has several activities
+    for day in days:
+        if not day:
+            donor = max(days, key=len)
+            if len(donor) > 1:
+                day.append(donor.pop())
+    return days
+
+def _assign_slots(activities, day):
+    """Place each activity in its preferred slot, spilling into neighbouring slots"""
+    slots = {slot: [] for slot in TIMES_OF_DAY}
+    used = {slot: 0.0 for slot in TIMES_OF_DAY}
+
+    # Longest activities first so they get their preferred slot
+    for i in sorted(day, key=lambda i: -activities[i]["duration_hours"]):
+        activity = activities[i]
+        preferred = TIMES_OF_DAY.index(activity["time_of_day"])
+        candidates = sorted(range(len(TIMES_OF_DAY)), key=lambda s: abs(s - preferred))
+        if activity["setting"] == "Outdoor":
+            # Keep outdoor activities in daylight when spilling over
+            candidates = [s for s in candidates if TIMES_OF_DAY[s] != "Night"] + [TIMES_OF_DAY.index("Night")]
+        chosen = next(
+            (TIMES_OF_DAY[s] for s in candidates
+             if used[TIMES_OF_DAY[s]] + activity["duration_hours"] <= SLOT_CAPACITY_HOURS[TIMES_OF_DAY[s]]),
+            TIMES_OF_DAY[preferred]
+        )
+        slots[chosen].append(i)
+        used[chosen] += activity["duration_hours"]
+    return slots
+
+def build_schedule(activities: list, coordinates: list, dates: list, center: dict = None):
+    """
+    Build a day-by-day schedule.
+    Args:
+        activities: Activity records
+        coordinates: (lat, lon) or None per activity, same order as activities
+        dates: One "YYYY-MM-DD" string per trip day
+        center: Destination {"lat", "lon"}; far-away geocodes are discarded
+    Returns:
+        List of days: {"day", "date", "slots": {slot: [activity]}, "travel_km"}
+    """
+    points = list(coordinates)
+    if center and "lat" in center:
+        origin = (center["lat"], center["lon"])
+        points = [p if p and haversine_km(origin, p) <= MAX_DISTANCE_FROM_CENTER_KM else None for p in points]
+
+    days = _assign_days(activities, points, len(dates))
+
+    schedule = []
+    for d, day in enumerate(days):
+        slots = _assign_slots(activities, day)
+        ordered = {}
+        position = None
+        travel_km = 0.0
+        for slot in TIMES_OF_DAY:
+            route = _order_route([(i, points[i]) for i in slots[slot]], start=position)
+            ordered[slot] = [activities[i] for i, _ in route]
+            for _, point in route:
+                if point is None:
+                    continue
+                if position is not None:
+                    travel_km += haversine_km(position, point)
+                position = point
+        schedule.append({
+            "day": d + 1,
+            "date": dates[d],
+            "slots": ordered,
+            "travel_km": round(travel_km, 1)
+        })
+    return schedule
+
+def serialize_schedule(schedule: list) -> str:
+    """Compact text rendering of a schedule for the itinerary prompt"""
+    lines = []
+    for day in schedule:
+        lines.append(f"Day {day['day']} ({day['date']}, ~{day['travel_km']} km between stops):")
+        for slot in TIMES_OF_DAY:
+            for activity in day["slots"][slot]:
+                lines.append(
+                    f"  {slot}: {activity['name']} | {activity['location']} | "
+                    f"{activity['duration_hours']:g}h | {activity['cost_tier']} | {activity['setting']}"
+                )
+        if not any(day["slots"].values()):
+            lines.append("  (free day - suggest relaxed exploration near the previous day's area)")
+    return "\n".join(lines)
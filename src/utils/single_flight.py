@@ -0,0 +1,89 @@
+import json
+import threading
+from concurrent.futures import Future
+from src.utils.metrics import COALESCED_CALLS
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key into one computation.
+
+    The first caller for a key (the leader) runs the function; callers that
+    arrive while it is in flight wait for and share its result or exception.
+    Nothing is cached once the call finishes - that is ResponseCache's job.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.max_waiters = 0
+        self._inflight = {}  # key -> (Future, waiter count)
+        self._lock = threading.Lock()
+
+    def _serialize_key(self, key) -> str:
+        return key if isinstance(key, str) else json.dumps(key, sort_keys=True, default=str)
+
+    def do(self, key, fn):
+        """
+        Run fn() once for all concurrent callers with this key
+        Returns:
+            (result, shared) where shared is True for callers that joined a call in flight
+        """
+        skey = self._serialize_key(key)
+        with self._lock:
+            self.calls += 1
+            entry = self._inflight.get(skey)
+            if entry is not None:
+                future, waiters = entry
+                self._inflight[skey] = (future, waiters + 1)
+                self.coalesced += 1
+                self.max_waiters = max(self.max_waiters, waiters + 1)
+                leader = False
+            else:
+                future = Future()
+                self._inflight[skey] = (future, 0)
+                self.executions += 1
+                leader = True
+
+        if not leader:
+            COALESCED_CALLS.inc(group=self.name)
+            return future.result(), True
+
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._inflight[skey]
+        return future.result(), False
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._inflight)
+
+    def get_stats(self):
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "max_waiters": self.max_waiters,
+            "in_flight": self.in_flight(),
+        }
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+def get_single_flight(name: str) -> SingleFlight:
+    """Shared SingleFlight per name (one per process)"""
+    with _flights_lock:
+        if name not in _flights:
+            _flights[name] = SingleFlight(name)
+        return _flights[name]
+
+def get_single_flight_stats():
+    """Coalescing counters for every named flight group"""
+    with _flights_lock:
+        flights = list(_flights.values())
+    return {flight.name: flight.get_stats() for flight in flights}
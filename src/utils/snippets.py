@@ -0,0 +1,133 @@
+"""
+Local relevance ranking of search snippets before they go into a prompt.
+
+Search results are split into sentence passages, scored against the
+agent's task and the traveler's interests with BM25, near-duplicates are
+dropped, and the best passages are packed into a token budget behind the
+search answer.
+"""
+import math
+import re
+from collections import Counter
+
+STOPWORDS = set("""
+a an and are as at be by for from has have in is it its of on or that the this to
+was were will with you your our we they their there these those not but can do
+""".split())
+
+# BM25 parameters
+K1 = 1.5
+B = 0.75
+# Passages sharing more than this fraction of word trigrams are near-duplicates
+DUPLICATE_THRESHOLD = 0.6
+# Passages shorter than this many words carry little signal
+MIN_PASSAGE_WORDS = 5
+
+_WORD = re.compile(r"[a-z0-9$€£¥]+")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+def _stem(word: str) -> str:
+    """Crude plural folding, so museums matches museum"""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+def tokenize(text: str):
+    return [_stem(w) for w in _WORD.findall(text.lower()) if w not in STOPWORDS]
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token)"""
+    return max(1, len(text) // 4)
+
+def split_passages(text: str):
+    """Sentence-level passages with whitespace normalised"""
+    text = " ".join((text or "").split())
+    return [p for p in _SENTENCE_END.split(text) if len(p.split()) >= MIN_PASSAGE_WORDS]
+
+def bm25_scores(query_terms: list, documents: list):
+    """BM25 score of each tokenized document for the query terms"""
+    if not documents:
+        return []
+    avg_len = sum(len(doc) for doc in documents) / len(documents) or 1
+    doc_freq = Counter(term for doc in documents for term in set(doc))
+    n = len(documents)
+    scores = []
+    for doc in documents:
+        counts = Counter(doc)
+        score = 0.0
+        for term in set(query_terms):
+            tf = counts.get(term)
+            if not tf:
+                continue
+            idf = math.log(1 + (n - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5))
+            score += idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * len(doc) / avg_len))
+        scores.append(score)
+    return scores
+
+def _shingles(tokens: list):
+    return {tuple(tokens[i:i + 3]) for i in range(max(1, len(tokens) - 2))}
+
+def _is_duplicate(shingles: set, kept: list) -> bool:
+    for other in kept:
+        overlap = len(shingles & other) / (min(len(shingles), len(other)) or 1)
+        if overlap > DUPLICATE_THRESHOLD:
+            return True
+    return False
+
+def rank_passages(results: list, query: str):
+    """
+    Passages from all results, best first
+    Returns:
+        List of (score, result index, passage index, title, passage)
+    """
+    passages = []
+    for r_index, result in enumerate(results):
+        for p_index, passage in enumerate(split_passages(result.get("content", ""))):
+            passages.append((r_index, p_index, result.get("title") or "Untitled", passage))
+    documents = [tokenize(passage) for _, _, _, passage in passages]
+    scores = bm25_scores(tokenize(query), documents)
+    ranked = [(score,) + passage for score, passage in zip(scores, passages)]
+    # Ties keep the search engine's order
+    ranked.sort(key=lambda item: (-item[0], item[1], item[2]))
+    return ranked
+
+def format_search_context(results: dict, query: str, token_budget: int,
+                          empty_message: str = "No search results available"):
+    """
+    Prompt-ready search context: the search answer first, then the most
+    relevant non-duplicate passages that fit in token_budget, grouped by source
+    """
+    if not results or "error" in results:
+        return empty_message
+
+    lines, kept_shingles = [], []
+    budget = token_budget
+    answer = " ".join((results.get("answer") or "").split())
+    if answer:
+        answer_line = f"Summary: {answer}"
+        if estimate_tokens(answer_line) > budget:
+            answer_line = answer_line[:budget * 4].rsplit(" ", 1)[0] + "..."
+        lines.append(answer_line)
+        budget -= estimate_tokens(answer_line)
+        kept_shingles.extend(_shingles(tokenize(p)) for p in split_passages(answer))
+
+    selected = {}  # result index -> (title, [(passage index, passage)])
+    for score, r_index, p_index, title, passage in rank_passages(results.get("results", []), query):
+        if score <= 0 and selected:
+            break
+        cost = estimate_tokens(passage) + (0 if r_index in selected else estimate_tokens(title) + 2)
+        if cost > budget:
+            continue
+        shingles = _shingles(tokenize(passage))
+        if _is_duplicate(shingles, kept_shingles):
+            continue
+        kept_shingles.append(shingles)
+        selected.setdefault(r_index, (title, []))[1].append((p_index, passage))
+        budget -= cost
+
+    for r_index in sorted(selected):
+        title, passages = selected[r_index]
+        lines.append(f"- {title}: " + " ".join(p for _, p in sorted(passages)))
+    return "\n".join(lines) if lines else empty_message
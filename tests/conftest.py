@@ -0,0 +1,5 @@
+import os
+import tempfile
+
+# Modules read TRAVELAI_DB_PATH at import time; keep test runs away from the working travelai.db
+os.environ.setdefault("TRAVELAI_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="travelai-tests-"), "travelai.db"))
@@ -0,0 +1,137 @@
+import threading
+import time
+import pytest
+from src.database.usage_ledger import UsageLedger, DEMO_KEY_ID, key_id_for
+from src.utils.admission import AdmissionController, AdmissionRejected
+
+USER_KEY = key_id_for("sk-test")
+
+@pytest.fixture
+def ledger(tmp_path):
+    return UsageLedger(str(tmp_path / "ledger.db"))
+
+def controller(ledger, **kwargs):
+    options = dict(demo_max_concurrent=2, demo_daily_tokens=1000, user_max_concurrent=1,
+                   max_queue=2, queue_timeout=1, tokens_per_plan=400)
+    options.update(kwargs)
+    return AdmissionController(ledger, **options)
+
+def hold_slot(admission, key_id, spent=None):
+    """Admit a plan on another thread and keep it running until the returned event is set"""
+    admitted, release = threading.Event(), threading.Event()
+
+    def run():
+        with admission.admit(key_id, spent=spent):
+            admitted.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    assert admitted.wait(5)
+    return release, thread
+
+def test_ledger_aggregates_per_key_day_and_stage(ledger):
+    ledger.record(DEMO_KEY_ID, "itinerary", 100, 50, 0.01)
+    ledger.record(DEMO_KEY_ID, "itinerary", 200, 25, 0.02)
+    ledger.record(DEMO_KEY_ID, "budget", 10, 5, 0.001)
+    ledger.record(USER_KEY, "budget", 1000, 1000, 0.5)
+    assert ledger.get_daily_tokens(DEMO_KEY_ID) == 390
+    assert ledger.get_daily_tokens(DEMO_KEY_ID, day="2000-01-01") == 0
+    usage = {row["stage"]: row for row in ledger.get_daily_usage(DEMO_KEY_ID)}
+    assert usage["itinerary"]["calls"] == 2
+    assert usage["itinerary"]["input_tokens"] == 300
+    assert usage["budget"]["output_tokens"] == 5
+
+def test_daily_limit_rejects_with_retry_after_until_the_next_day(ledger):
+    admission = controller(ledger)
+    ledger.record(DEMO_KEY_ID, "itinerary", 500, 200, 0.01)
+    with pytest.raises(AdmissionRejected) as rejected:
+        with admission.admit(DEMO_KEY_ID):
+            pass
+    assert 0 < rejected.value.retry_after <= 24 * 3600
+    # Own keys have no daily budget
+    with admission.admit(USER_KEY):
+        pass
+
+def test_running_plans_reserve_only_what_they_have_not_spent(ledger):
+    admission = controller(ledger)
+    spent = {"tokens": 0}
+    release, thread = hold_slot(admission, DEMO_KEY_ID, spent=lambda: spent["tokens"])
+
+    # 0 used + 400 reserved + 400 for the new plan fits in 1000
+    with admission.admit(DEMO_KEY_ID):
+        pass
+
+    # The running plan records 300 tokens: 300 used + 100 still reserved + 400 fits
+    ledger.record(DEMO_KEY_ID, "destination", 200, 100, 0.01)
+    spent["tokens"] = 300
+    with admission.admit(DEMO_KEY_ID):
+        pass
+
+    # 350 more from elsewhere: 650 used + 100 + 400 no longer fits
+    ledger.record(DEMO_KEY_ID, "budget", 300, 50, 0.01)
+    with pytest.raises(AdmissionRejected):
+        with admission.admit(DEMO_KEY_ID):
+            pass
+    release.set()
+    thread.join(5)
+
+def test_queued_plan_gets_the_slot_when_it_frees(ledger):
+    admission = controller(ledger)
+    release, thread = hold_slot(admission, USER_KEY)
+    threading.Timer(0.1, release.set).start()
+    started = time.monotonic()
+    with admission.admit(USER_KEY):
+        waited = time.monotonic() - started
+        assert admission.get_status(USER_KEY)["active_plans"] == 1
+    thread.join(5)
+    assert 0.05 < waited < 1
+    assert admission.get_status(USER_KEY)["queued_plans"] == 0
+
+def test_queued_plan_times_out_with_retry_after(ledger):
+    admission = controller(ledger, queue_timeout=0.1)
+    release, thread = hold_slot(admission, USER_KEY)
+    with pytest.raises(AdmissionRejected) as rejected:
+        with admission.admit(USER_KEY):
+            pass
+    assert rejected.value.retry_after == 0.1
+    assert admission.get_status(USER_KEY)["queued_plans"] == 0
+    release.set()
+    thread.join(5)
+
+def test_full_queue_rejects_immediately(ledger):
+    admission = controller(ledger, max_queue=0, queue_timeout=5)
+    release, thread = hold_slot(admission, USER_KEY)
+    started = time.monotonic()
+    with pytest.raises(AdmissionRejected) as rejected:
+        with admission.admit(USER_KEY):
+            pass
+    assert time.monotonic() - started < 1
+    assert rejected.value.retry_after == 5
+    release.set()
+    thread.join(5)
+
+class SlowLedger(UsageLedger):
+    """Ledger whose reads block until released, like a busy database"""
+    def __init__(self, db_path):
+        super().__init__(db_path)
+        self.reading = threading.Event()
+        self.release = threading.Event()
+
+    def get_daily_tokens(self, key_id, day=None):
+        self.reading.set()
+        self.release.wait(5)
+        return super().get_daily_tokens(key_id, day)
+
+def test_slow_ledger_read_does_not_block_other_keys(tmp_path):
+    ledger = SlowLedger(str(tmp_path / "ledger.db"))
+    admission = controller(ledger)
+    demo = threading.Thread(target=lambda: admission.admit(DEMO_KEY_ID).__enter__(), daemon=True)
+    demo.start()
+    assert ledger.reading.wait(5)
+    started = time.monotonic()
+    with admission.admit(USER_KEY):
+        pass
+    assert time.monotonic() - started < 1
+    ledger.release.set()
+    demo.join(5)
@@ -0,0 +1,188 @@
+import json
+import pytest
+import requests
+from fastapi.testclient import TestClient
+from src.api import jobs as jobs_module
+from src.api import server
+from src.api.jobs import PlanJobManager
+from src.database import DatabaseManager
+from src.ui.backend import RemoteBackend, UNKNOWN_QUOTA
+
+PLAN_REQUEST = {
+    "destination": "Lisbon",
+    "start_date": "2025-06-15",
+    "end_date": "2025-06-17",
+    "budget": 1500,
+    "interests": ["food", "museums"],
+}
+
+class StubCoordinator:
+    """Stands in for TravelCoordinator: no agents, no API calls"""
+    plan_error = None
+    compare_result = None
+
+    def __init__(self, api_key=None):
+        self.api_key = api_key
+        self.stage_findings = {"destination": {"research": "Hills and trams"}}
+
+    def plan_trip(self, destination, start_date, end_date, budget, interests, profile=None, progress_callback=None):
+        for stage in ("destination", "activities", "budget", "itinerary"):
+            progress_callback(stage, "done")
+        if self.plan_error:
+            return {"error": self.plan_error}
+        return {"destination": destination, "itinerary": f"**Day 1** in {destination}", "budget": budget}
+
+    def compare_destinations(self, destinations, start_date, end_date, budget, interests):
+        return self.compare_result
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    db = DatabaseManager(str(tmp_path / "api.db"))
+    monkeypatch.setattr(server, "jobs", PlanJobManager(workers=2, db=db))
+    monkeypatch.setattr(jobs_module, "TravelCoordinator", StubCoordinator)
+    monkeypatch.setattr(server, "TravelCoordinator", StubCoordinator)
+    monkeypatch.setattr(StubCoordinator, "plan_error", None)
+    monkeypatch.setattr(StubCoordinator, "compare_result", None)
+    return TestClient(server.app)
+
+def parse_sse(text):
+    return [json.loads(line[len("data:"):]) for line in text.splitlines() if line.startswith("data:")]
+
+def test_submit_then_stream_events_until_the_trip_is_saved(client):
+    response = client.post("/plans", json=PLAN_REQUEST)
+    assert response.status_code == 202
+    plan_id = response.json()["plan_id"]
+
+    with client.stream("GET", f"/plans/{plan_id}/events") as stream:
+        events = parse_sse("".join(stream.iter_text()))
+    types = [event["type"] for event in events]
+    assert types[0] == "status" and types.count("progress") == 4
+    assert types[-2:] == ["result", "trip_saved"]
+    result, saved = events[-2], events[-1]
+    # The plan is sent before its write commits
+    assert result["status"] == "done" and result["saving"] is True
+    assert isinstance(saved["trip_id"], int)
+
+    plan = client.get(f"/plans/{plan_id}").json()
+    assert plan["status"] == "done"
+    assert plan["result"]["trip_id"] == saved["trip_id"]
+    trip = client.get(f"/trips/{saved['trip_id']}").json()
+    assert trip["itinerary"]["itinerary"] == "**Day 1** in Lisbon"
+
+def test_stream_endpoint_submits_and_streams_in_one_request(client):
+    with client.stream("POST", "/plans/stream", json=PLAN_REQUEST) as stream:
+        plan_id = stream.headers["X-Plan-Id"]
+        events = parse_sse("".join(stream.iter_text()))
+    assert events[-1]["type"] == "trip_saved"
+    assert client.get(f"/plans/{plan_id}").json()["result"]["trip_id"] == events[-1]["trip_id"]
+
+def test_failed_plan_ends_the_stream_at_the_result(client, monkeypatch):
+    monkeypatch.setattr(StubCoordinator, "plan_error", "Demo key is busy")
+    with client.stream("POST", "/plans/stream", json=PLAN_REQUEST) as stream:
+        events = parse_sse("".join(stream.iter_text()))
+    assert events[-1]["type"] == "result"
+    assert events[-1]["status"] == "failed" and events[-1]["saving"] is False
+    assert events[-1]["result"] == {"error": "Demo key is busy"}
+
+def test_invalid_plan_and_unknown_ids(client):
+    assert client.post("/plans", json=dict(PLAN_REQUEST, budget=0)).status_code == 422
+    assert client.post("/plans", json=dict(PLAN_REQUEST, start_date="June 15")).status_code == 422
+    assert client.get("/plans/missing").status_code == 404
+    assert client.get("/plans/missing/events").status_code == 404
+    assert client.get("/trips/12345").status_code == 404
+
+def test_compare_returns_the_ranking(client, monkeypatch):
+    ranking = {"destinations": [{"destination": "Porto", "score": 0.9}, {"destination": "Lisbon", "score": 0.7}]}
+    monkeypatch.setattr(StubCoordinator, "compare_result", ranking)
+    request = dict(PLAN_REQUEST, destinations=["Lisbon", "Porto"])
+    del request["destination"]
+    response = client.post("/compare", json=request)
+    assert response.status_code == 200
+    assert response.json() == ranking
+
+def test_compare_rejected_by_admission_sends_retry_after(client, monkeypatch):
+    monkeypatch.setattr(StubCoordinator, "compare_result", {"error": "Daily demo quota used up", "retry_after": 7.6})
+    request = dict(PLAN_REQUEST, destinations=["Lisbon", "Porto"])
+    del request["destination"]
+    response = client.post("/compare", json=request)
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "7"
+    assert response.json()["detail"] == "Daily demo quota used up"
+
+    monkeypatch.setattr(StubCoordinator, "compare_result", {"error": "Compare 2 to 5 different destinations"})
+    assert client.post("/compare", json=request).status_code == 400
+    assert client.post("/compare", json=dict(request, destinations=["Lisbon"])).status_code == 422
+
+def test_trip_search_and_pagination(client):
+    db = server.jobs.db
+    for i, destination in enumerate(["Lisbon", "Porto", "Lisbon", "Tokyo", "Lisbon"]):
+        db.save_trip(destination, "2025-06-15", "2025-06-17", 1000 + i, ["food"], {"itinerary": f"Trip {i}"})
+
+    results = client.get("/trips/search", params={"q": "lisb"}).json()
+    assert [trip["destination"] for trip in results] == ["Lisbon"] * 3
+    first_page = client.get("/trips/search", params={"q": "lisbon", "limit": 2}).json()
+    second_page = client.get("/trips/search", params={"q": "lisbon", "limit": 2, "offset": 2}).json()
+    assert len(first_page) == 2 and len(second_page) == 1
+    assert {trip["id"] for trip in first_page}.isdisjoint(trip["id"] for trip in second_page)
+    assert client.get("/trips/search", params={"q": "\"(*"}).json() == []
+    assert client.get("/trips/search", params={"q": "x", "limit": 0}).status_code == 422
+
+class FakeResponse:
+    def __init__(self, text, status_code=200):
+        self.text = text
+        self.status_code = status_code
+        self.closed = False
+
+    def iter_lines(self, decode_unicode=False):
+        yield from self.text.split("\n")
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error")
+
+    def json(self):
+        return json.loads(self.text)
+
+    def close(self):
+        self.closed = True
+
+class FakeSession:
+    """Replays a recorded event stream for POSTs; GETs fail as if the service were down"""
+    def __init__(self, stream_text):
+        self.stream_text = stream_text
+        self.response = None
+
+    def post(self, url, **kwargs):
+        self.response = FakeResponse(self.stream_text)
+        return self.response
+
+    def get(self, url, **kwargs):
+        raise requests.ConnectionError("Connection refused")
+
+def remote_backend(session):
+    backend = RemoteBackend("http://planner.test")
+    backend.session = session
+    return backend
+
+def test_remote_backend_returns_the_plan_then_resolves_the_trip_id(client):
+    with client.stream("POST", "/plans/stream", json=PLAN_REQUEST) as stream:
+        stream_text = "".join(stream.iter_text())
+    session = FakeSession(stream_text)
+    progress = []
+    plan, trip_id = remote_backend(session).plan_trip(**PLAN_REQUEST, on_progress=lambda *event: progress.append(event))
+    assert plan["itinerary"] == "**Day 1** in Lisbon"
+    assert len(progress) == 4
+    assert trip_id.result(timeout=5) == parse_sse(stream_text)[-1]["trip_id"]
+    assert session.response.closed
+
+def test_remote_backend_reports_a_stream_without_result():
+    plan, trip_id = remote_backend(FakeSession(": keep-alive\n\n")).plan_trip(**PLAN_REQUEST)
+    assert "error" in plan
+    assert trip_id.result(timeout=1) is None
+
+def test_remote_backend_reads_degrade_when_the_service_is_down():
+    backend = remote_backend(FakeSession(""))
+    assert backend.get_recent_trips() == []
+    assert backend.search_trips("lisbon") == []
+    assert backend.load_trip(1) is None
+    assert backend.get_demo_status() == UNKNOWN_QUOTA
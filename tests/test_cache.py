@@ -0,0 +1,132 @@
+import sqlite3
+import threading
+import time
+import pytest
+from src.agents.cache_warmer import CacheWarmer
+from src.database import DatabaseManager
+from src.utils.cache import ResponseCache, TTLCache
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "cache.db")
+
+def test_ttl_cache_expires_and_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert "b" not in cache and cache.get("a") == 1
+    cache.set("short", 4, ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get("short", "gone") == "gone"
+
+def test_entries_are_shared_through_the_database(db_path):
+    writer = ResponseCache("geocode", ttl=60, db_path=db_path)
+    writer.set(["Lisbon"], {"lat": 38.7})
+    # Another process (or a warmer) sees it without its own memory entry
+    reader = ResponseCache("geocode", ttl=60, db_path=db_path)
+    assert reader.get(["Lisbon"]) == {"lat": 38.7}
+    assert ResponseCache("search", ttl=60, db_path=db_path).get(["Lisbon"]) is None
+    assert (reader.hits, reader.misses) == (1, 0)
+
+def test_expired_entries_miss_and_need_refresh(db_path):
+    cache = ResponseCache("image", ttl=60, db_path=db_path)
+    cache.set("tokyo", {"url": "x"}, ttl=-1)
+    fresh_reader = ResponseCache("image", ttl=60, db_path=db_path)
+    assert fresh_reader.get("tokyo", "missing") == "missing"
+    assert fresh_reader.needs_refresh("tokyo")
+    cache.set("kyoto", {"url": "y"}, ttl=100)
+    assert 99 < cache.expires_in("kyoto") <= 100
+    assert not cache.needs_refresh("kyoto")
+    assert cache.needs_refresh("kyoto", window=200)
+    assert cache.expires_in("osaka") is None
+
+def test_each_thread_reuses_one_connection(db_path):
+    cache = ResponseCache("search", ttl=60, db_path=db_path)
+    assert cache._connect() is cache._connect()
+    other = []
+    thread = threading.Thread(target=lambda: other.append(cache._connect()))
+    thread.start()
+    thread.join()
+    assert other[0] is not cache._connect()
+
+def test_database_errors_fall_back_to_memory_and_count_as_missing(db_path, monkeypatch):
+    cache = ResponseCache("search", ttl=60, db_path=db_path)
+    cache.set("cached", {"results": []})
+
+    def broken():
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(cache, "_connect", broken)
+    assert cache.expires_in("cached") is None
+    assert cache.needs_refresh("cached")
+    assert cache.get("elsewhere", "default") == "default"
+    cache.set("new", {"results": [1]})
+    assert cache.get("new") == {"results": [1]}
+
+class StubWarmer(CacheWarmer):
+    """CacheWarmer over caller-supplied tasks instead of the real tools"""
+    def __init__(self, db, tasks, **kwargs):
+        super().__init__(db=db, **kwargs)
+        self.tasks = tasks
+
+    def _tasks(self, destination: str):
+        return self.tasks(destination)
+
+@pytest.fixture
+def warmer_db(tmp_path):
+    db = DatabaseManager(str(tmp_path / "trips.db"))
+    for destination in ["Lisbon", "Lisbon", "Tokyo"]:
+        db.save_trip(destination, "2025-06-15", "2025-06-17", 1500, ["food"], {})
+    return db
+
+def make_tasks(cache, results, llm_cache=None):
+    """geocode + research tasks whose fetch stores results[destination] like the real tools do"""
+    def tasks(destination):
+        def fetch():
+            value = results[destination]
+            if isinstance(value, Exception):
+                raise value
+            cache.set(destination, value)
+            return value
+
+        def research():
+            llm_cache.set(destination, {"sections": {}})
+            return {"sections": {}}
+
+        entries = [("geocode", cache, destination, fetch, False)]
+        if llm_cache is not None:
+            entries.append(("research", llm_cache, destination, research, True))
+        return entries
+    return tasks
+
+def test_warmer_counts_refreshed_failed_and_cached_failures(monkeypatch, warmer_db, db_path):
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test")
+    cache = ResponseCache("geocode-test", ttl=3600, db_path=db_path)
+    results = {"Lisbon": {"lat": 38.7, "lon": -9.1}, "Tokyo": {"error": "Could not geocode location"}}
+    warmer = StubWarmer(warmer_db, make_tasks(cache, results), refresh_window=60)
+
+    report = warmer.run_once()
+    assert report["destinations"] == 2
+    assert (report["refreshed"], report["failed"], report["already_warm"]) == (1, 1, 0)
+    assert report["coverage"] == 0.5
+
+    # The cached geocoding miss is still a failure, not a warm entry
+    report = warmer.run_once()
+    assert (report["refreshed"], report["failed"], report["already_warm"]) == (0, 1, 1)
+
+def test_warmer_reports_exceptions_and_respects_budgets(monkeypatch, warmer_db, db_path):
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test")
+    cache = ResponseCache("geocode-test", ttl=3600, db_path=db_path)
+    knowledge = ResponseCache("research-test", ttl=3600, db_path=db_path)
+    results = {"Lisbon": ConnectionError("offline"), "Tokyo": {"lat": 35.7, "lon": 139.7}}
+    warmer = StubWarmer(warmer_db, make_tasks(cache, results, knowledge), max_api_calls=1, max_llm_calls=1)
+
+    report = warmer.run_once()
+    # Lisbon is planned most, so it gets the one API and one LLM call
+    assert report["api_calls"] == 1 and report["llm_calls"] == 1
+    assert report["skipped_over_budget"] == 2
+    assert (report["refreshed"], report["failed"]) == (1, 1)
+    assert not knowledge.needs_refresh("Lisbon")
+    assert knowledge.needs_refresh("Tokyo")
@@ -0,0 +1,95 @@
+import threading
+from types import SimpleNamespace
+from src.utils.comparison import (
+    COST_COMPARISON_TOOL,
+    NEUTRAL_SCORE,
+    parse_cost_comparison,
+    normalize_candidates,
+    budget_fit,
+    season_fit,
+    rank_candidates,
+)
+from src.utils.cost_tracker import CostTracker
+
+def tool_message(destinations, name=COST_COMPARISON_TOOL["name"]):
+    text = SimpleNamespace(type="text", text="Here are the estimates")
+    tool = SimpleNamespace(type="tool_use", name=name, input={"destinations": destinations})
+    return SimpleNamespace(content=[text, tool])
+
+def estimate(destination, **fields):
+    item = {"destination": destination, "daily_cost_usd": 120, "estimated_total_usd": 600,
+            "verdict": "comfortable", "season_rating": 4, "summary": " Mild and affordable. "}
+    item.update(fields)
+    return item
+
+def test_parse_cost_comparison_matches_cities_as_given():
+    message = tool_message([
+        estimate("  lisbon "),
+        estimate("Porto", daily_cost_usd="95.456", verdict="cheap", season_rating=None),
+        estimate("Madrid"),
+        estimate("Seville", estimated_total_usd="a lot"),
+        "not a dict",
+    ])
+    estimates = parse_cost_comparison(message, ["Lisbon", "Porto", "Seville"])
+
+    assert set(estimates) == {"Lisbon", "Porto"}
+    assert estimates["Lisbon"] == {"daily_cost_usd": 120.0, "estimated_total_usd": 600.0, "verdict": "comfortable",
+                                   "season_rating": 4, "summary": "Mild and affordable."}
+    # Unknown verdicts and missing ratings are left unset rather than guessed
+    assert estimates["Porto"]["daily_cost_usd"] == 95.46
+    assert estimates["Porto"]["verdict"] is None
+    assert estimates["Porto"]["season_rating"] is None
+
+def test_parse_cost_comparison_ignores_other_responses():
+    assert parse_cost_comparison(tool_message([estimate("Lisbon")], name="other_tool"), ["Lisbon"]) == {}
+    assert parse_cost_comparison(SimpleNamespace(content=[]), ["Lisbon"]) == {}
+    broken = SimpleNamespace(content=[SimpleNamespace(type="tool_use", name=COST_COMPARISON_TOOL["name"], input="[]")])
+    assert parse_cost_comparison(broken, ["Lisbon"]) == {}
+
+def test_normalize_candidates_drops_blanks_and_duplicates():
+    assert normalize_candidates([" Lisbon", "lisbon ", "", "  ", "New   York", "Porto"]) == ["Lisbon", "New York", "Porto"]
+
+def test_budget_fit_falls_off_quadratically_past_the_budget():
+    assert budget_fit(800, 1000) == 1.0
+    assert budget_fit(1000, 1000) == 1.0
+    assert budget_fit(2000, 1000) == 0.25
+    assert budget_fit(0, 1000) is None
+    assert budget_fit(None, 1000) is None
+
+def test_season_fit_scales_the_rating_and_clamps_it():
+    assert season_fit(1) == 0.0
+    assert season_fit(3) == 0.5
+    assert season_fit(5) == 1.0
+    assert season_fit(9) == 1.0
+    assert season_fit(None) is None
+    assert season_fit(0) is None
+
+def test_rank_candidates_weights_budget_over_season():
+    ranked = rank_candidates([
+        {"destination": "Great season", "budget_fit": 0.25, "season_fit": 1.0},
+        {"destination": "Cheap", "budget_fit": 1.0, "season_fit": 0.5},
+        {"destination": "Unknown", "budget_fit": None, "season_fit": None},
+    ])
+    assert [c["destination"] for c in ranked] == ["Cheap", "Great season", "Unknown"]
+    assert [c["rank"] for c in ranked] == [1, 2, 3]
+    assert ranked[0]["score"] == 0.8
+    # Components that couldn't be estimated count as neutral
+    assert ranked[2]["score"] == NEUTRAL_SCORE
+
+def test_cost_tracker_totals_survive_concurrent_stages():
+    tracker = CostTracker()
+
+    def record():
+        for _ in range(500):
+            tracker.add_usage(3, 2, stage="destination", model="claude-3-5-haiku-20241022")
+
+    threads = [threading.Thread(target=record) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    summary = tracker.get_summary()
+    assert tracker.get_total_tokens() == 5 * 500 * 5
+    assert summary["input_tokens"] == 7500
+    assert summary["by_model"]["claude-3-5-haiku-20241022"]["output_tokens"] == 5000
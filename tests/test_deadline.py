@@ -0,0 +1,36 @@
+import time
+from src.utils.deadline import Deadline, MIN_LLM_TIMEOUT, MIN_TOOL_TIMEOUT, TOOL_SHARE
+
+def test_stages_share_the_time_left():
+    deadline = Deadline(100)
+    deadline.start_stage("research_destination")
+    assert 19 < deadline.stage_remaining() <= 20
+    # The last stage gets everything that is left
+    deadline.start_stage("build_itinerary")
+    assert 99 < deadline.stage_remaining() <= 100
+
+def test_tool_timeout_uses_a_share_of_the_stage_and_skips_when_too_short():
+    deadline = Deadline(100)
+    deadline.start_stage("research_destination")
+    assert deadline.tool_timeout(5) == 5
+    assert deadline.tool_timeout(60) <= 20 * TOOL_SHARE
+    short = Deadline(MIN_TOOL_TIMEOUT)
+    short.start_stage("research_destination")
+    assert short.tool_timeout(10) == 0
+
+def test_llm_timeout_is_the_rest_of_the_stage():
+    deadline = Deadline(100)
+    deadline.start_stage("build_itinerary")
+    assert 99 < deadline.llm_timeout() <= 100
+    assert deadline.degradations == []
+
+def test_llm_timeout_keeps_a_floor_after_the_budget_is_spent():
+    deadline = Deadline(0.01)
+    deadline.start_stage("build_itinerary")
+    time.sleep(0.02)
+    assert deadline.remaining() == 0 and deadline.stage_remaining() == 0
+    assert deadline.llm_timeout() == MIN_LLM_TIMEOUT
+    assert deadline.llm_timeout() == MIN_LLM_TIMEOUT
+    # Recorded once per stage
+    assert [d["what"] for d in deadline.degradations] == ["deadline"]
+    assert deadline.degradations[0]["stage"] == "build_itinerary"
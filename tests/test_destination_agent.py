@@ -0,0 +1,58 @@
+import threading
+import pytest
+from src.agents.destination_agent import DestinationAgent
+from src.database.usage_ledger import UsageLedger, DEMO_KEY_ID
+from src.utils.admission import AdmissionController
+from src.utils.cost_tracker import CostTracker
+
+@pytest.fixture
+def admission(tmp_path):
+    return AdmissionController(UsageLedger(str(tmp_path / "ledger.db")), demo_max_concurrent=2,
+                               demo_daily_tokens=1000, max_queue=1, queue_timeout=1, tokens_per_plan=400)
+
+def make_agent(monkeypatch, admission):
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test")
+    plan_tracker = CostTracker(ledger=admission.ledger, key_id=DEMO_KEY_ID)
+    agent = DestinationAgent(cost_tracker=plan_tracker, admission=admission, key_id=DEMO_KEY_ID)
+    calls, done = [], threading.Event()
+
+    def build(destination, deadline=None, cost_tracker=None):
+        calls.append({"tracker": cost_tracker, "active": admission.get_status(DEMO_KEY_ID)["active_plans"]})
+        cost_tracker.add_usage(100, 50, stage="destination", model="claude-3-5-haiku-20241022")
+        done.set()
+        return {}
+
+    monkeypatch.setattr(agent, "_build_knowledge", build)
+    return agent, plan_tracker, calls, done
+
+def test_background_refresh_is_admitted_and_billed_separately(monkeypatch, admission):
+    agent, plan_tracker, calls, done = make_agent(monkeypatch, admission)
+    agent._refresh_in_background("Lisbon")
+    assert done.wait(5)
+
+    assert calls[0]["active"] == 1
+    assert calls[0]["tracker"] is not plan_tracker
+    assert plan_tracker.get_total_tokens() == 0
+    # Billed to the same key as the plan that found the research stale
+    assert admission.ledger.get_daily_tokens(DEMO_KEY_ID) == 150
+
+def test_background_refresh_is_skipped_when_the_key_is_over_quota(monkeypatch, admission):
+    agent, _, calls, done = make_agent(monkeypatch, admission)
+    admission.ledger.record(DEMO_KEY_ID, "itinerary", 900, 0, 0.01)
+
+    refreshes = []
+
+    class InlineThread:
+        def __init__(self, target, **kwargs):
+            refreshes.append(target)
+
+        def start(self):
+            refreshes[-1]()
+
+    monkeypatch.setattr(threading, "Thread", InlineThread)
+    agent._refresh_in_background("Lisbon")
+    monkeypatch.undo()
+
+    assert len(refreshes) == 1
+    assert not done.is_set()
+    assert calls == []
@@ -0,0 +1,30 @@
+from types import SimpleNamespace
+import pytest
+from src.tools import geocoding_tool
+from src.tools.geocoding_tool import GeocodingTool
+
+class FakeResponse:
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return [{"lat": "38.72", "lon": "-9.14", "display_name": "Lisbon, Portugal"}]
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(geocoding_tool, "http_get", lambda *args, **kwargs: FakeResponse())
+    monkeypatch.setattr(geocoding_tool.time, "sleep", sleeps.append)
+    monkeypatch.setattr(GeocodingTool, "_nominatim_last_call", 0.0)
+    return sleeps
+
+@pytest.mark.parametrize("mode, throttled", [("off", True), ("record", True), ("replay", False)])
+def test_nominatim_is_throttled_unless_replaying(monkeypatch, sleeps, mode, throttled):
+    monkeypatch.setattr(geocoding_tool, "get_cassette", lambda: SimpleNamespace(mode=mode))
+    tool = GeocodingTool()
+
+    assert tool._try_nominatim("Lisbon")["lat"] == 38.72
+    assert tool._try_nominatim("Porto")["display_name"] == "Lisbon, Portugal"
+
+    assert bool(sleeps) == throttled
+    assert all(0 < wait <= 1.0 for wait in sleeps)
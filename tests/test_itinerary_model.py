@@ -0,0 +1,102 @@
+from types import SimpleNamespace
+from src.utils.itinerary_model import (
+    ITINERARY_TOOL,
+    parse_itinerary,
+    outline_day,
+    day_total,
+    compute_totals,
+    render_day,
+    render_itinerary,
+)
+
+DATES = ["2026-05-01", "2026-05-02", "2026-05-03"]
+
+def tool_message(days):
+    return SimpleNamespace(content=[SimpleNamespace(type="tool_use", name=ITINERARY_TOOL["name"], input={"days": days})])
+
+def slot(name, title, cost=20):
+    return {"slot": name, "title": title, "location": "Baixa", "description": "", "meal": "", "cost_usd": cost}
+
+def raw_day(number, slots, lodging=100):
+    return {"day": number, "slots": slots, "lodging_usd": lodging}
+
+def test_parse_itinerary_skips_missing_duplicate_and_out_of_range_days():
+    days = parse_itinerary(tool_message([
+        raw_day(3, [slot("Morning", "Belem")], lodging=0),
+        raw_day(1, [slot("Evening", "Fado"), slot("Morning", "Castle")]),
+        raw_day(1, [slot("Morning", "A second Day 1")]),
+        raw_day(4, [slot("Morning", "Past the trip")]),
+        raw_day("two", [slot("Morning", "No number")]),
+    ]), DATES)
+
+    # Day 2 was left out by the model and stays missing
+    assert [day["day"] for day in days] == [1, 3]
+    assert [s["title"] for s in days[0]["slots"]] == ["Castle", "Fado"]
+    assert (days[0]["date"], days[0]["weekday"]) == ("2026-05-01", "Friday")
+    assert days[1]["date"] == "2026-05-03"
+
+def test_parse_itinerary_keeps_unpriced_slots_and_drops_invalid_ones():
+    day = parse_itinerary(tool_message([raw_day(2, [
+        slot("Morning", "Market", cost=None),
+        slot("Midday", "Museum", cost="free"),
+        slot("Evening", "Dinner", cost=-5),
+        slot("Brunch", "Not a slot"),
+        slot("Night", ""),
+    ], lodging=None)]), DATES, first_day=2)[0]
+
+    assert day["day"] == 2
+    assert [(s["title"], s["cost_usd"]) for s in day["slots"]] == [("Market", None), ("Museum", None), ("Dinner", 0.0)]
+    assert day["lodging_usd"] is None
+    assert day_total(day) == 0
+
+def test_parse_itinerary_without_the_tool_returns_no_days():
+    assert parse_itinerary(SimpleNamespace(content=[SimpleNamespace(type="text", text="Day 1: ...")]), DATES) == []
+
+def test_totals_add_up_days_and_lodging_without_the_last_night():
+    days = parse_itinerary(tool_message([
+        raw_day(1, [slot("Morning", "Castle", 15), slot("Evening", "Fado", 45.5)], lodging=120),
+        raw_day(2, [slot("Morning", "Market", None)], lodging=120),
+        raw_day(3, [slot("Morning", "Belem", 30)], lodging=0),
+    ]), DATES)
+    totals = compute_totals(days, 500)
+
+    assert [day["total_usd"] for day in days] == [180.5, 120, 30]
+    assert totals["total_usd"] == 330.5
+    assert totals["lodging_usd"] == 240
+    assert totals["activities_usd"] == 90.5
+    assert totals["remaining_usd"] == 169.5
+    assert totals["within_budget"] is True
+    assert totals["unpriced_slots"] == 1
+
+def test_render_itinerary_reports_the_budget_verdict():
+    days = parse_itinerary(tool_message([raw_day(1, [slot("Morning", "Castle", 80)], lodging=0)]), DATES[:1])
+
+    under = render_itinerary(days, compute_totals(days, 100))
+    assert under.endswith("**Trip Total Estimated Cost: $80** ($20 under the $100 budget)")
+
+    over = render_itinerary(days, compute_totals(days, 50))
+    assert over.endswith("**Trip Total Estimated Cost: $80** ($30 over the $50 budget)")
+    assert "-$" not in over
+
+def test_render_day_lists_slots_lodging_and_unknown_costs():
+    day = parse_itinerary(tool_message([raw_day(1, [slot("Morning", "Market", None)], lodging=90)]), DATES)[0]
+    day["total_usd"] = day_total(day)
+    text = render_day(day)
+
+    assert text.startswith("**Day 1 - 2026-05-01 - Friday**")
+    assert "**Morning (9am-12pm):**\n- Market - Baixa\n- Estimated cost: n/a" in text
+    assert "**Lodging:** $90" in text
+    assert text.endswith("**Day 1 Total Estimated Cost: $90**")
+    # No lodging line on the last night
+    day["lodging_usd"] = 0
+    assert "Lodging" not in render_day(day)
+
+def test_outline_day_uses_the_schedule_without_costs():
+    schedule = {"slots": {"Evening": [{"name": "Fado", "location": "Alfama"}],
+                          "Morning": [{"name": "Castle", "description": "Views"}]}}
+    day = outline_day(2, "2026-05-02", schedule)
+
+    assert [(s["slot"], s["title"], s["location"]) for s in day["slots"]] == \
+        [("Morning", "Castle", ""), ("Evening", "Fado", "Alfama")]
+    assert all(s["cost_usd"] is None for s in day["slots"])
+    assert outline_day(1, "2026-05-01")["slots"] == []
@@ -0,0 +1,85 @@
+import json
+import sqlite3
+import pytest
+from src.database import DatabaseManager
+from src.database.maintenance import DatabaseMaintenance, AUTO_VACUUM_INCREMENTAL
+
+PLAN = {"destination": "Lisbon", "itinerary": "**Day 1**\nTram 28 and the castle", "usage_stats": {"input_tokens": 1}}
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "trips.db")
+
+@pytest.fixture
+def db(db_path):
+    return DatabaseManager(db_path)
+
+@pytest.fixture
+def maintenance(db, db_path):
+    return DatabaseMaintenance(db_path, trips_days=0, findings_days=0, usage_days=0)
+
+def save(db, plan=PLAN, destination="Lisbon"):
+    trip_id = db.save_trip(destination, "2026-05-01", "2026-05-03", 1000, ["food"], plan)
+    db.save_agent_finding(trip_id, "destination", {"overview": "copy"})
+    return trip_id
+
+def stored_plans(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return dict(conn.execute("SELECT id, itinerary_json FROM trips"))
+
+def test_coalesced_copies_keep_their_trip_ids(db, db_path, maintenance):
+    first = save(db)
+    # A caller that joined the same plan saves it with its own usage stats
+    second = save(db, dict(PLAN, usage_stats={"input_tokens": 0, "coalesced": True}))
+    other = save(db, dict(PLAN, itinerary="**Day 1**\nBeaches"))
+
+    with maintenance._connect() as conn:
+        assert maintenance.deduplicate_trips(conn) == 1
+        # Already deduplicated trips are not counted again
+        assert maintenance.deduplicate_trips(conn) == 0
+
+    plans = stored_plans(db_path)
+    assert json.loads(plans[second]) == {"duplicate_of": first}
+    assert json.loads(plans[other])["itinerary"] == "**Day 1**\nBeaches"
+    # Every id still loads the full plan
+    for trip_id in (first, second):
+        trip = db.get_trip(trip_id)
+        assert trip["id"] == trip_id
+        assert json.loads(trip["itinerary_json"])["itinerary"] == PLAN["itinerary"]
+    all_trips = {trip["id"]: trip for trip in db.get_all_trips()}
+    assert set(all_trips) == {first, second, other}
+    assert "Tram" in all_trips[second]["itinerary_json"]
+    # The duplicate's findings were copies of the original's
+    with sqlite3.connect(db_path) as conn:
+        assert [row[0] for row in conn.execute("SELECT trip_id FROM agent_findings ORDER BY trip_id")] == [first, other]
+
+def test_deleting_the_original_hands_its_plan_to_a_duplicate(db, db_path, maintenance):
+    first, second, third = save(db), save(db), save(db)
+    with maintenance._connect() as conn:
+        maintenance.deduplicate_trips(conn)
+        maintenance._delete_trips(conn, [first])
+
+    assert db.get_trip(first) is None
+    assert json.loads(stored_plans(db_path)[second])["itinerary"] == PLAN["itinerary"]
+    assert json.loads(stored_plans(db_path)[third]) == {"duplicate_of": second}
+    assert json.loads(db.get_trip(third)["itinerary_json"])["itinerary"] == PLAN["itinerary"]
+
+def test_regenerating_a_duplicate_gives_it_its_own_plan(db, maintenance):
+    first, second = save(db), save(db)
+    with maintenance._connect() as conn:
+        maintenance.deduplicate_trips(conn)
+
+    assert db.update_trip_itinerary(second, dict(PLAN, itinerary="**Day 1**\nNew day"))
+    assert "New day" in db.get_trip(second)["itinerary_json"]
+    assert "Tram" in db.get_trip(first)["itinerary_json"]
+
+def test_background_runs_leave_the_full_vacuum_to_the_cli(db, db_path, maintenance):
+    save(db)
+    summary = maintenance.run_once()
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] != AUTO_VACUUM_INCREMENTAL
+    assert summary["pages_freed"] == 0
+
+    maintenance.run_once(full_vacuum=True)
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == AUTO_VACUUM_INCREMENTAL
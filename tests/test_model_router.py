@@ -0,0 +1,152 @@
+import httpx
+import anthropic
+import pytest
+from src.utils import model_router
+from src.utils.cost_tracker import CostTracker
+from src.utils.deadline import Deadline, MIN_LLM_TIMEOUT
+from src.utils.model_router import (
+    DEFAULT_AGENT_TIERS, MODEL_SPECS, ModelRouter, TIERS, estimate_stage, fit_max_tokens, get_model_pricing, pick_tiers
+)
+
+REQUEST = httpx.Request("POST", "https://api.anthropic.com/v1/messages")
+
+class FakeUsage:
+    def __init__(self, input_tokens, output_tokens):
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+
+class FakeMessage:
+    def __init__(self, model, stop_reason="end_turn"):
+        self.model = model
+        self.stop_reason = stop_reason
+        self.usage = FakeUsage(1_000_000, 100_000)
+
+class FakeClient:
+    """Anthropic client stand-in: fails the models listed in failures, records every call"""
+    def __init__(self, failures=None, stop_reason="end_turn"):
+        self.failures = failures or {}
+        self.stop_reason = stop_reason
+        self.calls = []
+        self.options = []
+        self.messages = self
+
+    def with_options(self, **options):
+        self.options.append(options)
+        return self
+
+    def create(self, model, **kwargs):
+        self.calls.append(dict(kwargs, model=model))
+        if model in self.failures:
+            raise self.failures[model]
+        return FakeMessage(model, self.stop_reason)
+
+def status_error(status_code):
+    return anthropic.APIStatusError(f"{status_code} error", response=httpx.Response(status_code, request=REQUEST), body=None)
+
+def expired_deadline(stage="build_itinerary"):
+    deadline = Deadline(0)
+    deadline.start_stage(stage)
+    return deadline
+
+def plan_totals(tiers):
+    estimates = [estimate_stage(agent, TIERS[tier][0]) for agent, tier in tiers.items()]
+    return sum(latency for latency, _ in estimates), sum(cost for _, cost in estimates)
+
+@pytest.mark.parametrize("status_code", [429, 529])
+def test_overloaded_model_falls_back_and_is_priced_as_the_model_that_answered(status_code):
+    primary, fallback = TIERS["balanced"]
+    client = FakeClient({primary: status_error(status_code)})
+    message = ModelRouter().create_message(client, "itinerary", max_tokens=1000, messages=[])
+    assert [call["model"] for call in client.calls] == [primary, fallback]
+    # SDK retries are skipped only while another model can take the call
+    assert client.options == [{"max_retries": 0}]
+
+    tracker = CostTracker()
+    tracker.add_usage(message.usage.input_tokens, message.usage.output_tokens, stage="itinerary", model=message.model)
+    spec = MODEL_SPECS[fallback]
+    assert tracker.get_estimated_cost() == pytest.approx(spec["input"] + spec["output"] / 10)
+    assert list(tracker.get_summary()["by_model"]) == [fallback]
+
+def test_errors_that_are_not_overload_are_raised_without_fallback():
+    primary = TIERS["balanced"][0]
+    client = FakeClient({primary: status_error(400)})
+    with pytest.raises(anthropic.APIStatusError):
+        ModelRouter().create_message(client, "itinerary", max_tokens=1000, messages=[])
+    assert len(client.calls) == 1
+
+def test_last_model_overloaded_raises():
+    primary, fallback = TIERS["fast"]
+    client = FakeClient({primary: status_error(529), fallback: status_error(529)})
+    with pytest.raises(anthropic.APIStatusError):
+        ModelRouter().create_message(client, "destination", max_tokens=500, messages=[])
+    assert [call["model"] for call in client.calls] == [primary, fallback]
+
+def test_pricing_matches_dated_and_undated_ids_and_unknown_models_use_the_default():
+    assert get_model_pricing("claude-3-5-haiku-20241022") == (0.80, 4.00)
+    assert get_model_pricing("claude-3-5-haiku") == (0.80, 4.00)
+    assert get_model_pricing("claude-unknown") is None
+    tracker = CostTracker()
+    tracker.add_usage(1_000_000, 1_000_000, model="claude-unknown")
+    assert tracker.get_estimated_cost() == pytest.approx(CostTracker.INPUT_COST_PER_1M + CostTracker.OUTPUT_COST_PER_1M)
+
+def test_pick_tiers_keeps_the_defaults_without_pressure():
+    assert pick_tiers() == DEFAULT_AGENT_TIERS
+    assert pick_tiers(target_latency_s=10_000, target_cost_usd=100) == DEFAULT_AGENT_TIERS
+
+def test_pick_tiers_downgrades_to_meet_targets_but_never_upgrades():
+    default_latency, default_cost = plan_totals(DEFAULT_AGENT_TIERS)
+    tiers = pick_tiers(target_cost_usd=default_cost * 0.9)
+    assert tiers != DEFAULT_AGENT_TIERS
+    assert plan_totals(tiers)[1] <= default_cost * 0.9
+    for agent, tier in tiers.items():
+        allowed = model_router.AGENT_PROFILES[agent]["tiers"]
+        assert allowed.index(tier) <= allowed.index(DEFAULT_AGENT_TIERS[agent])
+    # Impossible targets end at the cheapest allowed tiers
+    cheapest = pick_tiers(target_latency_s=0.1)
+    assert all(tier == model_router.AGENT_PROFILES[agent]["tiers"][0] for agent, tier in cheapest.items())
+
+def test_from_config_applies_tier_and_model_overrides(monkeypatch):
+    monkeypatch.setattr(model_router, "PLAN_TARGET_LATENCY_S", None)
+    monkeypatch.setattr(model_router, "PLAN_TARGET_COST_USD", None)
+    monkeypatch.setattr(model_router, "MODEL_OVERRIDES", {"budget": "quality", "itinerary": "claude-3-5-haiku-20241022"})
+    router = ModelRouter.from_config()
+    assert router.models_for("budget") == TIERS["quality"]
+    # A pinned model keeps the tier's other models as fallbacks
+    assert router.models_for("itinerary") == ["claude-3-5-haiku-20241022", "claude-sonnet-4-20250514"]
+    assert router.models_for("destination") == TIERS[DEFAULT_AGENT_TIERS["destination"]]
+
+def test_timeout_falls_back_to_the_next_model():
+    primary, fallback = TIERS["balanced"]
+    client = FakeClient({primary: anthropic.APITimeoutError(request=REQUEST)})
+    message = ModelRouter().create_message(client, "itinerary", max_tokens=1000, messages=[])
+    assert message.model == fallback
+    assert [call["model"] for call in client.calls] == [primary, fallback]
+
+def test_connection_error_falls_back_and_the_last_model_raises():
+    primary, fallback = TIERS["fast"]
+    error = anthropic.APIConnectionError(request=REQUEST)
+    client = FakeClient({primary: error, fallback: error})
+    with pytest.raises(anthropic.APIConnectionError):
+        ModelRouter().create_message(client, "budget", max_tokens=500, messages=[])
+    assert len(client.calls) == 2
+
+def test_expired_deadline_still_gives_the_call_a_timeout_floor():
+    client = FakeClient()
+    deadline = expired_deadline()
+    ModelRouter().create_message(client, "itinerary", deadline=deadline, max_tokens=1000, messages=[])
+    assert client.calls[0]["timeout"] == MIN_LLM_TIMEOUT
+    assert [d["what"] for d in deadline.degradations] == ["deadline"]
+    assert {"max_retries": 0} in client.options
+
+def test_text_calls_are_capped_to_the_timeout_but_tool_calls_are_not():
+    model = TIERS["balanced"][0]
+    client = FakeClient(stop_reason="max_tokens")
+    deadline = expired_deadline()
+    ModelRouter().create_message(client, "itinerary", deadline=deadline, max_tokens=4000, messages=[])
+    capped = client.calls[-1]["max_tokens"]
+    assert capped == fit_max_tokens(model, 4000, MIN_LLM_TIMEOUT) < 4000
+    assert "itinerary output" in [d["what"] for d in deadline.degradations]
+
+    ModelRouter().create_message(client, "itinerary", deadline=deadline, max_tokens=4000,
+                                 tools=[{"name": "record_itinerary"}], messages=[])
+    assert client.calls[-1]["max_tokens"] == 4000
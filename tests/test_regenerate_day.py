@@ -0,0 +1,92 @@
+import pytest
+from src.agents.coordinator import TravelCoordinator
+from src.agents.itinerary_agent import split_days, join_days
+from src.database import DatabaseManager
+from src.utils.itinerary_model import SlotPlan, DayPlan, compute_totals, render_itinerary
+
+DATES = ["2026-05-01", "2026-05-02", "2026-05-03"]
+
+def make_day(day_number, title, cost=40.0, lodging=100.0):
+    date = DATES[day_number - 1]
+    slots = [SlotPlan(slot="Morning", title=title, location="Old Town", description="", meal="", cost_usd=cost)]
+    return DayPlan(day=day_number, date=date, weekday="", slots=slots, lodging_usd=lodging, total_usd=0.0)
+
+class StubItineraryAgent:
+    def __init__(self):
+        self.calls = []
+
+    def regenerate_day(self, destination, date, day_number, num_days, day_schedule, current_day,
+                       previous_day, next_day, feedback, alternatives, budget_info, season_context):
+        self.calls.append({"date": date, "day_number": day_number, "current_day": current_day,
+                           "previous_day": previous_day, "next_day": next_day, "feedback": feedback})
+        return {"day": make_day(day_number, "Tile Museum", cost=25.0, lodging=0.0), "tokens_used": 0}
+
+@pytest.fixture
+def db(tmp_path):
+    return DatabaseManager(str(tmp_path / "trips.db"))
+
+@pytest.fixture
+def coordinator():
+    coordinator = TravelCoordinator(api_key="sk-test")
+    coordinator.itinerary_agent = StubItineraryAgent()
+    return coordinator
+
+def save(db, plan):
+    return db.save_trip("Lisbon", DATES[0], DATES[-1], 1000, ["food"], plan)
+
+def test_split_days_finds_day_headings_in_order():
+    preamble, days = split_days("Intro\n\n**Day 1 - a**\nMorning\n\n## Day 2\nSee Day 1 again\n\n**Day 2 Total Estimated Cost: $5**\n\nDay 4 is not next")
+    assert preamble == "Intro"
+    assert len(days) == 2
+    assert days[0] == "**Day 1 - a**\nMorning"
+    assert days[1].startswith("## Day 2") and "Day 2 Total Estimated Cost" in days[1]
+    assert split_days("No headings") == ("No headings", [])
+    assert split_days(None) == ("", [])
+
+def test_join_days_round_trips_split_days():
+    itinerary = "Intro\n\n**Day 1**\nA\n\n**Day 2**\nB"
+    assert join_days(*split_days(itinerary)) == itinerary
+    assert join_days("", ["**Day 1**", "**Day 2**"]) == "**Day 1**\n\n**Day 2**"
+
+def test_structured_trip_replaces_the_day_and_recomputes_totals(coordinator, db):
+    days = [make_day(n, f"Stop {n}", lodging=0.0 if n == 3 else 100.0) for n in (1, 2, 3)]
+    totals = compute_totals(days, 1000)
+    trip_id = save(db, {"destination": "Lisbon", "budget": 1000, "num_days": 3, "itinerary_days": days,
+                        "cost_totals": totals, "itinerary": render_itinerary(days, totals)})
+
+    plan = coordinator.regenerate_day(trip_id, 1, feedback="fewer museums", db=db)
+
+    call = coordinator.itinerary_agent.calls[0]
+    assert (call["date"], call["day_number"], call["feedback"]) == ("2026-05-02", 2, "fewer museums")
+    assert "Stop 2" in call["current_day"] and "Stop 1" in call["previous_day"] and "Stop 3" in call["next_day"]
+    assert [day["slots"][0]["title"] for day in plan["itinerary_days"]] == ["Stop 1", "Tile Museum", "Stop 3"]
+    assert plan["cost_totals"]["total_usd"] == 140 + 25 + 40
+    assert "Tile Museum" in plan["itinerary"] and "Stop 2" not in plan["itinerary"]
+    assert plan["revisions"][-1]["day"] == 2
+    assert "Tile Museum" in db.get_trip(trip_id)["itinerary_json"]
+
+def test_legacy_trip_replaces_only_the_day_section(coordinator, db):
+    itinerary = "Welcome to Lisbon\n\n**Day 1 - 2026-05-01**\nCastle\n\n**Day 2 - 2026-05-02**\nTram 28\n\nTips: start Day 1 early"
+    trip_id = save(db, {"destination": "Lisbon", "itinerary": itinerary})
+
+    plan = coordinator.regenerate_day(trip_id, 1, db=db)
+
+    preamble, days = split_days(plan["itinerary"])
+    assert preamble == "Welcome to Lisbon"
+    assert days[0] == "**Day 1 - 2026-05-01**\nCastle"
+    assert "Tile Museum" in days[1] and "Tram 28" not in days[1]
+    # Without a stored schedule the date comes from the trip's start date
+    assert coordinator.itinerary_agent.calls[0]["date"] == "2026-05-02"
+
+def test_days_missing_from_the_itinerary_are_rejected(coordinator, db):
+    # The stored schedule says three days but the markdown only has two sections
+    schedule = [{"date": date, "slots": {}} for date in DATES]
+    trip_id = save(db, {"itinerary": "**Day 1**\nA\n\n**Day 2**\nB", "schedule": schedule})
+    assert "missing Day 3" in coordinator.regenerate_day(trip_id, 2, db=db)["error"]
+
+    trip_id = save(db, {"itinerary": "A free-form itinerary", "num_days": 3})
+    assert "No day sections" in coordinator.regenerate_day(trip_id, 0, db=db)["error"]
+
+    assert "not part of this" in coordinator.regenerate_day(trip_id, 3, db=db)["error"]
+    assert coordinator.regenerate_day(999, 0, db=db) == {"error": "Trip not found"}
+    assert coordinator.itinerary_agent.calls == []
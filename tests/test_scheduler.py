@@ -0,0 +1,93 @@
+import random
+from src.utils.activity_catalog import TIMES_OF_DAY
+from src.utils.scheduler import (
+    SLOT_CAPACITY_HOURS, build_schedule, haversine_km, _assign_slots, _order_route
+)
+
+CENTER = {"lat": 38.72, "lon": -9.14}
+
+def make_activity(i, time_of_day="Morning", setting="Either", duration=2):
+    return {"name": f"Activity {i}", "description": "", "location": f"Place {i}", "duration_hours": duration,
+            "cost_tier": "$$", "time_of_day": time_of_day, "setting": setting}
+
+def random_trip(seed, count):
+    rng = random.Random(seed)
+    activities = [make_activity(i, rng.choice(TIMES_OF_DAY), rng.choice(["Indoor", "Outdoor", "Either"]),
+                                rng.choice([1, 1.5, 2, 3, 4])) for i in range(count)]
+    coordinates = [None if rng.random() < 0.15 else
+                   (CENTER["lat"] + rng.uniform(-0.1, 0.1), CENTER["lon"] + rng.uniform(-0.1, 0.1))
+                   for _ in range(count)]
+    return activities, coordinates
+
+def dates_for(num_days):
+    return [f"2025-06-{15 + d:02d}" for d in range(num_days)]
+
+def scheduled_names(schedule):
+    return [a["name"] for day in schedule for slot in TIMES_OF_DAY for a in day["slots"][slot]]
+
+def route_length(route, start=None):
+    points = [point for _, point in route if point is not None]
+    total = haversine_km(start, points[0]) if start is not None and points else 0
+    return total + sum(haversine_km(points[i], points[i + 1]) for i in range(len(points) - 1))
+
+def nearest_neighbour(items, start=None):
+    remaining = list(items)
+    if start is None:
+        route = [remaining.pop(0)]
+    else:
+        first = min(remaining, key=lambda item: haversine_km(start, item[1]))
+        remaining.remove(first)
+        route = [first]
+    while remaining:
+        nearest = min(remaining, key=lambda item: haversine_km(route[-1][1], item[1]))
+        remaining.remove(nearest)
+        route.append(nearest)
+    return route
+
+def test_one_entry_per_date_and_no_more_busy_days_than_activities():
+    for count, num_days in [(0, 3), (1, 4), (2, 7), (5, 3), (12, 4)]:
+        activities, coordinates = random_trip(count, count)
+        schedule = build_schedule(activities, coordinates, dates_for(num_days), center=CENTER)
+        assert [day["date"] for day in schedule] == dates_for(num_days)
+        busy_days = [day for day in schedule if any(day["slots"].values())]
+        assert len(busy_days) <= max(count, 0)
+
+def test_every_activity_scheduled_exactly_once():
+    for seed in range(20):
+        activities, coordinates = random_trip(seed, 3 + seed % 10)
+        schedule = build_schedule(activities, coordinates, dates_for(1 + seed % 5), center=CENTER)
+        assert sorted(scheduled_names(schedule)) == sorted(a["name"] for a in activities)
+
+def test_far_away_geocodes_are_still_scheduled():
+    activities = [make_activity(i) for i in range(3)]
+    coordinates = [(38.7, -9.1), (35.68, 139.69), None]
+    schedule = build_schedule(activities, coordinates, dates_for(2), center=CENTER)
+    assert sorted(scheduled_names(schedule)) == sorted(a["name"] for a in activities)
+
+def test_slots_follow_preferred_time_of_day_when_there_is_room():
+    activities = [make_activity(i, slot, duration=1) for i, slot in enumerate(TIMES_OF_DAY)]
+    slots = _assign_slots(activities, list(range(len(activities))))
+    for slot in TIMES_OF_DAY:
+        assert [activities[i]["time_of_day"] for i in slots[slot]] == [slot]
+
+def test_slots_spill_to_neighbours_and_keep_outdoor_out_of_the_night():
+    capacity = SLOT_CAPACITY_HOURS["Evening"]
+    activities = [make_activity(0, "Evening", duration=capacity), make_activity(1, "Evening", "Outdoor", duration=2)]
+    slots = _assign_slots(activities, [0, 1])
+    assert slots["Evening"] == [0]
+    assert 1 in slots["Midday"]
+    assert not slots["Night"]
+
+def test_two_opt_is_never_longer_than_nearest_neighbour():
+    rng = random.Random(7)
+    for trial in range(50):
+        items = [(i, (rng.uniform(38.6, 38.8), rng.uniform(-9.3, -9.0))) for i in range(2 + trial % 9)]
+        start = None if trial % 2 else (38.72, -9.14)
+        optimized = _order_route(items, start=start)
+        assert sorted(i for i, _ in optimized) == sorted(i for i, _ in items)
+        assert route_length(optimized, start) <= route_length(nearest_neighbour(items, start), start) + 1e-9
+
+def test_unlocated_activities_go_last_in_the_route():
+    items = [(0, None), (1, (38.7, -9.1)), (2, (38.71, -9.12)), (3, None)]
+    route = _order_route(items)
+    assert [i for i, _ in route][-2:] == [0, 3]
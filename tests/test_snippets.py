@@ -0,0 +1,57 @@
+from src.utils.snippets import (
+    bm25_scores, estimate_tokens, format_search_context, rank_passages, split_passages, tokenize
+)
+
+RESULTS = {
+    "answer": "Lisbon is hilly and sunny, with great food and old trams.",
+    "results": [
+        {"title": "Nightlife guide", "content": "Bairro Alto bars stay open late every weekend night. "
+                                                "Clubs by the river play music until dawn most days."},
+        {"title": "Museum guide", "content": "The Gulbenkian museum holds art from every era of history. "
+                                             "The tile museum shows five centuries of azulejo art and history."},
+        {"title": "Museum mirror", "content": "The Gulbenkian museum holds art from every era of history here. "
+                                              "Tickets cost about fifteen euros for adults."},
+    ],
+}
+
+def test_tokenize_drops_stopwords_and_folds_plurals():
+    assert tokenize("The museums of the cities") == ["museum", "city"]
+
+def test_split_passages_skips_fragments():
+    assert split_passages("Too short. This sentence is long enough to keep!  Also  this one is fine here.") == [
+        "This sentence is long enough to keep!", "Also this one is fine here."
+    ]
+
+def test_bm25_prefers_documents_with_rarer_matching_terms():
+    documents = [tokenize("museum art history"), tokenize("bars music night"), tokenize("museum tickets")]
+    scores = bm25_scores(tokenize("art museum"), documents)
+    assert scores[0] > scores[2] > scores[1] == 0
+    assert bm25_scores(["museum"], []) == []
+
+def test_rank_passages_orders_by_relevance():
+    ranked = rank_passages(RESULTS["results"], "museum art history")
+    assert ranked[0][3] in ("Museum guide", "Museum mirror")
+    assert [item[0] for item in ranked] == sorted((item[0] for item in ranked), reverse=True)
+    assert all(score == 0 for score, _, _, title, _ in ranked if title == "Nightlife guide")
+    # Ties keep the search engine's order
+    unmatched = [(r_index, p_index) for score, r_index, p_index, _, _ in ranked if score == 0]
+    assert unmatched == sorted(unmatched)
+
+def test_answer_comes_first_and_near_duplicates_are_dropped():
+    context = format_search_context(RESULTS, "museum art history", token_budget=200)
+    lines = context.split("\n")
+    assert lines[0].startswith("Summary: Lisbon is hilly")
+    assert context.count("Gulbenkian museum holds art") == 1
+    assert any(line.startswith("- Museum guide:") for line in lines)
+
+def test_output_fits_the_token_budget():
+    for budget in (20, 40, 80, 200):
+        context = format_search_context(RESULTS, "museum art history", token_budget=budget)
+        assert estimate_tokens(context) <= budget + len(context.split("\n"))
+    # A long answer is cut to the budget
+    long_answer = {"answer": "word " * 500, "results": []}
+    assert estimate_tokens(format_search_context(long_answer, "word", token_budget=30)) <= 31
+
+def test_empty_or_failed_search_uses_the_empty_message():
+    assert format_search_context({}, "museum", 100) == "No search results available"
+    assert format_search_context({"error": "timeout"}, "museum", 100, empty_message="No cost information") == "No cost information"
@@ -0,0 +1,76 @@
+import sqlite3
+import pytest
+from src.database import DatabaseManager
+
+TRIPS = [
+    ("Lisbon", ["food", "history"], "Trams, tiles and pastéis de nata", "Day 1: Alfama walk"),
+    ("Porto", ["wine"], "Port cellars by the river", "Day 1: Ribeira and a Lisbon day trip"),
+    ("Tokyo", ["food", "anime"], "Ramen, temples and Akihabara", "Day 1: Shibuya crossing"),
+    ("Lisbon", ["museums"], "Museums and miradouros", "Day 1: Gulbenkian"),
+    ("Kyoto", ["temples"], "Temples and tea houses", "Day 1: Fushimi Inari"),
+]
+
+@pytest.fixture
+def db(tmp_path):
+    db = DatabaseManager(str(tmp_path / "trips.db"))
+    for destination, interests, overview, itinerary in TRIPS:
+        db.save_trip(destination, "2025-06-15", "2025-06-17", 1500, interests,
+                     {"destination_overview": overview, "itinerary": itinerary})
+    return db
+
+def destinations(results):
+    return [trip["destination"] for trip in results]
+
+def test_destination_matches_rank_above_itinerary_mentions(db):
+    results = db.search_trips("lisbon")
+    assert destinations(results) == ["Lisbon", "Lisbon", "Porto"]
+    assert "**" in results[-1]["snippet"]
+
+def test_last_term_is_a_prefix_and_all_terms_must_match(db):
+    assert set(destinations(db.search_trips("tok"))) == {"Tokyo"}
+    assert destinations(db.search_trips("temples ky")) == ["Kyoto"]
+    assert db.search_trips("temples lisbon") == []
+
+def test_quotes_punctuation_and_operators_are_treated_as_text(db):
+    assert destinations(db.search_trips('"Tokyo"')) == ["Tokyo"]
+    assert destinations(db.search_trips("ramen!!! (tokyo)")) == ["Tokyo"]
+    assert db.search_trips("food NOT tokyo") == []
+    assert db.search_trips("wine OR anime") == []
+    assert db.search_trips("*^\"()") == []
+    assert db.search_trips("") == []
+
+def test_fts_query_quotes_every_term(db):
+    assert db._fts_query('tokyo "ramen') == '"tokyo" "ramen"*'
+    assert db._fts_query("it's") == '"it" "s"*'
+    assert db._fts_query("...") == ""
+
+def test_pagination_walks_the_ranking_without_overlap(db):
+    ranked = db.search_trips("day", limit=10)
+    assert len(ranked) == len(TRIPS)
+    pages = [db.search_trips("day", limit=2, offset=offset) for offset in (0, 2, 4)]
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert [trip["id"] for page in pages for trip in page] == [trip["id"] for trip in ranked]
+    assert db.search_trips("day", limit=2, offset=10) == []
+
+def test_index_is_backfilled_once_when_first_created(tmp_path, monkeypatch):
+    path = str(tmp_path / "legacy.db")
+    db = DatabaseManager(path)
+    db.save_trip("Lisbon", "2025-06-15", "2025-06-17", 1500, ["food"], {"itinerary": "Tram 28"})
+    # A database from before the index existed
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        DROP TRIGGER trips_fts_insert;
+        DROP TRIGGER trips_fts_delete;
+        DROP TRIGGER trips_fts_update;
+        DROP TABLE trips_fts;
+    """)
+    conn.close()
+
+    calls = []
+    original = DatabaseManager._backfill_search_index
+    monkeypatch.setattr(DatabaseManager, "_backfill_search_index",
+                        lambda self, conn: calls.append(1) or original(self, conn))
+    reopened = DatabaseManager(path)
+    assert destinations(reopened.search_trips("tram")) == ["Lisbon"]
+    DatabaseManager(path)
+    assert len(calls) == 1
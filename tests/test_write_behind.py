@@ -0,0 +1,103 @@
+import queue
+import threading
+import time
+from src.database import write_behind
+from src.database.write_behind import WriteBehindWriter, _STOP
+
+class SlowQueue(queue.Queue):
+    """Queue whose puts stall, to widen the window between submit's check and its put"""
+    def put(self, item, block=True, timeout=None):
+        if item is not _STOP:
+            time.sleep(0.05)
+        super().put(item, block, timeout)
+
+def insert(value):
+    def job(cursor):
+        cursor.execute("INSERT INTO items (value) VALUES (?)", (value,))
+        return value
+    return job
+
+def make_writer(tmp_path, **kwargs):
+    writer = WriteBehindWriter(str(tmp_path / "test.db"), **kwargs)
+    writer.submit(lambda cursor: cursor.execute("CREATE TABLE items (value INTEGER)")).result(timeout=5)
+    return writer
+
+def count_rows(writer):
+    conn = writer._connect()
+    try:
+        return conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+    finally:
+        conn.close()
+
+def test_submit_resolves_and_flush_commits(tmp_path):
+    writer = make_writer(tmp_path)
+    futures = [writer.submit(insert(i)) for i in range(50)]
+    assert writer.flush(timeout=5)
+    assert [f.result(timeout=5) for f in futures] == list(range(50))
+    assert count_rows(writer) == 50
+    writer.close()
+
+def test_every_future_resolves_when_submitting_during_close(tmp_path):
+    for _ in range(20):
+        writer = make_writer(tmp_path, max_queue=16, put_timeout=0.01)
+        futures, lock = [], threading.Lock()
+        start = threading.Barrier(5)
+
+        def submitter(base):
+            start.wait()
+            for i in range(100):
+                future = writer.submit(insert(base + i))
+                with lock:
+                    futures.append(future)
+
+        threads = [threading.Thread(target=submitter, args=(n * 100,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        start.wait()
+        writer.close()
+        for thread in threads:
+            thread.join()
+
+        assert len(futures) == 400
+        assert sorted(f.result(timeout=5) for f in futures) == list(range(400))
+        assert count_rows(writer) == 400
+        (tmp_path / "test.db").unlink()
+
+def test_job_queued_while_closing_is_not_left_behind_the_stop_marker(tmp_path, monkeypatch):
+    # The writer thread reads from the queue built in __init__, so swap the class before that
+    with monkeypatch.context() as patch:
+        patch.setattr(write_behind.queue, "Queue", SlowQueue)
+        writer = make_writer(tmp_path)
+    futures = []
+    submitter = threading.Thread(target=lambda: futures.append(writer.submit(insert(1))))
+    submitter.start()
+    time.sleep(0.01)
+    closer = threading.Thread(target=writer.close, daemon=True)
+    closer.start()
+    closer.join(timeout=5)
+    submitter.join(timeout=5)
+    assert not closer.is_alive()
+    assert futures[0].result(timeout=2) == 1
+    assert count_rows(writer) == 1
+
+def test_full_queue_falls_back_to_a_synchronous_write(tmp_path):
+    writer = make_writer(tmp_path, max_queue=1, put_timeout=0.05)
+    release = threading.Event()
+    writer.submit(lambda cursor: release.wait(5))
+    time.sleep(0.05)
+    writer.submit(insert(0))
+    started = time.monotonic()
+    future = writer.submit(insert(1))
+    assert future.done() and future.result() == 1
+    assert time.monotonic() - started < 2
+    release.set()
+    assert writer.flush(timeout=5)
+    assert count_rows(writer) == 2
+    writer.close()
+
+def test_submit_after_close_writes_synchronously(tmp_path):
+    writer = make_writer(tmp_path)
+    writer.close()
+    assert writer.submit(insert(1)).done()
+    assert count_rows(writer) == 1
+    assert writer.flush(timeout=1)